@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+from lsst.sims.operations.utilities import *
+from lsst.sims.operations.DatabaseBench import *
+
+# globals
+options = []
+options.append("--visits=<val>" + "\t" * 3 + "Synthetic visits. Default is %d." % (DefaultBenchVisits))
+options.append("--seed=<val>" + "\t" * 3 +
+               "Seed of the synthetic visits. Default is %d." % (DefaultBenchSeed))
+
+USAGE_STR = benchUsage(options)
+
+def benchDatabase(args):
+    """
+    Time the writing of the ObsHistory rows of synthetic visits, without
+    a DB connection.
+
+    Command line input
+        [--visits=100000 --seed=42]
+
+        [--output=bench.json]
+
+    Return
+        None
+
+    Raise
+        exit if there are errors
+    """
+    visits = int(args.get('visits', DefaultBenchVisits))
+    seed = int(args.get('seed', DefaultBenchSeed))
+
+    bench = DatabaseBench(visits=visits, seed=seed)
+
+    report = bench.Run()
+    writeBenchReport(report, args)
+
+    return
+
+if (__name__ == '__main__'):
+    benchMain(benchDatabase, USAGE_STR)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+import os
+
+from lsst.sims.operations.utilities import *
+from lsst.sims.operations.InstrumentBench import *
+
+# globals
+options = []
+options.append("--pointings=<file>" + "\t" * 2 +
+               "Pointing sequence to replay, columns date,ra,dec,filter,exptime")
+options.append("\t" * 4 + "(seconds, degrees). Default is a generated sequence.")
+options.append("--count=<val>" + "\t" * 3 + "Generated pointings. Default is %d." % (DefaultBenchPointings))
+options.append("--seed=<val>" + "\t" * 3 +
+               "Seed of the generated pointings. Default is %d." % (DefaultBenchSeed))
+options.append("--record=<file>" + "\t" * 3 + "Save the replayed pointing sequence.")
+options.append("--instrumentConf=<file>" + "\t" * 2 + "Instrument configuration file.")
+options.append("\t" * 4 + "Default is $SIMS_OPERATIONS_DIR/conf/system/Instrument.conf.")
+options.append("--siteConf=<file>" + "\t" * 2 + "Site configuration file.")
+options.append("\t" * 4 + "Default is $SIMS_OPERATIONS_DIR/conf/system/SiteCP.conf.")
+
+USAGE_STR = benchUsage(options)
+
+def benchInstrument(args):
+    """
+    Time the Instrument kinematic model on a pointing sequence.
+
+    Command line input
+        [--pointings=pointings.csv | --count=5000 --seed=42]
+
+        [--record=pointings.csv]
+
+        [--output=bench.json]
+
+        [--instrumentConf=./Instrument.conf]
+
+        [--siteConf=./SiteCP.conf]
+
+    Return
+        None
+
+    Raise
+        exit if there are errors
+    """
+    if 'instrumentConf' in args:
+        instrumentConf = os.path.expanduser(os.path.expandvars(args['instrumentConf']))
+    else:
+        instrumentConf = DefaultInstrumentConfigFile
+
+    if 'siteConf' in args:
+        siteConf = os.path.expanduser(os.path.expandvars(args['siteConf']))
+    else:
+        siteConf = DefaultSiteConfigFile
+
+    bench = InstrumentBench(instrumentConf=instrumentConf, siteConf=siteConf)
+
+    if 'pointings' in args:
+        pointings = bench.ReadPointings(os.path.expanduser(os.path.expandvars(args['pointings'])))
+    else:
+        count = int(args.get('count', DefaultBenchPointings))
+        seed = int(args.get('seed', DefaultBenchSeed))
+        pointings = bench.GeneratePointings(count, seed)
+
+    if 'record' in args:
+        bench.WritePointings(pointings, os.path.expanduser(os.path.expandvars(args['record'])))
+
+    report = bench.Run(pointings)
+    writeBenchReport(report, args)
+
+    return
+
+if (__name__ == '__main__'):
+    benchMain(benchInstrument, USAGE_STR)
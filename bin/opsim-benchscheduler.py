@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+from lsst.sims.operations.utilities import *
+from lsst.sims.operations.SchedulerBench import *
+
+# globals
+options = []
+options.append("--fields=<val>" + "\t" * 3 + "Synthetic fields. Default is %d." % (DefaultBenchFields))
+options.append("--proposals=<val>" + "\t" * 2 +
+               "Synthetic proposals. Default is %d." % (DefaultBenchProposals))
+options.append("--suggestions=<val>" + "\t" * 2 + "Suggestions per proposal. Default is %d." %
+               (DefaultBenchSuggestions))
+options.append("--decisions=<val>" + "\t" * 2 +
+               "Scheduler decisions. Default is %d." % (DefaultBenchDecisions))
+options.append("--seed=<val>" + "\t" * 3 +
+               "Seed of the synthetic proposals. Default is %d." % (DefaultBenchSeed))
+options.append("--legacy=<True|False>" + "\t" + "Rank with the dictionaries used before the rank matrices.")
+options.append("\t" * 4 + "Default is False.")
+options.append("--incremental=<True|False>" + "\t" + "IncrementalRanking mode. Default is False.")
+options.append("--parallel=<True|False>" + "\t" + "ParallelProposals mode. Default is False.")
+options.append("--threads=<val>" + "\t" * 3 + "ParallelProposalsThreads. Default is 0.")
+options.append("--pruning=<True|False>" + "\t" + "CandidatePruning mode. Default is False.")
+options.append("--audit=<True|False>" + "\t" + "CandidatePruningAudit. Default is False.")
+
+USAGE_STR = benchUsage(options)
+
+def benchScheduler(args):
+    """
+    Time the decisions of the scheduler on synthetic proposals.
+
+    Command line input
+        [--fields=2000 --proposals=4 --suggestions=500 --decisions=1000 --seed=42]
+
+        [--legacy=True] [--incremental=True] [--parallel=True --threads=4]
+
+        [--pruning=True --audit=True]
+
+        [--output=bench.json]
+
+    Return
+        None
+
+    Raise
+        exit if there are errors
+    """
+    fields = int(args.get('fields', DefaultBenchFields))
+    proposals = int(args.get('proposals', DefaultBenchProposals))
+    suggestions = int(args.get('suggestions', DefaultBenchSuggestions))
+    decisions = int(args.get('decisions', DefaultBenchDecisions))
+    seed = int(args.get('seed', DefaultBenchSeed))
+    legacy = eval(str(args.get('legacy', False)))
+    incremental = eval(str(args.get('incremental', False)))
+    parallel = eval(str(args.get('parallel', False)))
+    threads = int(args.get('threads', 0))
+    pruning = eval(str(args.get('pruning', False)))
+    audit = eval(str(args.get('audit', False)))
+
+    bench = SchedulerBench(fields=fields, proposals=proposals, suggestions=suggestions, seed=seed,
+                           incremental=incremental, parallel=parallel, threads=threads, pruning=pruning,
+                           audit=audit)
+
+    report = bench.Run(decisions, legacy=legacy)
+    writeBenchReport(report, args)
+
+    return
+
+if (__name__ == '__main__'):
+    benchMain(benchScheduler, USAGE_STR)
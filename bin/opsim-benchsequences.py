@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+from lsst.sims.operations.utilities import *
+from lsst.sims.operations.SequenceBench import *
+
+# globals
+options = []
+options.append("--count=<val>" + "\t" * 3 + "Synthetic sequences. Default is %d." % (DefaultBenchSequences))
+options.append("--nights=<val>" + "\t" * 3 + "Simulated nights. Default is %d." % (DefaultBenchNights))
+options.append("--seed=<val>" + "\t" * 3 +
+               "Seed of the synthetic sequences. Default is %d." % (DefaultBenchSeed))
+options.append("--randomize=<True|False>" + "\t" + "Pick the fields of new sequences at random.")
+options.append("\t" * 4 + "Default is False.")
+
+USAGE_STR = benchUsage(options)
+
+def benchSequences(args):
+    """
+    Time the night start bookkeeping of the sub-sequence proposals on
+    a synthetic population of sequences.
+
+    Command line input
+        [--count=10000 --nights=10 --seed=42]
+
+        [--randomize=True]
+
+        [--output=bench.json]
+
+    Return
+        None
+
+    Raise
+        exit if there are errors
+    """
+    count = int(args.get('count', DefaultBenchSequences))
+    nights = int(args.get('nights', DefaultBenchNights))
+    seed = int(args.get('seed', DefaultBenchSeed))
+    randomize = eval(str(args.get('randomize', False)))
+
+    bench = SequenceBench(count=count, seed=seed, randomize=randomize)
+
+    report = bench.Run(nights)
+    writeBenchReport(report, args)
+
+    return
+
+if (__name__ == '__main__'):
+    benchMain(benchSequences, USAGE_STR)
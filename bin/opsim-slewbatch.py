@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+import os
+import sys
+import time
+
+from lsst.sims.operations.utilities import *
+from lsst.sims.operations.SlewBatch import *
+
+# globals
+use = ["[options...]"]
+use.append("Options:")
+use.append("--input=<file>" + "\t" * 3 + "Pointing pairs, .npy or CSV file with columns")
+use.append("\t" * 4 + "fromAlt,fromAz,fromRot,toAlt,toAz,toRot[,filterChange]")
+use.append("\t" * 4 + "in degrees. Required.")
+use.append("--output=<file>" + "\t" * 3 + "Results file, .npz or CSV. Default is no output file.")
+use.append("--instrumentConf=<file>" + "\t" * 2 + "Instrument configuration file.")
+use.append("\t" * 4 + "Default is $SIMS_OPERATIONS_DIR/conf/system/Instrument.conf.")
+use.append("--processes=<val>" + "\t" * 2 + "Number of worker processes. Default is the number of CPUs.")
+use.append("--chunk=<val>" + "\t" * 3 + "Pointing pairs per work unit. Default is %d." % (DefaultChunkSize))
+use.append("-h, --help" + "\t" * 3 + "Print help and exit.")
+
+USAGE_STR = os.linesep.join(use)
+
+def slewBatch(args):
+    """
+    Compute the slew delays for a file of pointing pairs.
+
+    Command line input
+        --input=pairs.npy
+
+        [--output=slews.npz]
+
+        [--instrumentConf=./Instrument.conf]
+
+        [--processes=4]
+
+        [--chunk=10000]
+
+    Return
+        None
+
+    Raise
+        exit if there are errors
+    """
+    if 'input' not in args:
+        fatalError('no --input file of pointing pairs given')
+    inFile = os.path.expanduser(os.path.expandvars(args['input']))
+
+    if 'output' in args:
+        outFile = os.path.expanduser(os.path.expandvars(args['output']))
+    else:
+        outFile = None
+
+    if 'instrumentConf' in args:
+        instrumentConf = os.path.expanduser(os.path.expandvars(args['instrumentConf']))
+    else:
+        instrumentConf = DefaultInstrumentConfigFile
+
+    if 'processes' in args:
+        processes = int(args['processes'])
+    else:
+        processes = None
+
+    if 'chunk' in args:
+        chunkSize = int(args['chunk'])
+    else:
+        chunkSize = DefaultChunkSize
+
+    t0 = time.time()
+    batch = SlewBatch(instrumentConf=instrumentConf)
+    (delay, activityDelays, criticalPath) = batch.Run(inFile, outFile, processes, chunkSize)
+    dt = time.time() - t0
+
+    print("    slews:%d in %.02fs (%.0f slews/s)" % (len(delay), dt, len(delay) / max(dt, 1e-9)))
+    if len(delay) > 0:
+        print("    delay: mean=%.3fs min=%.3fs max=%.3fs" % (delay.mean(), delay.min(), delay.max()))
+        for k in range(batch.numActivities):
+            oncp = (criticalPath & batch.activityBit[batch.activities[k]]) != 0
+            print("    %-12s mean=%8.3fs criticalpath=%6.2f%%" % (batch.activities[k],
+                                                                  activityDelays[:, k].mean(),
+                                                                  100.0 * oncp.mean()))
+
+    return
+
+if (__name__ == '__main__'):
+    # Parse the command line args
+    try:
+        args = parseArgs(sys.argv[1:])
+    except UserWarning:
+        usage(USAGE_STR)
+        sys.exit(0)
+    except:
+        usage(USAGE_STR)
+        sys.stderr.write('Syntax error\n')
+        sys.exit(1)
+
+    slewBatch(args)
+
+    sys.exit(0)
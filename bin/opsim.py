@@ -169,6 +169,59 @@ def startLsst(args):
     else:
         dbWrite = True
 
+    if 'dbWriteBufferRows' in configDict:
+        dbWriteBufferRows = int(configDict["dbWriteBufferRows"])
+    else:
+        dbWriteBufferRows = DefaultWriteBufferRows
+
+    if 'dbAsyncWrites' in configDict:
+        dbAsyncWrites = eval(str(configDict["dbAsyncWrites"]))
+    else:
+        dbAsyncWrites = False
+
+    if 'dbWriteQueueSize' in configDict:
+        dbWriteQueueSize = int(configDict["dbWriteQueueSize"])
+    else:
+        dbWriteQueueSize = DefaultWriteQueueSize
+
+    if 'dbBackend' in configDict:
+        dbBackend = configDict["dbBackend"]
+    else:
+        dbBackend = 'mysql'
+
+    if 'dbSchema' in configDict:
+        dbSchema = configDict["dbSchema"]
+    else:
+        dbSchema = DefaultSQLiteSchema
+
+    if dbBackend == 'sqlite':
+        if 'dbFile' in configDict:
+            dbFile = configDict["dbFile"]
+        else:
+            dbFile = 'opsim_sqlite.db'
+        print("    dbBackend:sqlite dbFile:%s dbSchema:%s" % (dbFile, dbSchema))
+        backend = SQLiteBackend(dbFile, dbSchema)
+    elif dbBackend == 'memory':
+        if 'dbDataDir' in configDict:
+            dbDataDir = configDict["dbDataDir"]
+        else:
+            dbDataDir = '.'
+        print("    dbBackend:memory dbDataDir:%s dbSchema:%s" % (dbDataDir, dbSchema))
+        backend = MemoryBackend(dbDataDir, dbSchema)
+    else:
+        backend = None
+
+    if 'dbColumnarDir' in configDict:
+        dbColumnarDir = configDict["dbColumnarDir"]
+        print("    dbColumnarDir:%s" % (dbColumnarDir))
+    else:
+        dbColumnarDir = None
+
+    if 'dbStats' in configDict:
+        dbStats = eval(str(configDict["dbStats"]))
+    else:
+        dbStats = False
+
     if 'sessionTbl' in configDict:
         sessionTbl = configDict["sessionTbl"]
         print("    sessionTbl:%s" % (sessionTbl))
@@ -186,7 +239,9 @@ def startLsst(args):
 
     # Instantiate DB Object
     # lsstDB = LSSTDatabase()
-    lsstDB = Database(dbWrite)
+    lsstDB = Database(dbWrite, writeBufferRows=dbWriteBufferRows, asyncWrites=dbAsyncWrites,
+                      writeQueueSize=dbWriteQueueSize, backend=backend, columnarDir=dbColumnarDir,
+                      collectStats=dbStats)
 
     # Get a Session ID
     try:
@@ -716,7 +771,8 @@ def startLsst(args):
         dt = time.time() - t0
         print('      simulation took %.02fs' % (dt))
 
-    #lsstDB.closeConnection()
+    # writes the rows still buffered
+    lsstDB.closeConnection()
 
     return
 
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+"""
+ColumnarSink
+
+Inherits from: object
+
+Class Description
+Columnar output of the tables written through the write-behind buffer
+of Database (ObsHistory, ObsHistory_Proposal, TimeHistory...). Each table
+is a directory holding one .npy file per column, with a fixed dtype per
+column, and a manifest.json at the top level lists the tables, their
+columns and their number of rows.
+
+Database.flushWrites appends the buffered rows (at least once per night)
+by writing the new values at the end of each column file and rewriting
+its fixed size header, so the files are always valid .npy files that
+analysis tools can open with numpy.load(..., mmap_mode='r'), see
+loadColumnar.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Interface
+- Append
+- Close
+
+Readers
+- loadColumnar
+"""
+
+import json
+import os
+import struct
+
+import numpy
+
+COLUMNAR_FORMAT_VERSION = 1
+
+MANIFEST = 'manifest.json'
+
+# Size of the .npy header, magic string included. The shape is rewritten in
+# place as rows are appended, so the header never changes size.
+NPY_HEADER_SIZE = 128
+
+INT_COLUMNS = ['obsHistID', 'expDate', 'night', 'date', 'event', 'Session_sessionID', 'Field_fieldID',
+               'Proposal_propID', 'ObsHistory_obsHistID', 'ObsHistory_Session_sessionID',
+               'SeqHistory_sequenceID', 'MissedHistory_missedHistID', 'MissedHistory_Session_sessionID']
+
+# Longer strings are truncated
+STRING_COLUMNS = {'filter': 'S1', 'log_name': 'S64', 'log_value': 'S255'}
+
+def columnDtype(column):
+    """
+    Return the numpy dtype of a column: STRING_COLUMNS, 64 bits integers
+    for INT_COLUMNS and 64 bits floats otherwise.
+    """
+    if column in STRING_COLUMNS:
+        return numpy.dtype(STRING_COLUMNS[column])
+    if column in INT_COLUMNS:
+        return numpy.dtype('<i8')
+
+    return numpy.dtype('<f8')
+
+def npyHeader(dtype, nRows):
+    """
+    Return the NPY_HEADER_SIZE bytes .npy (version 1.0) header of a one
+    dimensional array.
+    """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (dtype.str, nRows)
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+
+    return '\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header
+
+def loadColumnar(directory, table, mmap_mode='r'):
+    """
+    Return the columns of a table written by ColumnarSink as a dictionary
+    {column: array}, memory mapped by default.
+    """
+    f = open(os.path.join(directory, MANIFEST), 'r')
+    try:
+        manifest = json.load(f)
+    finally:
+        f.close()
+
+    columns = {}
+    for (column, dtype) in manifest['tables'][table]['columns']:
+        fileName = os.path.join(directory, table, column + '.npy')
+        columns[str(column)] = numpy.load(fileName, mmap_mode=mmap_mode)
+
+    return columns
+
+
+class ColumnarSink(object):
+    def __init__(self, directory):
+        """
+        Standard initializer. The tables already in the manifest of the
+        directory are appended to.
+
+        directory   output directory, created if needed.
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.tables = {}
+        manifestFile = os.path.join(directory, MANIFEST)
+        if os.path.isfile(manifestFile):
+            f = open(manifestFile, 'r')
+            try:
+                self.tables = json.load(f)['tables']
+            finally:
+                f.close()
+
+        return
+
+    def Append(self, table, columns, rows):
+        """
+        Append rows to a table.
+
+        Input
+        table       table name.
+        columns     sequence of column names.
+        rows        list of tuples of column values.
+        """
+        if not rows:
+            return
+        names = list(columns)
+        tableDir = os.path.join(self.directory, table)
+        if table not in self.tables:
+            if not os.path.isdir(tableDir):
+                os.makedirs(tableDir)
+            self.tables[table] = {'columns': [[name, columnDtype(name).str] for name in names], 'rows': 0}
+        if names != [column for (column, dtype) in self.tables[table]['columns']]:
+            raise ValueError('ColumnarSink: columns of %s changed' % (table))
+
+        nRows = self.tables[table]['rows'] + len(rows)
+        for (i, (name, dtype)) in enumerate(self.tables[table]['columns']):
+            dtype = numpy.dtype(str(dtype))
+            values = numpy.array([row[i] for row in rows], dtype=dtype)
+            fileName = os.path.join(tableDir, name + '.npy')
+            if os.path.isfile(fileName):
+                f = open(fileName, 'r+b')
+            else:
+                f = open(fileName, 'w+b')
+            try:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    f.write(npyHeader(dtype, 0))
+                f.write(values.tostring())
+                f.seek(0)
+                f.write(npyHeader(dtype, nRows))
+            finally:
+                f.close()
+        self.tables[table]['rows'] = nRows
+
+        self.writeManifest()
+
+        return
+
+    def writeManifest(self):
+        """
+        Write the manifest of the tables, replacing the former one at once.
+        """
+        manifestFile = os.path.join(self.directory, MANIFEST)
+        f = open(manifestFile + '.tmp', 'w')
+        try:
+            json.dump({'format': COLUMNAR_FORMAT_VERSION, 'tables': self.tables}, f, indent=1, sort_keys=True)
+        finally:
+            f.close()
+        os.rename(manifestFile + '.tmp', manifestFile)
+
+        return
+
+    def Close(self):
+
+        self.writeManifest()
+
+        return
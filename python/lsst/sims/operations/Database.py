@@ -3,8 +3,13 @@ import os
 import time
 
 # Third-party includes
-import MySQLdb
 from exceptions import *
+from FieldCatalog import *
+from DatabaseBackend import *
+from DatabaseWriter import *
+from DatabaseConnection import *
+from DatabaseStats import *
+from ColumnarSink import *
 
 class Opsim_Cloud(object):
     pass
@@ -66,12 +71,91 @@ class Opsim_SlewState(object):
 class Opsim_TimeHistory(object):
     pass
 
+# Columns of the tables written by Database, in the order of the rows
+# passed to insertRow and bufferRow. The keys generated by the DB
+# (sessionID, propID, sequenceID...) are left out.
+TABLE_COLUMNS = {
+    'Session': ('sessionUser', 'sessionHost', 'sessionDate', 'version', 'runComment'),
+    'Config': ('Session_sessionID', 'nonPropID', 'moduleName', 'paramIndex', 'paramName', 'paramValue',
+               'comment'),
+    'ConfigFile': ('filename', 'data', 'Session_sessionID'),
+    'Proposal': ('propConf', 'propName', 'Session_sessionID', 'objectID', 'objectHost'),
+    'TimeHistory': ('date', 'mjd', 'night', 'event', 'Session_sessionID'),
+    'Log': ('log_name', 'log_value', 'Session_sessionID'),
+    'Proposal_Field': ('Session_sessionID', 'Proposal_propID', 'Field_fieldID'),
+    'SeqHistory': ('startDate', 'expDate', 'seqnNum', 'completion', 'reqEvents', 'actualEvents', 'endStatus',
+                   'parent_sequenceID', 'Field_fieldID', 'Session_sessionID', 'Proposal_propID'),
+    'SeqHistory_ObsHistory': ('SeqHistory_sequenceID', 'ObsHistory_obsHistID',
+                              'ObsHistory_Session_sessionID'),
+    'SeqHistory_MissedHistory': ('SeqHistory_sequenceID', 'MissedHistory_missedHistID',
+                                 'MissedHistory_Session_sessionID'),
+    'MissedHistory': ('filter', 'expDate', 'expMJD', 'night', 'lst', 'Session_sessionID', 'Field_fieldID'),
+    'ObsHistory_Proposal': ('Proposal_propID', 'ObsHistory_obsHistID', 'ObsHistory_Session_sessionID',
+                            'propRank'),
+    'ObsHistory': ('obsHistID', 'filter', 'expDate', 'expMJD', 'night', 'visitTime', 'visitExpTime',
+                   'finRank', 'finSeeing', 'transparency', 'airmass', 'vSkyBright', 'filtSkyBright',
+                   'rotSkyPos', 'lst', 'alt', 'az', 'dist2Moon', 'solarElong', 'moonRA', 'moonDec',
+                   'moonAlt', 'moonAZ', 'moonPhase', 'sunAlt', 'sunAZ', 'phaseAngle', 'rScatter',
+                   'mieScatter', 'moonIllum', 'moonBright', 'darkBright', 'rawSeeing', 'wind', 'humidity',
+                   'Session_sessionID', 'Field_fieldID'),
+    'SlewHistory': ('slewCount', 'startDate', 'endDate', 'slewTime', 'slewDist', 'ObsHistory_obsHistID',
+                    'ObsHistory_Session_sessionID'),
+    'SlewState': ('slewStateDate', 'tra', 'tdec', 'tracking', 'alt', 'az', 'pa', 'domAlt', 'domAz', 'telAlt',
+                  'telAz', 'rotTelPos', 'filter', 'state', 'SlewHistory_slewID'),
+    'SlewMaxSpeeds': ('domAltSpd', 'domAzSpd', 'telAltSpd', 'telAzSpd', 'rotSpd', 'SlewHistory_slewID'),
+    'SlewActivities': ('activity', 'actDelay', 'inCriticalPath', 'SlewHistory_slewID'),
+}
+
+# Tables written through the write-behind buffer of Database, in the order
+# they are flushed: referenced tables before the tables referring to them.
+# Their rows carry no key generated by the DB, so they can be delayed.
+BUFFERED_TABLES = ['TimeHistory', 'Log', 'Proposal_Field', 'ObsHistory', 'ObsHistory_Proposal',
+                   'SeqHistory_ObsHistory', 'SeqHistory_MissedHistory']
+
+# Tables of the configuration of the run. Their rows are collected in
+# memory while the simulation is set up and written in bulk by the first
+# flushWrites, always to the DB (not to the columnar files).
+STARTUP_TABLES = ['Config', 'ConfigFile']
+
+# Number of buffered rows that triggers a flush
+DefaultWriteBufferRows = 1000
+
 class Database:
-    def __init__(self, dbWrite, dbConnect=True):
+    # DB name when DBDB is not set
+    defaultDB = 'OpsimDB'
+
+    def __init__(self, dbWrite, dbConnect=True, writeBufferRows=DefaultWriteBufferRows, asyncWrites=False,
+                 writeQueueSize=DefaultWriteQueueSize, backend=None, columnarDir=None, collectStats=False):
 
         self.dbWrite = dbWrite
         # This is used for unit testing so as not to need a DB connection when running
         self.dbConnect = dbConnect
+        # Write-behind buffer, see bufferRow. 0 writes every row immediately.
+        self.writeBufferRows = writeBufferRows
+        self.pendingQuery = {}
+        self.pendingRows = {}
+        for table in BUFFERED_TABLES:
+            self.pendingRows[table] = []
+        self.nPendingRows = 0
+        # Rows of the STARTUP_TABLES, see collectRow
+        self.startupRows = {}
+        for table in STARTUP_TABLES:
+            self.startupRows[table] = []
+        # Per table counters of the DB traffic, None when disabled
+        if collectStats:
+            self.stats = DatabaseStats()
+        else:
+            self.stats = None
+        # True between beginTransaction and commitTransaction
+        self.inTransaction = False
+        # Field tables read in memory, see getFieldCatalog
+        self.fieldCatalogs = {}
+        # INSERT queries of the backend, see insertQuery
+        self.insertQueries = {}
+        # Rows counted instead of written when the backend discards the
+        # writes, and the last key handed out per table
+        self.discardedRows = {}
+        self.lastKeys = {}
         print "dbWrite = "
         print dbWrite
 
@@ -92,7 +176,7 @@ class Database:
         try:
             self.DBDB = os.environ['DBDB']
         except:
-            self.DBDB = 'OpsimDB'
+            self.DBDB = self.defaultDB
 
         try:
             self.DBUSER = os.environ['DBUSER']
@@ -104,63 +188,59 @@ class Database:
         except:
             self.DBPASSWD = 'zxcvbnm'
 
-        done = False
-        t0 = time.time()
-        timeout = 10
-        #print "We are going to connect to DB"
-        #self.openConnection()
-        while not done:
-            # Here until handling exceptions better is done.
-            #self.connection = self.openConnection ()
-            try:
-                self.connection = self.openConnection()
-                done = True
-            #print "Open connection"
-            except:
-                if time.time() - t0 > timeout:
-                    raise (IOError, 'Connection to the database failed.')
-                else:
-                    continue
+        # Storage backend, by default the MySQL server given by the environment
+        if backend is None:
+            backend = MySQLBackend(self.DBHOST, self.DBPORT, self.DBDB, self.DBUSER, self.DBPASSWD)
+        self.backend = backend
+
+        # Long-lived connection and cached cursor, None without DB (tests)
+        self.connection = None
+        self.openConnection()
+
+        # Columnar files receiving the buffered rows instead of the DB
+        if columnarDir is not None:
+            self.sink = ColumnarSink(columnarDir)
+        else:
+            self.sink = None
+
+        # Background writer of the buffered rows, with its own connection
+        if asyncWrites and self.dbConnect and self.backend.concurrentWriters and self.sink is None:
+            self.writer = DatabaseWriter(self.newConnection, writeQueueSize)
+        else:
+            self.writer = None
 
     def openConnection(self):
         """
-            Open a connection to DBDB running on DBHOST:DBPORT as user DBUSER
-            and return the connection.
+            Open the connection to the DB of the backend, retrying with an
+            exponential backoff for up to DefaultConnectTimeout seconds.
 
-            Raise exception in case of error.
-        """
+            Raise
+            IOError if the connection could not be opened.
+            """
         # Mainly using this for unit testing.
         if not self.dbConnect:
             return None
-        # Use configuration file with EUPS install otherwise use old way.
-        conf_file = os.path.join(os.getenv("HOME"), ".my.cnf")
-        if os.path.isfile(conf_file):
-            self.conn = MySQLdb.connect(read_default_file=conf_file, db=self.DBDB)
-        else:
-            if self.DBPORT:
-                self.conn = MySQLdb.connect(user=self.DBUSER, passwd=self.DBPASSWD, db=self.DBDB,
-                                            host=self.DBHOST, port=self.DBPORT)
-            else:
-                self.conn = MySQLdb.connect(user=self.DBUSER, passwd=self.DBPASSWD, db=self.DBDB,
-                                            host=self.DBHOST)
+        self.connection = DatabaseConnection(self.backend)
+        self.connection.open()
         self.getCursor()
 
-    def getCursor(self):
+    def newConnection(self):
         """
-            If connection is still valid, return a cursor. Otherwise
-            open a new connection and return a cursor from it.
+            Return a new connection to the DB of the backend.
+            """
+        return self.backend.connect()
 
-            Return a two element array with the connection and the
-            cursor
+    def getCursor(self):
+        """
+            Return the cached cursor of the connection, also kept in
+            self.cur. The connection reopens itself when it is lost, see
+            DatabaseConnection.
             """
-        try:
-            self.cur = self.conn.cursor()
-        except:
-            try:
-                self.conn = self.openConnection()
-                self.cur = self.conn.cursor()
-            except:
-                raise (IOException, 'Connection to the DB failed.')
+        if self.connection is not None:
+            self.conn = self.connection.conn
+            self.cur = self.connection.cur
+
+        return self.cur
 
     def executeSQL(self, query):
         """
@@ -182,24 +262,323 @@ class Database:
             execution of the query failed.
             """
 
-        n = self.cur.execute(query)
+        write = not query.lstrip().lower().startswith('select')
+        if self.stats is not None:
+            t0 = time.time()
+        if self.connection is not None:
+            cur = self.connection.execute(query, write=write)
+        else:
+            cur = self.cur
+            cur.execute(query)
+        n = cur.rowcount
+        if self.stats is not None:
+            t1 = time.time()
         try:
-            res = self.cur.fetchall()
+            res = cur.fetchall()
         except:
             res = []
+        if self.stats is not None:
+            if write:
+                self.stats.record(self.stats.tableOf(query), 'write', max(n, 0), len(query), t1 - t0)
+            else:
+                self.stats.record(self.stats.tableOf(query), 'read', len(res), rowBytes(res), t1 - t0,
+                                  time.time() - t1)
 
         # Return the results
         return (n, res)
 
+    def executeManySQL(self, query, rows):
+        """
+            Execute the given parametrized query once for each row in rows.
+
+            Input
+            query       A string containing the SQL query, with a %s
+                        placeholder per column.
+            rows        list of tuples of column values.
+
+            Return
+            number of affected rows
+
+            Raise
+            Exception if either the connection to the DB failed or the
+            execution of the query failed.
+            """
+        if not rows:
+            return 0
+
+        query = self.backend.paramQuery(query)
+        if self.stats is not None:
+            t0 = time.time()
+        if self.connection is not None:
+            n = self.connection.executemany(query, rows).rowcount
+        else:
+            self.cur.executemany(query, rows)
+            n = self.cur.rowcount
+        if self.stats is not None:
+            self.stats.record(self.stats.tableOf(query), 'write', len(rows), rowBytes(rows), time.time() - t0)
+        return n
+
+    def commit(self):
+        """
+            Commit the current transaction of the connection.
+            """
+        if self.connection is not None:
+            self.connection.commit()
+
+    def insertQuery(self, table):
+        """
+            Return the parametrized INSERT of a row in one of the
+            TABLE_COLUMNS tables, built once per table by the backend.
+            """
+        try:
+            return self.insertQueries[table]
+        except KeyError:
+            columns = TABLE_COLUMNS[table]
+            self.insertQueries[table] = self.backend.insertQuery(table, ', '.join(columns), len(columns))
+            return self.insertQueries[table]
+
+    def insertRow(self, table, row):
+        """
+            Insert a row in one of the TABLE_COLUMNS tables at once, with a
+            parametrized query: the values are passed to the driver as
+            they are.
+
+            Input
+            table       name of the table.
+            row         tuple of column values, in the TABLE_COLUMNS order.
+
+            Return
+            key generated by the DB for the row (lastrowid).
+
+            Raise
+            Exception if either the connection to the DB failed or the
+            execution of the query failed.
+            """
+        if self.backend.discardWrites:
+            return self.discardRows(table, 1)
+        if self.stats is not None:
+            t0 = time.time()
+        if self.connection is not None:
+            key = self.connection.execute(self.insertQuery(table), row, write=True).lastrowid
+        else:
+            self.cur.execute(self.insertQuery(table), row)
+            key = self.cur.lastrowid
+        if self.stats is not None:
+            self.stats.record(table, 'write', 1, rowBytes([row]), time.time() - t0)
+
+        return key
+
+    def discardRows(self, table, nRows):
+        """
+            Count rows of a table instead of writing them, for the backends
+            discarding the writes.
+
+            Return
+            key of the last row, numbered from 1 per table as the DB would.
+            """
+        self.discardedRows[table] = self.discardedRows.get(table, 0) + nRows
+        self.lastKeys[table] = self.lastKeys.get(table, 0) + nRows
+
+        return self.lastKeys[table]
+
+    def bufferRow(self, table, row):
+        """
+            Queue a row for insertion in one of the BUFFERED_TABLES. The
+            queued rows are written by flushWrites, which is called when
+            writeBufferRows rows are pending.
+
+            Input
+            table       name of the table, in BUFFERED_TABLES.
+            row         tuple of column values, in the TABLE_COLUMNS order.
+            """
+        if self.backend.discardWrites and self.sink is None:
+            self.discardRows(table, 1)
+            return
+        if table not in self.pendingQuery:
+            self.pendingQuery[table] = self.insertQuery(table)
+        self.pendingRows[table].append(row)
+        self.nPendingRows += 1
+
+        if self.nPendingRows >= self.writeBufferRows:
+            self.flushWrites()
+
+    def flushWrites(self):
+        """
+            Write the rows queued by bufferRow, with one executemany per
+            table, after the rows collected by collectRow. Until then the
+            buffered tables lack the queued rows.
+            With asyncWrites the rows are handed to the writer thread,
+            see drainWrites. With columnarDir they are appended to the
+            columnar files instead.
+
+            Return
+            number of rows written
+
+            Raise
+            IOError if the writer thread failed.
+            """
+        if self.writer is not None:
+            self.writer.Check()
+        nStartupRows = self.flushStartupRows()
+        if self.nPendingRows == 0 and nStartupRows == 0:
+            return 0
+
+        n = nStartupRows
+        for table in BUFFERED_TABLES:
+            rows = self.pendingRows[table]
+            if rows:
+                if self.sink is not None:
+                    if self.stats is not None:
+                        t0 = time.time()
+                    self.sink.Append(table, TABLE_COLUMNS[table], rows)
+                    if self.stats is not None:
+                        self.stats.record(table, 'npy', len(rows), rowBytes(rows), time.time() - t0)
+                elif self.writer is not None:
+                    if self.stats is not None:
+                        t0 = time.time()
+                    self.writer.Put(self.pendingQuery[table], rows)
+                    if self.stats is not None:
+                        self.stats.record(table, 'queue', len(rows), rowBytes(rows), time.time() - t0)
+                else:
+                    self.executeManySQL(self.pendingQuery[table], rows)
+                n += len(rows)
+                self.pendingRows[table] = []
+        self.nPendingRows = 0
+        if (self.writer is None or nStartupRows > 0) and not self.inTransaction:
+            self.commit()
+
+        return n
+
+    def collectRow(self, table, row):
+        """
+            Keep a row of one of the STARTUP_TABLES in memory until the
+            next flushWrites.
+
+            Input
+            table       name of the table, in STARTUP_TABLES.
+            row         tuple of column values, in the TABLE_COLUMNS order.
+            """
+        self.startupRows[table].append(row)
+
+    def flushStartupRows(self):
+        """
+            Write the rows collected by collectRow, with one executemany
+            per table, on the connection of the simulation.
+
+            Return
+            number of rows written
+            """
+        n = 0
+        for table in STARTUP_TABLES:
+            rows = self.startupRows[table]
+            if rows:
+                if self.backend.discardWrites:
+                    self.discardRows(table, len(rows))
+                else:
+                    self.executeManySQL(self.insertQuery(table), rows)
+                n += len(rows)
+                self.startupRows[table] = []
+
+        return n
+
+    def beginTransaction(self):
+        """
+            Start a transaction holding all the rows written until
+            commitTransaction (the Simulator opens one per night): the
+            buffered rows are then written without being committed. The
+            rows written before are committed first. With asyncWrites the
+            writer thread still commits the buffered rows it writes.
+            """
+        self.flushWrites()
+        self.commit()
+        self.inTransaction = True
+
+        return
+
+    def commitTransaction(self):
+        """
+            Write the buffered rows and commit the transaction started by
+            beginTransaction. If the simulation stops before, the rows of
+            the transaction are rolled back by the DB.
+
+            Raise
+            IOError if the writer thread failed.
+            """
+        self.inTransaction = False
+        self.flushWrites()
+        self.commit()
+
+        return
+
+    def drainWrites(self):
+        """
+            Flush the buffered rows and wait until they are in the DB,
+            before writing rows that refer to them on this connection.
+            """
+        self.flushWrites()
+        if self.writer is not None:
+            self.writer.Drain()
+
+        return
+
+    def getFieldCatalog(self, fieldTable):
+        """
+            Return the FieldCatalog of a Field table. The table is read
+            from the DB the first time only.
+
+            Input
+            fieldTable  name of the Field table.
+
+            Return
+            FieldCatalog instance
+            """
+        if fieldTable not in self.fieldCatalogs:
+            sql = 'select %s from %s' % (', '.join(FIELD_COLUMNS), fieldTable)
+            (n, res) = self.executeSQL(sql)
+            self.fieldCatalogs[fieldTable] = FieldCatalog(res)
+
+        return self.fieldCatalogs[fieldTable]
+
     def closeConnection(self):
+        self.flushWrites()
+        if self.sink is not None:
+            self.sink.Close()
+        if self.stats is not None:
+            print "Database statistics:"
+            for line in self.stats.summary():
+                print line
         if not self.dbConnect:
             return
-        # Close the cursor
-        self.cur.close()
+        if self.writer is not None:
+            writer = self.writer
+            self.writer = None
+            writer.Close()
+        self.commit()
+        self.connection.close()
+        self.connection = None
         del (self.cur)
-        self.conn.close()
         del (self.conn)
 
+    def getStats(self):
+        """
+            Return the per table counters of the DB traffic, see
+            DatabaseStats.stats, empty if collectStats is off.
+            """
+        if self.stats is None:
+            return {}
+
+        return self.stats.stats()
+
+    def connectionStats(self):
+        """
+            Return the counters of the connection (connects, reconnects,
+            statements and their latency), see DatabaseConnection.stats.
+            """
+        if self.connection is None:
+            return {}
+
+        return self.connection.stats()
+
     def newSession(self, sessionUser, sessionHost, sessionDate, version, runComment):
         try:
             oSession = Opsim_Session()
@@ -208,16 +587,8 @@ class Database:
             oSession.sessionDate = sessionDate
             oSession.version = version
             oSession.runComment = runComment
-            sql = 'insert into Session (sessionUser, sessionHost, sessionDate, version, runComment) values '\
-                  '("%s", "%s", "%s", "%s", "%s")' % \
-                  (sessionUser, sessionHost, sessionDate, version, runComment)
-            (n, res) = self.executeSQL(sql)
-            sql = 'select sessionID from Session where '
-            sql += 'sessionUser="%s" and ' % (sessionUser)
-            sql += 'sessionHost="%s" and ' % (sessionHost)
-            sql += 'sessionDate="%s"' % (sessionDate)
-            (n, res) = self.executeSQL(sql)
-            oSession.sessionID = res[0][0]
+            oSession.sessionID = self.insertRow('Session', (str(sessionUser), str(sessionHost),
+                                                            str(sessionDate), str(version), str(runComment)))
         except:
             raise
         return oSession
@@ -226,33 +597,15 @@ class Database:
         if not self.dbConnect:
             return
         try:
-            oConfig = Opsim_Config()
-            oConfig.Session_sessionID = sessionID
-            oConfig.nonPropID = propID
-            oConfig.moduleName = moduleName
-            oConfig.paramIndex = paramIndex
-            oConfig.paramName = paramName
-            oConfig.paramValue = paramValue
-            oConfig.comment = comment
-            sql = 'insert into Config (Session_sessionID, nonPropID, moduleName, paramIndex, paramName, '\
-                  'paramValue, comment) values (%d, %d, "%s", %d, "%s", "%s", "%s")' % \
-                  (sessionID, propID, moduleName, paramIndex, paramName, paramValue, comment)
-            (n, res) = self.executeSQL(sql)
+            self.collectRow('Config', (int(sessionID), int(propID), str(moduleName), int(paramIndex),
+                                       str(paramName), str(paramValue), str(comment)))
         except:
             raise
 
     def addTimeHistory(self, sessionID, date, mjd, nightCnt, event):
         try:
-            oTimeHistory = Opsim_TimeHistory()
-            oTimeHistory.date = date
-            oTimeHistory.mjd = mjd
-            oTimeHistory.night = nightCnt
-            oTimeHistory.event = event
-            oTimeHistory.Session_sessionID = sessionID
             if self.dbWrite:
-                sql = 'insert into TimeHistory (date, mjd, night, event, Session_sessionID) values '\
-                      '(%d, %f, %d, %d, %d)' % (date, mjd, nightCnt, event, sessionID)
-                (n, res) = self.executeSQL(sql)
+                self.bufferRow('TimeHistory', (int(date), mjd, int(nightCnt), int(event), int(sessionID)))
         except:
             raise
 
@@ -264,16 +617,8 @@ class Database:
             oProposal.Session_sessionID = sessionID
             oProposal.objectID = objectID
             oProposal.objectHost = objectHost
-            sql = 'insert into Proposal (propConf, propName, Session_sessionID, objectID, objectHost) '\
-                  'values ("%s", "%s", %d, %d, "%s")' % (propConf, propName, sessionID, objectID, objectHost)
-            (n, res) = self.executeSQL(sql)
-
-            sql = 'select propID from Proposal where '
-            sql += 'propConf="%s" and ' % (propConf)
-            sql += 'propName="%s" and ' % (propName)
-            sql += 'Session_sessionID=%d' % (sessionID)
-            (n, res) = self.executeSQL(sql)
-            oProposal.propID = res[0][0]
+            oProposal.propID = self.insertRow('Proposal', (str(propConf), str(propName), int(sessionID),
+                                                           int(objectID), str(objectHost)))
         except:
             raise
         return oProposal
@@ -295,73 +640,37 @@ class Database:
 
     def addConfigFile(self, filename, data, sessionID):
         try:
-            oConfigFile = Opsim_Config_File()
-            oConfigFile.filename = filename
-            oConfigFile.data = data
-            oConfigFile.Session_sessionID = sessionID
-            sql = 'insert into ConfigFile (filename, data, Session_sessionID) values ("%s", "%s", %d)' % \
-                  (filename, data, sessionID)
-            (n, res) = self.executeSQL(sql)
+            self.collectRow('ConfigFile', (str(filename), str(data), int(sessionID)))
         except:
             raise
 
     def addLog(self, log_name, log_value, sessionID):
         try:
-            oLog = Opsim_Log()
-            oLog.log_name = log_name
-            oLog.log_value = log_value
-            oLog.Session_sessionID = sessionID
             if self.dbWrite:
-                sql = 'insert into Log (log_name, log_value, Session_sessionID) values ("%s", "%s", %d)' % \
-                      (log_name, log_value, sessionID)
-                (n, res) = self.executeSQL(sql)
+                self.bufferRow('Log', (str(log_name), str(log_value), int(sessionID)))
         except:
             raise
 
     def addProposalField(self, sessionID, propID, fieldID):
         try:
-            oPropField = Opsim_Proposal_Field()
-            oPropField.Session_sessionID = sessionID
-            oPropField.Proposal_propID = propID
-            oPropField.Field_fieldID = fieldID
             if self.dbWrite:
-                sql = 'insert into Proposal_Field (Session_sessionID, Proposal_propID, Field_fieldID) '\
-                      'values (%d, %d, %d)' % (sessionID, propID, fieldID)
-                (n, res) = self.executeSQL(sql)
+                self.bufferRow('Proposal_Field', (int(sessionID), int(propID), int(fieldID)))
         except:
             raise
 
     def addSeqHistory(self, startDate, expDate, seqnNum, completion, reqEvents, actualEvents,
                       endStatus, parent_sequenceID, fieldID, sessionID, propID):
         try:
+            # the sequenceID of the returned object is used for the
+            # SeqHistory_ObsHistory and SeqHistory_MissedHistory rows
             oSeqHistory = Opsim_SeqHistory()
-            oSeqHistory.startDate = startDate
-            oSeqHistory.expDate = expDate
-            oSeqHistory.seqnNum = seqnNum
-            oSeqHistory.completion = completion
-            oSeqHistory.reqEvents = reqEvents
-            oSeqHistory.actualEvents = actualEvents
-            oSeqHistory.endStatus = endStatus
-            oSeqHistory.parent_sequenceID = parent_sequenceID
-            oSeqHistory.Field_fieldID = fieldID
             oSeqHistory.Session_sessionID = sessionID
-            oSeqHistory.Proposal_propID = propID
             if self.dbWrite:
-                sql = 'insert into SeqHistory (startDate, expDate, seqnNum, completion, reqEvents, '\
-                      'actualEvents, endStatus, parent_sequenceID, Field_fieldID, Session_sessionID, '\
-                      'Proposal_propID) values (%d, %d, %d, %d, %d, %d, %d, %d, %d, %d, %d)' % \
-                      (startDate, expDate, seqnNum, completion, reqEvents, actualEvents, endStatus,
-                       parent_sequenceID, fieldID, sessionID, propID)
-                (n, res) = self.executeSQL(sql)
-
-                sql = 'select sequenceID from SeqHistory where '
-                sql += 'startDate=%d and ' % (startDate)
-                sql += 'expDate=%d and ' % (expDate)
-                sql += 'Field_fieldID=%d and ' % (fieldID)
-                sql += 'Session_sessionID=%d and ' % (sessionID)
-                sql += 'Proposal_propID=%d' % (propID)
-                (n, res) = self.executeSQL(sql)
-                oSeqHistory.sequenceID = res[0][0]
+                oSeqHistory.sequenceID = self.insertRow('SeqHistory',
+                                                        (int(startDate), int(expDate), int(seqnNum),
+                                                         int(completion), int(reqEvents), int(actualEvents),
+                                                         int(endStatus), int(parent_sequenceID), int(fieldID),
+                                                         int(sessionID), int(propID)))
             else:
                 oSeqHistory.sequenceID = 0
         except:
@@ -370,69 +679,37 @@ class Database:
 
     def addSeqHistoryObsHistory(self, sequenceID, obsHistID, sessionID):
         try:
-            oSeqHistoryObsHistory = Opsim_SeqHistory_ObsHistory()
-            oSeqHistoryObsHistory.SeqHistory_sequenceID = sequenceID
-            oSeqHistoryObsHistory.ObsHistory_obsHistID = obsHistID
-            oSeqHistoryObsHistory.ObsHistory_Session_sessionID = sessionID
             if self.dbWrite:
-                sql = 'insert into SeqHistory_ObsHistory (SeqHistory_sequenceID, ObsHistory_obsHistID, '\
-                      'ObsHistory_Session_sessionID) values (%d, %d, %d)' % (sequenceID, obsHistID, sessionID)
-                (n, res) = self.executeSQL(sql)
+                self.bufferRow('SeqHistory_ObsHistory', (int(sequenceID), int(obsHistID), int(sessionID)))
         except:
             raise
 
     def addSeqHistoryMissedHistory(self, sequenceID, missedHistID, sessionID):
         try:
-            oSeqHistoryMissedHistory = Opsim_SeqHistory_MissedHistory()
-            oSeqHistoryMissedHistory.SeqHistory_sequenceID = sequenceID
-            oSeqHistoryMissedHistory.MissedHistory_missedHistID = missedHistID
-            oSeqHistoryMissedHistory.MissedHistory_Session_sessionID = sessionID
             if self.dbWrite:
-                sql = 'insert into SeqHistory_MissedHistory (SeqHistory_sequenceID, '\
-                      'MissedHistory_missedHistID, MissedHistory_Session_sessionID) values (%d, %d, %d)' % \
-                      (sequenceID, missedHistID, sessionID)
-                (n, res) = self.executeSQL(sql)
+                self.bufferRow('SeqHistory_MissedHistory',
+                               (int(sequenceID), int(missedHistID), int(sessionID)))
         except:
             raise
 
     def addObsHistoryProposal(self, propID, obsHistID, sessionID, propRank):
         try:
-            oObsHistoryProposal = Opsim_ObsHistory_Proposal()
-            oObsHistoryProposal.Proposal_propID = propID
-            oObsHistoryProposal.ObsHistory_obsHistID = obsHistID
-            oObsHistoryProposal.ObsHistory_Session_sessionID = sessionID
-            oObsHistoryProposal.propRank = propRank
             if self.dbWrite:
-                sql = 'insert into ObsHistory_Proposal (Proposal_propID, ObsHistory_obsHistID, '\
-                      'ObsHistory_Session_sessionID, propRank) values (%d, %d, %d, %f)' % \
-                      (propID, obsHistID, sessionID, propRank)
-                (n, res) = self.executeSQL(sql)
+                self.bufferRow('ObsHistory_Proposal', (int(propID), int(obsHistID), int(sessionID),
+                                                      float(propRank)))
         except:
             raise
 
     def addMissedObservation(self, filter, expDate, expMJD, night, lst, sessionID, fieldID):
         try:
+            # the missedHistID of the returned object is used by the
+            # sequences of TransSubSeqProp
             oMissed = Opsim_MissedHistory()
-            oMissed.filter = filter
-            oMissed.expDate = expDate
-            oMissed.expMJD = expMJD
-            oMissed.night = night
-            oMissed.lst = lst
             oMissed.Session_sessionID = sessionID
-            oMissed.Field_fieldID = fieldID
             if self.dbWrite:
-                sql = 'insert into MissedHistory (filter, expDate, expMJD, night, lst, Session_sessionID, '\
-                      'Field_fieldID) values ("%s", %d, %f, %d, %f, %d, %d)' % \
-                      (filter, expDate, expMJD, night, lst, sessionID, fieldID)
-                (n, res) = self.executeSQL(sql)
-
-                sql = 'select missedHistID from MissedHistory where '
-                sql += 'filter="%s" and ' % (filter)
-                sql += 'expDate=%d and ' % (expDate)
-                sql += 'Field_fieldID=%d and ' % (fieldID)
-                sql += 'Session_sessionID=%d' % (sessionID)
-                (n, res) = self.executeSQL(sql)
-                oMissed.missedHistID = res[0][0]
+                oMissed.missedHistID = self.insertRow('MissedHistory',
+                                                      (str(filter), int(expDate), expMJD, int(night), lst,
+                                                       int(sessionID), int(fieldID)))
             else:
                 oMissed.missedHistID = 0
         except:
@@ -448,59 +725,20 @@ class Database:
         # too many places where visitExpTime (seen as 34 in the code and DB) are used to make changes in the
         # code. visitTime (which is seen as zero in the code and DB) will be made by subtracting 4 seconds
         # from the visitExpTime before this call is made.
+        # This is the one row written per visit: the values are buffered as
+        # they are (the scheduler passes Python numbers) and the returned
+        # object only carries the key of the row.
         try:
+            if self.dbWrite:
+                self.bufferRow('ObsHistory', (obsHistID, filter, expDate, expMJD, night, visitExpTime,
+                                              visitTime, finRank, finSeeing, transparency, airmass,
+                                              vSkyBright, filtSkyBright, rotSkyPos, lst, alt, az, dist2Moon,
+                                              solarElong, moonRA, moonDec, moonAlt, moonAZ, moonPhase, sunAlt,
+                                              sunAZ, phaseAngle, rScatter, mieScatter, moonIllum, moonBright,
+                                              darkBright, rawSeeing, wind, humidity, sessionID, fieldID))
             oObs = Opsim_ObsHistory()
             oObs.obsHistID = obsHistID
-            oObs.filter = filter
-            oObs.expDate = expDate
-            oObs.expMJD = expMJD
-            oObs.night = night
-            oObs.visitTime = visitExpTime
-            oObs.visitExpTime = visitTime
-            oObs.finRank = finRank
-            oObs.finSeeing = finSeeing
-            oObs.transparency = transparency
-            oObs.airmass = airmass
-            oObs.vSkyBright = vSkyBright
-            oObs.filtSkyBright = filtSkyBright
-            oObs.rotSkyPos = rotSkyPos
-            oObs.lst = lst
-            oObs.alt = alt
-            oObs.az = az
-            oObs.dist2Moon = dist2Moon
-            oObs.solarElong = solarElong
-            oObs.moonRA = moonRA
-            oObs.moonDec = moonDec
-            oObs.moonAlt = moonAlt
-            oObs.moonAZ = moonAZ
-            oObs.moonPhase = moonPhase
-            oObs.sunAlt = sunAlt
-            oObs.sunAZ = sunAZ
-            oObs.phaseAngle = phaseAngle
-            oObs.rScatter = rScatter
-            oObs.mieScatter = mieScatter
-            oObs.moonIllum = moonIllum
-            oObs.moonBright = moonBright
-            oObs.darkBright = darkBright
-            oObs.rawSeeing = rawSeeing
-            oObs.wind = wind
-            oObs.humidity = humidity
             oObs.Session_sessionID = sessionID
-            oObs.Field_fieldID = fieldID
-            if self.dbWrite:
-                sql = 'insert into ObsHistory (obsHistID, filter, expDate, expMJD, night, visitTime, '\
-                      'visitExpTime, finRank, finSeeing, transparency, airmass, vSkyBright, filtSkyBright, '\
-                      'rotSkyPos, lst, alt, az, dist2Moon, solarElong, moonRA, moonDec, moonAlt, moonAZ, '\
-                      'moonPhase, sunAlt, sunAZ, phaseAngle, rScatter, mieScatter, moonIllum, moonBright, '\
-                      'darkBright, rawSeeing, wind, humidity, Session_sessionID, Field_fieldID) values '\
-                      '(%d, "%s", %d, %f, %d, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, '\
-                      '%f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %f, %d, %d)' % \
-                      (obsHistID, filter, expDate, expMJD, night, visitExpTime, visitTime, finRank,
-                       finSeeing, transparency, airmass, vSkyBright, filtSkyBright, rotSkyPos, lst, alt, az,
-                       dist2Moon, solarElong, moonRA, moonDec, moonAlt, moonAZ, moonPhase, sunAlt, sunAZ,
-                       phaseAngle, rScatter, mieScatter, moonIllum, moonBright, darkBright, rawSeeing, wind,
-                       humidity, sessionID, fieldID)
-                (n, res) = self.executeSQL(sql)
         except:
             raise
         return oObs
@@ -516,17 +754,11 @@ class Database:
             oSlewHist.ObsHistory_obsHistID = obsHistID
             oSlewHist.ObsHistory_Session_sessionID = sessionID
             if self.dbWrite:
-                sql = 'insert into SlewHistory (slewCount, startDate, endDate, slewTime, slewDist, '\
-                      'ObsHistory_obsHistID, ObsHistory_Session_sessionID) values '\
-                      '(%d, %f, %f, %f, %f, %d, %d)' % \
-                      (slewCount, startDate, endDate, slewTime, slewDist, obsHistID, sessionID)
-                (n, res) = self.executeSQL(sql)
-
-                sql = 'select slewID from SlewHistory where '
-                sql += 'ObsHistory_obsHistID=%d and ' % (obsHistID)
-                sql += 'ObsHistory_Session_sessionID=%d' % (sessionID)
-                (n, res) = self.executeSQL(sql)
-                oSlewHist.slewID = res[0][0]
+                # the ObsHistory row referred to may still be buffered
+                self.drainWrites()
+                oSlewHist.slewID = self.insertRow('SlewHistory', (int(slewCount), startDate, endDate,
+                                                                  slewTime, slewDist, int(obsHistID),
+                                                                  int(sessionID)))
             else:
                 oSlewHist.slewID = 0
         except:
@@ -535,61 +767,57 @@ class Database:
 
     def addSlewActivities(self, activity, actDelay, inCriticalPath, slewID):
         try:
-            oSlewAct = Opsim_SlewActivities()
-            oSlewAct.activity = activity
-            oSlewAct.actDelay = actDelay
-            oSlewAct.inCriticalPath = inCriticalPath
-            oSlewAct.SlewHistory_slewID = slewID
             if self.dbWrite:
-                sql = 'insert into SlewActivities (activity, actDelay, inCriticalPath, SlewHistory_slewID)'\
-                      ' values ("%s", %f, "%s", %d)' % (activity, actDelay, inCriticalPath, slewID)
-                (n, res) = self.executeSQL(sql)
+                self.insertRow('SlewActivities', (str(activity), actDelay, str(inCriticalPath), int(slewID)))
         except:
             raise
 
     def addSlewMaxSpeeds(self, domAltSpd, domAzSpd, telAltSpd, telAzSpd, rotSpd, slewID):
         try:
-            oSlewMaxSpeed = Opsim_SlewMaxSpeeds()
-            oSlewMaxSpeed.domAltSpd = domAltSpd
-            oSlewMaxSpeed.domAzSpd = domAzSpd
-            oSlewMaxSpeed.telAltSpd = telAltSpd
-            oSlewMaxSpeed.telAzSpd = telAzSpd
-            oSlewMaxSpeed.rotSpd = rotSpd
-            oSlewMaxSpeed.SlewHistory_slewID = slewID
             if self.dbWrite:
-                sql = 'insert into SlewMaxSpeeds (domAltSpd, domAzSpd, telAltSpd, telAzSpd, rotSpd, '\
-                      'SlewHistory_slewID) values (%f, %f, %f, %f, %f, %d)' % \
-                      (domAltSpd, domAzSpd, telAltSpd, telAzSpd, rotSpd, slewID)
-                (n, res) = self.executeSQL(sql)
+                self.insertRow('SlewMaxSpeeds',
+                               (domAltSpd, domAzSpd, telAltSpd, telAzSpd, rotSpd, int(slewID)))
         except:
             raise
 
     def addSlewState(self, slewStateDate, tra, tdec, tracking, alt, az, pa, domAlt,
                      domAz, telAlt, telAz, rotTelPos, filter, state, slewID):
         try:
-            oSlewState = Opsim_SlewState()
-            oSlewState.slewStateDate = slewStateDate
-            oSlewState.tra = tra
-            oSlewState.tdec = tdec
-            oSlewState.tracking = tracking
-            oSlewState.alt = alt
-            oSlewState.az = az
-            oSlewState.pa = pa
-            oSlewState.domAlt = domAlt
-            oSlewState.domAz = domAz
-            oSlewState.telAlt = telAlt
-            oSlewState.telAz = telAz
-            oSlewState.rotTelPos = rotTelPos
-            oSlewState.filter = filter
-            oSlewState.state = state
-            oSlewState.SlewHistory_slewID = slewID
             if self.dbWrite:
-                sql = 'insert into SlewState (slewStateDate, tra, tdec, tracking, alt, az, pa, domAlt, '\
-                      'domAz, telAlt, telAz, rotTelPos, filter, state, SlewHistory_slewID) values '\
-                      '(%f, %f, %f, "%s", %f, %f, %f, %f, %f, %f, %f, %f, "%s", %d, %d)' % \
-                      (slewStateDate, tra, tdec, tracking, alt, az, pa, domAlt, domAz, telAlt, telAz,
-                       rotTelPos, filter, state, slewID)
+                self.insertRow('SlewState', (slewStateDate, tra, tdec, str(tracking), alt, az, pa, domAlt,
+                                             domAz, telAlt, telAz, rotTelPos, str(filter), int(state),
+                                             int(slewID)))
+        except:
+            raise
+
+    def addSlewBuffer(self, slewBuffer, sessionID):
+        """
+            Drain a SlewBuffer: write all its SlewHistory rows, fetch the
+            assigned slewIDs and write the SlewState, SlewMaxSpeeds and
+            SlewActivities rows referring to them. The buffer is cleared.
+            The rows buffered by bufferRow are written first.
+            """
+        try:
+            if self.dbWrite and len(slewBuffer) > 0 and self.backend.discardWrites:
+                self.discardRows('SlewHistory', len(slewBuffer))
+                self.discardRows('SlewState', len(slewBuffer.stateSlewCount))
+                self.discardRows('SlewMaxSpeeds', len(slewBuffer.speedSlewCount))
+                self.discardRows('SlewActivities', len(slewBuffer.actSlewCount))
+            elif self.dbWrite and len(slewBuffer) > 0:
+                self.drainWrites()
+                self.executeManySQL(self.insertQuery('SlewHistory'), slewBuffer.HistoryRows(sessionID))
+
+                sql = 'select ObsHistory_obsHistID, slewID from SlewHistory where '
+                sql += 'ObsHistory_Session_sessionID=%d and ' % (sessionID)
+                sql += 'ObsHistory_obsHistID between %d and %d' % (min(slewBuffer.slewCount),
+                                                                   max(slewBuffer.slewCount))
                 (n, res) = self.executeSQL(sql)
+                slewID = dict(res)
+
+                self.executeManySQL(self.insertQuery('SlewState'), slewBuffer.StateRows(slewID))
+                self.executeManySQL(self.insertQuery('SlewMaxSpeeds'), slewBuffer.MaxSpeedsRows(slewID))
+                self.executeManySQL(self.insertQuery('SlewActivities'), slewBuffer.ActivitiesRows(slewID))
+            slewBuffer.Clear()
         except:
             raise
 
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+
+"""
+DatabaseBackend
+
+Inherits from: object
+
+Class Description
+Storage backends of Database. A backend opens the DB connections and
+adapts the parametrized queries of Database to its driver, so that the
+same simulation can write to a MySQL server (MySQLBackend, the default)
+or to a local SQLite file (SQLiteBackend) on hosts without a MySQL
+server. MemoryBackend keeps the whole DB in memory, serves the Field,
+Seeing and Cloud tables from local files and discards the simulation
+output, so that runs need no DB at all (tests, benchmarks).
+
+SQLiteBackend creates the tables of the v3_4-sqlite.sql schema in a new
+file (the dbSchema key of LSST.conf gives its path when the source tree
+is not at hand), turns on write-ahead logging and renames the tables and
+the ObsHistory columns that differ between the MySQL and the SQLite
+schemas. The Field, Seeing and Cloud tables of the file have to be
+filled before the run.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Interface
+- connect
+- isConnectionError
+- paramQuery
+- insertQuery
+
+MemoryBackend
+- loadTable
+"""
+
+import os
+
+try:
+    import MySQLdb
+except:
+    MySQLdb = None
+
+try:
+    import sqlite3
+except:
+    sqlite3 = None
+
+# SQLite schema shipped with the tools of the source tree, see the dbSchema key of LSST.conf
+DefaultSQLiteSchema = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+                                   os.pardir, os.pardir, 'tools', 'schema_tools', 'v3_4-sqlite.sql')
+
+# MySQL client errors of a lost connection: CR_SERVER_GONE_ERROR, CR_SERVER_LOST
+MySQLServerLostErrors = (2006, 2013)
+
+def number(value):
+    """
+    Return value as an int or a float if it is a number.
+    """
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+
+    return value
+
+
+class DatabaseBackend(object):
+    """
+    Base backend: MySQL style %s placeholders and column names.
+    """
+    # True if several connections can write at the same time
+    concurrentWriters = True
+
+    # True if Database only counts the rows written, see MemoryBackend
+    discardWrites = False
+
+    # {table: backend table}
+    tableNames = {}
+
+    # {table: {column: backend column}}
+    columnNames = {}
+
+    def connect(self):
+        """
+        Return a new DB API connection.
+        """
+        raise NotImplementedError('DatabaseBackend.connect')
+
+    def isConnectionError(self, error):
+        """
+        Return True if the exception raised by a statement means that the
+        connection was lost, so that it can be reopened.
+        """
+        return False
+
+    def paramQuery(self, query):
+        """
+        Return the query with its %s placeholders in the paramstyle of
+        the driver.
+        """
+        return query
+
+    def insertQuery(self, table, columns, nColumns):
+        """
+        Return the parametrized INSERT of a row in table.
+
+        Input
+        table       table name, as in the MySQL schema.
+        columns     string with the comma separated column names.
+        nColumns    number of columns.
+        """
+        names = self.columnNames.get(table, {})
+        if names:
+            columns = ', '.join([names.get(column.strip(), column.strip()) for column in columns.split(',')])
+
+        return self.paramQuery('insert into %s (%s) values (%s)' % (self.tableNames.get(table, table),
+                                                                    columns, ', '.join(['%s'] * nColumns)))
+
+
+class MySQLBackend(DatabaseBackend):
+    def __init__(self, host, port, db, user, passwd):
+        """
+        Standard initializer.
+
+        host, port  MySQL server, port None for the default one.
+        db          database name.
+        user        user name.
+        passwd      password.
+        The ~/.my.cnf file is used instead when it exists.
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.user = user
+        self.passwd = passwd
+
+        return
+
+    def connect(self):
+
+        if MySQLdb is None:
+            raise ImportError('MySQLBackend: MySQLdb is not installed.')
+        # Use configuration file with EUPS install otherwise use old way.
+        conf_file = os.path.join(os.getenv("HOME"), ".my.cnf")
+        if os.path.isfile(conf_file):
+            return MySQLdb.connect(read_default_file=conf_file, db=self.db)
+        if self.port:
+            return MySQLdb.connect(user=self.user, passwd=self.passwd, db=self.db, host=self.host,
+                                   port=self.port)
+        return MySQLdb.connect(user=self.user, passwd=self.passwd, db=self.db, host=self.host)
+
+    def isConnectionError(self, error):
+
+        return (MySQLdb is not None and isinstance(error, MySQLdb.OperationalError) and
+                len(error.args) > 0 and error.args[0] in MySQLServerLostErrors)
+
+
+class SQLiteBackend(DatabaseBackend):
+    # a single writer at a time
+    concurrentWriters = False
+
+    tableNames = {'ConfigFile': 'Config_File'}
+
+    columnNames = {'ObsHistory': {'filtSkyBright': 'filtSkyBrightness',
+                                  'alt': 'altitude',
+                                  'az': 'azimuth'}}
+
+    def __init__(self, fileName, schema=DefaultSQLiteSchema):
+        """
+        Standard initializer.
+
+        fileName    SQLite DB file, created with the schema if it has no
+                    Session table.
+        schema      SQL script creating the tables.
+        """
+        self.fileName = fileName
+        self.schema = schema
+
+        return
+
+    def connect(self):
+
+        if sqlite3 is None:
+            raise ImportError('SQLiteBackend: sqlite3 is not available.')
+        conn = sqlite3.connect(self.fileName)
+        cur = conn.cursor()
+        cur.execute('PRAGMA journal_mode=WAL')
+        cur.execute('PRAGMA synchronous=NORMAL')
+
+        cur.execute("select name from sqlite_master where type='table' and name='Session'")
+        if cur.fetchall() == []:
+            if not os.path.isfile(self.schema):
+                conn.close()
+                raise IOError('SQLiteBackend: schema %s not found, set dbSchema in LSST.conf.' %
+                              (self.schema))
+            f = open(self.schema, 'r')
+            try:
+                conn.executescript(f.read())
+            finally:
+                f.close()
+            conn.commit()
+        cur.close()
+
+        return conn
+
+    def paramQuery(self, query):
+
+        return query.replace('%s', '?')
+
+
+class MemoryBackend(SQLiteBackend):
+    # writes are counted by Database, never sent to the DB
+    discardWrites = True
+
+    def __init__(self, dataDir, schema=DefaultSQLiteSchema):
+        """
+        Standard initializer.
+
+        dataDir     directory of the <table>.dat files loaded in the DB,
+                    tab separated with a first line of column names as
+                    exported for tools/schema_tools/createSQLite.py
+                    (Field.dat, Seeing.dat, Cloud.dat...). Tables that
+                    are not in the schema are created.
+        schema      SQL script creating the tables.
+        """
+        SQLiteBackend.__init__(self, ':memory:', schema)
+        self.dataDir = dataDir
+
+        return
+
+    def connect(self):
+
+        conn = SQLiteBackend.connect(self)
+        for fileName in sorted(os.listdir(self.dataDir)):
+            (table, ext) = os.path.splitext(fileName)
+            if ext == '.dat':
+                self.loadTable(conn, table, os.path.join(self.dataDir, fileName))
+        conn.commit()
+
+        return conn
+
+    def loadTable(self, conn, table, fileName):
+        """
+        Insert the rows of a .dat file in a table, numbers converted to
+        int or float.
+        """
+        f = open(fileName, 'r')
+        try:
+            columns = f.readline().rstrip('\n').split('\t')
+            rows = [[number(value) for value in line.rstrip('\n').split('\t')] for line in f if line.strip()]
+        finally:
+            f.close()
+
+        cur = conn.cursor()
+        cur.execute("select name from sqlite_master where type='table' and name=?", (table,))
+        if cur.fetchall() == []:
+            cur.execute('create table %s (%s)' % (table, ', '.join(columns)))
+        cur.executemany(self.insertQuery(table, ', '.join(columns), len(columns)), rows)
+        cur.close()
+
+        return
+
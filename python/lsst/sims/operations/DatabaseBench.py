@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+
+"""
+DatabaseBench
+
+Inherits from: object
+
+Class Description
+The DatabaseBench class measures the Python cost of writing the
+ObsHistory row of a visit, the one row the simulation writes for every
+observation. A Database built without a DB connection writes to a cursor
+that does nothing, so that only the work done by Database is timed:
+
+    buffered    Database.addObservation, the row tuple handed to the
+                write buffer and sent with executemany
+    legacy      the 37 column %f formatted INSERT statement executed
+                for every visit, as written before the parametrized
+                queries
+
+The visits are generated from a seed, both paths write the same ones.
+The report is a dictionary with the time per visit (microseconds) of
+each path and their ratio, meant to be dumped as JSON with sorted keys
+and diffed between versions.
+
+===================================
+Interface methods
+
+- __init__
+- Run
+"""
+
+from utilities import *
+from Database import *
+import random
+import timeit
+
+DefaultBenchVisits = 100000
+
+# the statement of a visit before the parametrized queries
+LEGACY_OBSERVATION_SQL = 'insert into ObsHistory (%s) values (%%d, "%%s", %%d, %%f, %%d%s, %%d, %%d)' % \
+                         (', '.join(TABLE_COLUMNS['ObsHistory']), ', %f' * 30)
+
+
+class NullCursor(object):
+    """
+    DB API cursor doing nothing, counting the rows it is given.
+    """
+    def __init__(self):
+        self.rows = 0
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, query, row=None):
+        self.rows += 1
+        self.rowcount = 1
+
+    def executemany(self, query, rows):
+        self.rows += len(rows)
+        self.rowcount = len(rows)
+
+    def fetchall(self):
+        return []
+
+
+class DatabaseBench(object):
+    """
+    DB-less Database writing synthetic visits.
+    """
+    def __init__(self, visits=DefaultBenchVisits, seed=DefaultBenchSeed):
+        """
+        Standard initializer.
+
+        visits      number of visits written by each path
+        seed        random seed
+        """
+        self.visits = visits
+        self.seed = seed
+
+        self.db = Database(True, dbConnect=False)
+        self.db.cur = NullCursor()
+
+        return
+
+    def generateVisits(self):
+        """
+        Return the argument tuples of addObservation for the visits.
+        """
+        random.seed(self.seed)
+        visits = []
+        for i in xrange(self.visits):
+            date = 30 * i + random.randint(0, 10)
+            visits.append((i + 1, random.choice('ugrizy'), date, 49353.0 + date / 86400.0, date // 86400,
+                           30.0, 34.0) + tuple([random.uniform(-3.0, 3.0) for j in range(28)]) +
+                          (1000, random.randint(1, 5000)))
+
+        return visits
+
+    def legacyObservation(self, obsHistID, filter, expDate, expMJD, night, visitTime, visitExpTime, finRank,
+                          finSeeing, transparency, airmass, vSkyBright, filtSkyBright, rotSkyPos,
+                          lst, alt, az, dist2Moon, solarElong, moonRA, moonDec, moonAlt, moonAZ,
+                          moonPhase, sunAlt, sunAZ, phaseAngle, rScatter, mieScatter, moonIllum,
+                          moonBright, darkBright, rawSeeing, wind, humidity, sessionID, fieldID):
+        """
+        Write a visit the way addObservation did before the parametrized
+        queries: one attribute per column and one formatted statement.
+        """
+        oObs = Opsim_ObsHistory()
+        oObs.obsHistID = obsHistID
+        oObs.filter = filter
+        oObs.expDate = expDate
+        oObs.expMJD = expMJD
+        oObs.night = night
+        oObs.visitTime = visitExpTime
+        oObs.visitExpTime = visitTime
+        oObs.finRank = finRank
+        oObs.finSeeing = finSeeing
+        oObs.transparency = transparency
+        oObs.airmass = airmass
+        oObs.vSkyBright = vSkyBright
+        oObs.filtSkyBright = filtSkyBright
+        oObs.rotSkyPos = rotSkyPos
+        oObs.lst = lst
+        oObs.alt = alt
+        oObs.az = az
+        oObs.dist2Moon = dist2Moon
+        oObs.solarElong = solarElong
+        oObs.moonRA = moonRA
+        oObs.moonDec = moonDec
+        oObs.moonAlt = moonAlt
+        oObs.moonAZ = moonAZ
+        oObs.moonPhase = moonPhase
+        oObs.sunAlt = sunAlt
+        oObs.sunAZ = sunAZ
+        oObs.phaseAngle = phaseAngle
+        oObs.rScatter = rScatter
+        oObs.mieScatter = mieScatter
+        oObs.moonIllum = moonIllum
+        oObs.moonBright = moonBright
+        oObs.darkBright = darkBright
+        oObs.rawSeeing = rawSeeing
+        oObs.wind = wind
+        oObs.humidity = humidity
+        oObs.Session_sessionID = sessionID
+        oObs.Field_fieldID = fieldID
+        sql = LEGACY_OBSERVATION_SQL % (obsHistID, filter, expDate, expMJD, night, visitExpTime, visitTime,
+                                        finRank, finSeeing, transparency, airmass, vSkyBright, filtSkyBright,
+                                        rotSkyPos, lst, alt, az, dist2Moon, solarElong, moonRA, moonDec,
+                                        moonAlt, moonAZ, moonPhase, sunAlt, sunAZ, phaseAngle, rScatter,
+                                        mieScatter, moonIllum, moonBright, darkBright, rawSeeing, wind,
+                                        humidity, sessionID, fieldID)
+        (n, res) = self.db.executeSQL(sql)
+
+        return oObs
+
+    def Run(self):
+        """
+        Time both paths on the same visits.
+
+        Return
+        report dictionary
+        """
+        visits = self.generateVisits()
+        timer = timeit.default_timer
+        report = {"format": BENCH_FORMAT_VERSION,
+                  "visits": self.visits}
+
+        for (name, method) in (("legacy", self.legacyObservation), ("buffered", self.db.addObservation)):
+            self.db.cur.rows = 0
+            t0 = timer()
+            for visit in visits:
+                method(*visit)
+            self.db.flushWrites()
+            dt = timer() - t0
+            report[name + "_us"] = 1e6 * dt / max(self.visits, 1)
+            report[name + "_rows"] = self.db.cur.rows
+
+        report["speedup"] = report["legacy_us"] / max(report["buffered_us"], 1e-9)
+
+        return report
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+
+"""
+DatabaseConnection
+
+Inherits from: object
+
+Class Description
+Long-lived DB connection of Database, with its cached cursor. Opening
+the connection is retried with an exponential backoff and a random
+jitter until the timeout, instead of a busy loop, so that many
+simulations starting together do not hammer the DB server in step.
+
+Statements go through execute and executemany, which keep counters of
+the statements and of their latency. A statement failing because the
+connection was lost (see the isConnectionError method of the backend) is
+retried once on a new connection when no write is pending in the
+current transaction, since the rows of a lost transaction would
+otherwise be silently dropped.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Interface
+- open
+- reconnect
+- execute
+- executemany
+- commit
+- rollback
+- close
+- stats
+"""
+
+import random
+import time
+
+# Seconds trying to open the connection before giving up
+DefaultConnectTimeout = 10.0
+
+# First and maximum delays (seconds) between two connection attempts
+DefaultRetryDelay = 0.1
+DefaultMaxRetryDelay = 2.0
+
+
+class DatabaseConnection(object):
+    def __init__(self, backend, timeout=DefaultConnectTimeout, retryDelay=DefaultRetryDelay,
+                 maxRetryDelay=DefaultMaxRetryDelay):
+        """
+        Standard initializer. The connection is opened by open.
+
+        backend         DatabaseBackend opening the DB API connections.
+        timeout         seconds trying to open the connection.
+        retryDelay      delay before the second attempt, doubled after
+                        each failure up to maxRetryDelay.
+        maxRetryDelay   maximum delay between two attempts.
+        """
+        self.backend = backend
+        self.timeout = timeout
+        self.retryDelay = retryDelay
+        self.maxRetryDelay = maxRetryDelay
+
+        self.conn = None
+        self.cur = None
+        # True when the current transaction holds uncommitted writes
+        self.dirty = False
+
+        # Counters
+        self.nConnects = 0
+        self.nReconnects = 0
+        self.nConnectFailures = 0
+        self.nStatements = 0
+        self.nRows = 0
+        self.statementTime = 0.0
+        self.maxStatementTime = 0.0
+
+        return
+
+    def open(self):
+        """
+        Open the connection and its cursor, retrying with an exponential
+        backoff and jitter.
+
+        Raise
+        IOError if the connection could not be opened before the timeout.
+        """
+        t0 = time.time()
+        delay = self.retryDelay
+        while True:
+            try:
+                self.conn = self.backend.connect()
+                self.cur = self.conn.cursor()
+                break
+            except Exception as e:
+                self.nConnectFailures += 1
+                if time.time() - t0 > self.timeout:
+                    raise IOError('Connection to the database failed: %s' % (e))
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(2 * delay, self.maxRetryDelay)
+        self.nConnects += 1
+        self.dirty = False
+
+        return
+
+    def reconnect(self):
+        """
+        Drop the current connection and open a new one. Uncommitted
+        writes are lost.
+        """
+        self.nReconnects += 1
+        try:
+            self.conn.close()
+        except:
+            pass
+        self.open()
+
+        return
+
+    def execute(self, query, row=None, write=False):
+        """
+        Execute a query on the cached cursor.
+
+        Input
+        query       SQL query, parametrized if row is given.
+        row         tuple of the query parameters, or None.
+        write       True if the query writes to the DB.
+
+        Return
+        the cursor, to fetch the results from.
+        """
+        if row is None:
+            self.timed(self.cur.execute, (query,))
+        else:
+            self.timed(self.cur.execute, (query, row))
+        self.nRows += 1
+        if write:
+            self.dirty = True
+
+        return self.cur
+
+    def executemany(self, query, rows):
+        """
+        Execute a parametrized write query once per row.
+
+        Return
+        the cursor.
+        """
+        self.timed(self.cur.executemany, (query, rows))
+        self.nRows += len(rows)
+        self.dirty = True
+
+        return self.cur
+
+    def timed(self, method, args):
+        """
+        Call a cursor method and count its latency. A lost connection is
+        reopened and the call retried once if it is safe to do so.
+        """
+        t0 = time.time()
+        try:
+            try:
+                method(*args)
+            except Exception as e:
+                if self.dirty or not self.backend.isConnectionError(e):
+                    raise
+                self.reconnect()
+                method = getattr(self.cur, method.__name__)
+                method(*args)
+        finally:
+            dt = time.time() - t0
+            self.nStatements += 1
+            self.statementTime += dt
+            if dt > self.maxStatementTime:
+                self.maxStatementTime = dt
+
+        return
+
+    def commit(self):
+        """
+        Commit the current transaction.
+        """
+        self.conn.commit()
+        self.dirty = False
+
+        return
+
+    def rollback(self):
+        """
+        Roll the current transaction back.
+        """
+        self.conn.rollback()
+        self.dirty = False
+
+        return
+
+    def close(self):
+        """
+        Close the cursor and the connection, without committing.
+        """
+        if self.conn is None:
+            return
+        self.cur.close()
+        self.conn.close()
+        self.cur = None
+        self.conn = None
+
+        return
+
+    def stats(self):
+        """
+        Return the counters as a dictionary.
+        """
+        if self.nStatements:
+            meanStatementTime = self.statementTime / self.nStatements
+        else:
+            meanStatementTime = 0.0
+
+        return {'connects': self.nConnects, 'reconnects': self.nReconnects,
+                'connectFailures': self.nConnectFailures, 'statements': self.nStatements, 'rows': self.nRows,
+                'statementTime': self.statementTime, 'meanStatementTime': meanStatementTime,
+                'maxStatementTime': self.maxStatementTime}
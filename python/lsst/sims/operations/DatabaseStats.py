@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""
+DatabaseStats
+
+Inherits from: object
+
+Class Description
+Per-table counters of the DB traffic of Database: statements, rows,
+bytes (approximated as the length of the strings plus 8 bytes per
+number), time spent executing the statements with a histogram of their
+duration, and time spent fetching the results. The statements are
+counted by kind: 'read' (executeSQL from Weather, the proposals...),
+'write', 'queue' (batches handed to the writer thread, the time being
+the wait for room in its queue) and 'npy' (batches appended to the
+columnar files).
+
+Database only creates a DatabaseStats when dbStats is on, so that the
+instrumentation costs nothing otherwise.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Interface
+- record
+- tableOf
+- stats
+- summary
+"""
+
+import re
+
+# Upper bounds (seconds) of the bins of the statement duration histograms,
+# the last bin holds the longer statements
+HISTOGRAM_BOUNDS = [1e-4, 1e-3, 1e-2, 1e-1, 1.0]
+
+TABLE_PATTERN = re.compile(r'\b(?:from|into|table)\s+`?(\w+)', re.IGNORECASE)
+
+def rowBytes(rows):
+    """
+    Approximate size of rows of column values: length of the strings, 8
+    bytes per other value.
+    """
+    n = 0
+    for row in rows:
+        for value in row:
+            if isinstance(value, basestring):
+                n += len(value)
+            else:
+                n += 8
+
+    return n
+
+
+class DatabaseStats(object):
+    def __init__(self):
+        """
+        Standard initializer.
+        """
+        # {(table, kind): counters}
+        self.counters = {}
+        # {query: table}, see tableOf
+        self.tables = {}
+
+        return
+
+    def tableOf(self, query):
+        """
+        Return the name of the first table of a query, '?' if none.
+        """
+        try:
+            return self.tables[query]
+        except KeyError:
+            match = TABLE_PATTERN.search(query)
+            if match:
+                table = match.group(1)
+            else:
+                table = '?'
+            if len(self.tables) < 10000:
+                self.tables[query] = table
+            return table
+
+    def record(self, table, kind, rows, nBytes, executeTime, fetchTime=0.0):
+        """
+        Count one statement.
+
+        Input
+        table       table name.
+        kind        'read', 'write', 'queue' or 'npy'.
+        rows        number of rows written or fetched.
+        nBytes      bytes written or fetched, see rowBytes.
+        executeTime seconds spent executing the statement.
+        fetchTime   seconds spent fetching its results.
+        """
+        key = (table, kind)
+        try:
+            counters = self.counters[key]
+        except KeyError:
+            counters = {'statements': 0, 'rows': 0, 'bytes': 0, 'executeTime': 0.0, 'fetchTime': 0.0,
+                        'histogram': [0] * (len(HISTOGRAM_BOUNDS) + 1)}
+            self.counters[key] = counters
+
+        counters['statements'] += 1
+        counters['rows'] += rows
+        counters['bytes'] += nBytes
+        counters['executeTime'] += executeTime
+        counters['fetchTime'] += fetchTime
+        i = 0
+        while i < len(HISTOGRAM_BOUNDS) and executeTime > HISTOGRAM_BOUNDS[i]:
+            i += 1
+        counters['histogram'][i] += 1
+
+        return
+
+    def stats(self):
+        """
+        Return the counters as a dictionary {table: {kind: counters}}.
+        The histogram counts the statements in the bins bounded by
+        HISTOGRAM_BOUNDS.
+        """
+        tables = {}
+        for ((table, kind), counters) in self.counters.items():
+            counters = dict(counters)
+            counters['histogram'] = list(counters['histogram'])
+            tables.setdefault(table, {})[kind] = counters
+
+        return tables
+
+    def summary(self):
+        """
+        Return the counters as a list of text lines, one per table and
+        kind, the most time consuming first.
+        """
+        lines = ['%-26s %-5s %10s %10s %12s %10s %10s  %s' %
+                 ('table', 'kind', 'statements', 'rows', 'bytes', 'execute_s', 'fetch_s',
+                  'histogram <' + ' <'.join(['%g' % (bound) for bound in HISTOGRAM_BOUNDS]) + ' >=')]
+        total = {'statements': 0, 'rows': 0, 'bytes': 0, 'executeTime': 0.0, 'fetchTime': 0.0}
+        keys = sorted(self.counters.keys(), key=lambda key: -(self.counters[key]['executeTime'] +
+                                                             self.counters[key]['fetchTime']))
+        for (table, kind) in keys:
+            counters = self.counters[(table, kind)]
+            lines.append('%-26s %-5s %10d %10d %12d %10.3f %10.3f  %s' %
+                         (table, kind, counters['statements'], counters['rows'], counters['bytes'],
+                          counters['executeTime'], counters['fetchTime'],
+                          ' '.join([str(n) for n in counters['histogram']])))
+            for name in total:
+                total[name] += counters[name]
+        lines.append('%-26s %-5s %10d %10d %12d %10.3f %10.3f' %
+                     ('total', '', total['statements'], total['rows'], total['bytes'], total['executeTime'],
+                      total['fetchTime']))
+
+        return lines
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""
+DatabaseWriter
+
+Inherits from: object
+
+Class Description
+Background writer of the Database write-behind buffer. The simulation
+thread hands batches of rows (a parametrized INSERT and its rows) to
+Put, and a dedicated thread writes them with executemany on its own DB
+connection, so that the MySQL round trips overlap with the scheduling.
+
+The queue of batches is bounded: Put blocks when the writer falls
+behind. An error of the writer thread is kept and raised in the
+simulation thread by the next Put, Drain or Close. Batches queued after
+an error are discarded.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Interface
+- Put
+- Drain
+- Close
+- Check
+"""
+
+import Queue
+import threading
+
+# Maximum number of batches waiting for the writer thread
+DefaultWriteQueueSize = 16
+
+
+class DatabaseWriter(object):
+    def __init__(self, connect, queueSize=DefaultWriteQueueSize):
+        """
+        Standard initializer. Starts the writer thread.
+
+        connect     function returning a new DB connection, called once
+                    by the writer thread.
+        queueSize   maximum number of batches waiting to be written.
+        """
+        self.connect = connect
+        self.queue = Queue.Queue(maxsize=queueSize)
+        self.error = None
+        self.nBatches = 0
+        self.nRows = 0
+
+        self.thread = threading.Thread(target=self.run, name='DatabaseWriter')
+        self.thread.daemon = True
+        self.thread.start()
+
+        return
+
+    def run(self):
+        """
+        Body of the writer thread: write the batches until Close.
+        """
+        conn = None
+        try:
+            conn = self.connect()
+            cur = conn.cursor()
+        except Exception as e:
+            self.error = e
+
+        while True:
+            batch = self.queue.get()
+            try:
+                if batch is None:
+                    break
+                if self.error is None:
+                    (query, rows) = batch
+                    try:
+                        cur.executemany(query, rows)
+                        conn.commit()
+                        self.nBatches += 1
+                        self.nRows += len(rows)
+                    except Exception as e:
+                        self.error = e
+            finally:
+                self.queue.task_done()
+
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception as e:
+                if self.error is None:
+                    self.error = e
+
+        return
+
+    def Check(self):
+        """
+        Raise
+        IOError if the writer thread failed, with the exception of the
+        writer thread as its cause attribute.
+        """
+        if self.error is not None:
+            error = IOError('DatabaseWriter: writing to the DB failed: %s' % (self.error))
+            error.cause = self.error
+            raise error
+
+        return
+
+    def Put(self, query, rows):
+        """
+        Queue a batch of rows for the writer thread. Blocks while the
+        queue is full.
+
+        Input
+        query       parametrized INSERT query.
+        rows        list of tuples of column values.
+        """
+        self.Check()
+        self.queue.put((query, rows))
+
+        return
+
+    def Drain(self):
+        """
+        Wait until all the queued batches have been written.
+        """
+        self.queue.join()
+        self.Check()
+
+        return
+
+    def Close(self):
+        """
+        Write the queued batches and stop the writer thread.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.Check()
+
+        return
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+
+"""
+FieldCatalog
+
+Inherits from: object
+
+Class Description
+In-memory copy of a Field table: one numpy column per Field column
+(fieldID, fieldFov, fieldRA, fieldDec and the galactic and ecliptic
+coordinates fieldGL, fieldGB, fieldEL, fieldEB), sorted by RA and Dec so
+that RA windows are contiguous slices found by binary search. The
+nightly target selections of the proposals are built as boolean masks
+over the catalog instead of SQL queries.
+
+The masks reproduce the WHERE clauses the proposals used to send to
+MySQL, including the rounding of the bounds to the 6 decimals of the %f
+formatting, so the same fields are selected up to the precision of the
+stored values.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Masks
+- fovMask
+- betweenMask
+- raWindowMask
+- galacticTaperMask
+
+Selection
+- closestOverlapping
+- select
+- rows
+- subset
+"""
+
+import numpy
+
+FIELD_COLUMNS = ['fieldID', 'fieldFov', 'fieldRA', 'fieldDec', 'fieldGL', 'fieldGB', 'fieldEL', 'fieldEB']
+
+def sqlFloat(value):
+    """
+    Value as it appeared in a query built with %f.
+    """
+    return float('%f' % (value))
+
+class FieldCatalog(object):
+    def __init__(self, rows):
+        """
+        Standard initializer.
+
+        rows        sequence of (fieldID, fieldFov, fieldRA, fieldDec,
+                    fieldGL, fieldGB, fieldEL, fieldEB), angles in
+                    decimal degrees, as stored in the Field table.
+        """
+        rows = sorted(rows, key=lambda row: (row[2], row[3]))
+
+        self.columns = {}
+        for (i, name) in enumerate(FIELD_COLUMNS):
+            if name == 'fieldID':
+                dtype = numpy.int64
+            else:
+                dtype = float
+            self.columns[name] = numpy.array([row[i] for row in rows], dtype=dtype)
+
+        self.fieldID = self.columns['fieldID']
+        self.ra = self.columns['fieldRA']
+        self.dec = self.columns['fieldDec']
+
+        return
+
+    def __len__(self):
+        return len(self.fieldID)
+
+    def fovMask(self, fov):
+        """
+        Fields of the given field of view (degrees), within 0.01 degrees.
+        """
+        return self.betweenMask('fieldFov', fov - .01, fov + .01)
+
+    def betweenMask(self, column, low, high):
+        """
+        Fields with low <= column <= high.
+        """
+        values = self.columns[column]
+        return (values >= sqlFloat(low)) & (values <= sqlFloat(high))
+
+    def raWindowMask(self, raMin, raMax):
+        """
+        Fields in the RA window from raMin to raMax (degrees, in [0; 360]),
+        wrapping through 0 when raMax < raMin. An empty window
+        (raMin == raMax) selects the whole sky.
+        """
+        raMin = sqlFloat(raMin)
+        raMax = sqlFloat(raMax)
+        mask = numpy.zeros(len(self), dtype=bool)
+        if raMax > raMin:
+            mask[self.raSlice(raMin, raMax)] = True
+        elif raMax < raMin:
+            mask[self.raSlice(raMin, 360.0)] = True
+            mask[self.raSlice(0.0, raMax)] = True
+        else:
+            mask[self.raSlice(0.0, 360.0)] = True
+
+        return mask
+
+    def raSlice(self, raMin, raMax):
+        """
+        Slice of the fields with raMin <= RA <= raMax.
+        """
+        return slice(numpy.searchsorted(self.ra, raMin, 'left'), numpy.searchsorted(self.ra, raMax, 'right'))
+
+    def galacticTaperMask(self, peakL, taperL, taperB):
+        """
+        Fields outside of the galactic exclusion zone, whose half width
+        in galactic latitude decreases linearly from peakL at l=0 to
+        taperL at |l|=taperB. Every field is selected when taperL or
+        taperB is 0.
+        """
+        if taperB == 0. or taperL == 0.:
+            return numpy.ones(len(self), dtype=bool)
+
+        band = sqlFloat(peakL - taperL)
+        peakL = sqlFloat(peakL)
+        taperB = sqlFloat(taperB)
+        gl = self.columns['fieldGL']
+        absGB = numpy.abs(self.columns['fieldGB'])
+
+        return (((gl < 180.) & (absGB > (peakL - (band * numpy.abs(gl)) / taperB))) |
+                ((gl > 180.) & (absGB > (peakL - (band * numpy.abs(gl - 360.)) / taperB))))
+
+    def closestOverlapping(self, ra_RAD, dec_RAD, radius_RAD):
+        """
+        Index of the field closest to (ra_RAD, dec_RAD) among the fields
+        overlapping the cone of the given radius, i.e. whose center is
+        closer than radius_RAD plus half their field of view. Among
+        fields at the same distance the lowest fieldID is chosen.
+
+        Return
+        index in the catalog, None if no field overlaps the cone.
+        """
+        fieldRA = numpy.radians(self.ra)
+        fieldDec = numpy.radians(self.dec)
+        cosDistance = (numpy.sin(dec_RAD) * numpy.sin(fieldDec) +
+                       numpy.cos(dec_RAD) * numpy.cos(fieldDec) * numpy.cos(ra_RAD - fieldRA))
+        distance = numpy.arccos(numpy.clip(cosDistance, -1.0, 1.0))
+
+        overlapping = numpy.nonzero(distance < numpy.radians(self.columns['fieldFov']) / 2 + radius_RAD)[0]
+        if len(overlapping) == 0:
+            return None
+        closest = overlapping[distance[overlapping] == distance[overlapping].min()]
+
+        return closest[numpy.argmin(self.fieldID[closest])]
+
+    def select(self, mask):
+        """
+        Return the selected fields as a dictionary {fieldID: (ra, dec)}.
+        """
+        return dict(zip(self.fieldID[mask].tolist(),
+                        zip(self.ra[mask].tolist(), self.dec[mask].tolist())))
+
+    def rows(self, mask=None):
+        """
+        Return the selected fields as a list of Field table rows, see
+        __init__. Default is all the fields.
+        """
+        if mask is None:
+            mask = numpy.ones(len(self), dtype=bool)
+        columns = [self.columns[name][mask].tolist() for name in FIELD_COLUMNS]
+
+        return zip(*columns)
+
+    def subset(self, mask):
+        """
+        Return a new FieldCatalog holding the selected fields only.
+        """
+        return FieldCatalog(self.rows(mask))
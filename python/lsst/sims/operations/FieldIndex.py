@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""
+FieldIndex
+
+Inherits from: object
+
+Class Description
+Spatial index over the field centers. Each field is stored as a unit
+vector on the sphere so that cone searches reduce to a nearest
+neighbours search in cartesian space: two points separated by an angle
+theta are at a chord distance of 2*sin(theta/2).
+
+If scipy is available a KD-tree is used, otherwise the cone search is a
+vectorized scan over all the field vectors.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Queries
+- fieldsWithin
+"""
+
+import math
+import numpy
+
+try:
+    from scipy.spatial import cKDTree
+except:
+    cKDTree = None
+
+
+def unitVectors(ra_RAD, dec_RAD):
+    """
+    Unit vectors for the given arrays of ra and dec (radians).
+    Return an array of shape (N, 3).
+    """
+    cosDec = numpy.cos(dec_RAD)
+    return numpy.column_stack((cosDec * numpy.cos(ra_RAD), cosDec * numpy.sin(ra_RAD), numpy.sin(dec_RAD)))
+
+
+class FieldIndex(object):
+    def __init__(self, fields):
+        """
+        Standard initializer.
+
+        fields      list of (fieldID, ra, dec) with ra and dec in decimal
+                    degrees, as stored in the Field table.
+        """
+        self.fieldID = numpy.array([int(f[0]) for f in fields], dtype=numpy.int64)
+        ra_RAD = numpy.radians(numpy.array([float(f[1]) for f in fields]))
+        dec_RAD = numpy.radians(numpy.array([float(f[2]) for f in fields]))
+        self.vectors = unitVectors(ra_RAD, dec_RAD)
+
+        if cKDTree is not None and len(self.fieldID) > 0:
+            self.tree = cKDTree(self.vectors)
+        else:
+            self.tree = None
+
+        return
+
+    def __len__(self):
+        return len(self.fieldID)
+
+    def fieldsWithin(self, ra_RAD, dec_RAD, radius_RAD):
+        """
+        Return the set of fieldIDs whose centers are within radius_RAD of
+        the position (ra_RAD, dec_RAD). A radius of pi or more covers the
+        whole sky.
+        """
+        if len(self.fieldID) == 0:
+            return set()
+        if radius_RAD >= math.pi:
+            # the antipode may be rounded just beyond the chord or cosine
+            return set(self.fieldID.tolist())
+
+        center = unitVectors(numpy.array([ra_RAD]), numpy.array([dec_RAD]))[0]
+        if self.tree is not None:
+            chord = 2.0 * math.sin(radius_RAD / 2.0)
+            idx = self.tree.query_ball_point(center, chord)
+        else:
+            idx = numpy.nonzero(self.vectors.dot(center) >= math.cos(radius_RAD))[0]
+
+        return set(self.fieldID[idx].tolist())
@@ -23,6 +23,7 @@ Accessors
 
 from utilities import *
 from LSSTObject import *
+import numpy
 
 skyBrightKeys = [0, 18, 50, 80, 100]
 filterOffset = {}
@@ -203,6 +204,21 @@ class Filters(object):
 
         return filterList
 
+    def computeFilterSeeingArray(self, seeing, airmass):
+        """
+        Same as computeFilterSeeing for an array of airmasses.
+        Return a dictionary {filter: array of seeing}.
+        """
+        filterList = {}
+        air_3_5 = numpy.power(airmass, 0.6)
+        seeing_fwhm_sys = air_3_5 * self.seeing_fwhm_sys_zenith
+        for ix in range(len(self.filterNamesSorted)):
+            seeing_fwhm_atm = seeing * self.basefilterWavelenSorted[ix] * air_3_5
+            filterList[self.filterNamesSorted[ix]] = self.scaleToNeff * numpy.sqrt(
+                seeing_fwhm_sys**2 + self.atmNeffFactor * seeing_fwhm_atm**2)
+
+        return filterList
+
     def computeFwhmEffSeeing(self, filterList, index, seeing, airmassCorr):
             seeing_fwhm_atm = seeing * self.basefilterWavelenSorted[index] * airmassCorr
             seeing_fwhm_sys = airmassCorr * self.seeing_fwhm_sys_zenith
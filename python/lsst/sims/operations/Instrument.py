@@ -66,6 +66,8 @@ from utilities import *
 from LSSTObject import *
 from Observation import *
 from Proposal import *
+from PointingCache import *
+from SlewBuffer import *
 import copy
 import utilities
 
@@ -126,53 +128,8 @@ class InstrumentPosition(object):
         self.Set(newpos.RA_RAD, newpos.DEC_RAD, newpos.ANG_RAD, newpos.Filter_Pos, newpos.Exposure_Time,
                  newpos.TIME, newpos.ALT_RAD, newpos.AZ_RAD, newpos.PA_RAD)
 
-######################################################################
-class dataSlew(object):
-    def __init__(self, slewCount=0, startDate=0, endDate=0, slewTime=0.0, slewDist=0.0):
-
-        self.slewCount = slewCount
-        self.startDate = startDate
-        self.endDate = endDate
-        self.slewTime = slewTime
-        self.slewDist = slewDist
-
 SLEWINITSTATE = 0
 SLEWFINALSTATE = 1
-class stateSlew(object):
-    def __init__(self, slewStateDate=0, tra=0.0, tdec=0.0, tracking="False", alt=0.0, az=0.0, pa=0.0,
-                 DomAlt=0.0, DomAz=0.0, TelAlt=0.0, TelAz=0.0, RotTelPos=0.0, Filter="r",
-                 state=SLEWINITSTATE):
-
-        self.slewStateDate = slewStateDate
-        self.tra = tra
-        self.tdec = tdec
-        self.tracking = tracking
-        self.alt = alt
-        self.az = az
-        self.pa = pa
-        self.DomAlt = DomAlt
-        self.DomAz = DomAz
-        self.TelAlt = TelAlt
-        self.TelAz = TelAz
-        self.RotTelPos = RotTelPos
-        self.Filter = Filter
-        self.state = state
-
-class speedsSlew(object):
-    def __init__(self, DomAltSpd=0.0, DomAzSpd=0.0, TelAltSpd=0.0, TelAzSpd=0.0, RotSpd=0.0):
-
-        self.DomAltSpd = DomAltSpd
-        self.DomAzSpd = DomAzSpd
-        self.TelAltSpd = TelAltSpd
-        self.TelAzSpd = TelAzSpd
-        self.RotSpd = RotSpd
-
-class activitySlew(object):
-    def __init__(self, activity="", actDelay=0.0, inCriticalPath="False"):
-
-        self.activity = activity
-        self.actDelay = actDelay
-        self.inCriticalPath = inCriticalPath
 
 ######################################################################
 class InstrumentState(InstrumentPosition):
@@ -629,7 +586,7 @@ class Instrument(object):
     in the Instrument and the Telescope for a given exposure request.
     """
     def __init__(self, lsstDB, sessionID, dbTableDict, obsProfile, instrumentConf=DefaultConfigFile,
-                 log=False, logfile="./Instrument.log", verbose=0):
+                 log=False, logfile="./Instrument.log", verbose=0, pointingCache=None):
 
         # Simulation.Process.__init__ (self)
         """
@@ -649,6 +606,8 @@ class Instrument(object):
             logfile     Name (and path) of the desired log file.
                         Defaults "./Instrument.log".
             verbose:    Log verbosity:-1=none, 0=minimal, 1=wordy, >1=verbose
+            pointingCache   PointingCache shared with the scheduler. A private
+                            one is created if not given.
 
         The initial state for the instrument is in park position and no
         tracking.
@@ -697,6 +656,13 @@ class Instrument(object):
         self.slew_params = InstrumentSlewParams(config_dict=self.config_dict, instrumentConf=instrumentConf)
         self.targetposition = InstrumentPosition()
 
+        # slew records, drained in bulk by Database.addSlewBuffer
+        self.slewBuffer = SlewBuffer(self.slew_params.activities)
+
+        if pointingCache is None:
+            pointingCache = PointingCache(latitude_RAD)
+        self.pointingCache = pointingCache
+
         self.filterChangesTimeHistory = []
         self.filterChangesHistory = []
 
@@ -1112,12 +1078,8 @@ class Instrument(object):
         if not self.AllowFilterChange(filter, date):
             return -1.0
 
-        ha_RAD = lst_RAD - ra_RAD
-        #(az_RAD,d1,d2,alt_RAD,d4,d5,pa_RAD,d7,d8) = slalib.sla_altaz (ha_RAD,
-        #                                   dec_RAD,
-        #                                   self.params.latitude_RAD)
-        (az_RAD, d1, d2, alt_RAD, d4, d5, pa_RAD, d7, d8) = pal.altaz(ha_RAD, dec_RAD,
-                                                                      self.params.latitude_RAD)
+        # alt, az and pa are computed once per field and decision time
+        (alt_RAD, az_RAD, pa_RAD) = self.pointingCache.GetAltAzPa(ra_RAD, dec_RAD, dateProfile)
 
         if self.slew_params.Rotator_FollowSky:
             angle_RAD = 0.0
@@ -1158,6 +1120,8 @@ class Instrument(object):
         If the instrument is tracking (taking observations continuosly) then the
         slew starts from the alt-az position for the ra-dec of the previous
         observation at the time of the new observation.
+
+        The slew records are appended to self.slewBuffer.
         """
 
         if self.log and self.verbose > 1:
@@ -1168,14 +1132,12 @@ class Instrument(object):
         (date, mjd, lst_RAD) = dateProfile
 
         self.current_state.UpdateState(date)
-        init_state = copy.deepcopy(self.current_state)
-        slewInitState = self.DBrecordState(self.current_state, SLEWINITSTATE)
+        init_RA_RAD = self.current_state.RA_RAD
+        init_DEC_RAD = self.current_state.DEC_RAD
+        self.slewBuffer.AddState(self.slewCount, self.current_state, SLEWINITSTATE)
 
-        ha_RAD = lst_RAD - ra_RAD
-        # (az_RAD, d1, d2, alt_RAD, d4, d5, pa_RAD, d7, d8) = slalib.sla_altaz(ha_RAD, dec_RAD,
-        #                                                                      self.params.latitude_RAD)
-        (az_RAD, d1, d2, alt_RAD, d4, d5, pa_RAD, d7, d8) = pal.altaz(ha_RAD, dec_RAD,
-                                                                      self.params.latitude_RAD)
+        # the winner pointing was already computed by GetDelayForTarget
+        (alt_RAD, az_RAD, pa_RAD) = self.pointingCache.GetAltAzPa(ra_RAD, dec_RAD, dateProfile)
 
         if self.slew_params.Rotator_FollowSky:
             angle_RAD = 0.0
@@ -1187,90 +1149,24 @@ class Instrument(object):
 
         delay = self.Slew(self.targetposition)
 
-        slewFinalState = self.DBrecordState(self.current_state, SLEWFINALSTATE)
-        slewMaxSpeeds = self.DBrecordMaximumSpeeds()
+        self.slewBuffer.AddState(self.slewCount, self.current_state, SLEWFINALSTATE)
+        self.slewBuffer.AddMaxSpeeds(self.slewCount, self.current_state)
 
         rotator_skypos = self.current_state.GetRotatorSkyPos()
         rotator_telpos = self.current_state.GetRotatorTelPos()
         altitude = self.current_state.ALT_RAD
         azimuth = self.current_state.AZ_RAD
+        parallactic = self.current_state.PA_RAD
         #slewDistance = slalib.sla_dsep(ra_RAD, dec_RAD, init_state.RA_RAD, init_state.DEC_RAD)
-        slewDistance = pal.dsep(ra_RAD, dec_RAD, init_state.RA_RAD, init_state.DEC_RAD)
-
-        slewdata = dataSlew(self.slewCount, date, date + delay, delay, slewDistance)
-
-#        sql = 'INSERT INTO %s VALUES (NULL, ' % ('SlewHistory')
-#        sql += '%d, ' % (self.sessionID)
-#        sql += '%d, ' % (self.slewCount)
-#        sql += '%f, ' % (date)
-#        sql += '%f, ' % (date+delay)
-#        sql += '%f )' % (delay)
-        #(n, dummy) = self.lsstDB.executeSQL(sql)
-
-        listSlewActivities = []
-        for activity in self.lastslew_delays.keys():
-            if activity in self.lastslew_criticalpath:
-                cp = 'True'
-            else:
-                cp = 'False'
-            slewactivity = activitySlew(activity, self.lastslew_delays[activity], cp)
-            listSlewActivities.append(slewactivity)
-
-#            sql = 'INSERT INTO %s VALUES (NULL, ' % ('SlewActivities')
-#            sql += '%d, ' % (self.sessionID)
-#            sql += '%d, ' % (self.slewCount)
-#            sql += '"%s", ' % (activity)
-#            sql += '%f, ' % (self.lastslew_delays[activity])
-#            sql += '"%s" )' % (cp)
-            #(n, dummy) = self.lsstDB.executeSQL(sql)
+        slewDistance = pal.dsep(ra_RAD, dec_RAD, init_RA_RAD, init_DEC_RAD)
+
+        self.slewBuffer.AddHistory(self.slewCount, date, date + delay, delay, slewDistance)
+        self.slewBuffer.AddActivities(self.slewCount, self.lastslew_delays, self.lastslew_criticalpath)
 
         self.next_state = copy.deepcopy(self.current_state)
         self.next_state.UpdateState(date + delay + exposureTime)
 
-        return (delay, rotator_skypos, rotator_telpos, altitude, azimuth, slewdata, slewInitState,
-                slewFinalState, slewMaxSpeeds, listSlewActivities)
-
-    def DBrecordState(self, state, initfinal):
-
-        if state.Tracking:
-            tracking = 'True'
-        else:
-            tracking = 'False'
-
-        slewState = stateSlew(state.TIME, state.RA_RAD, state.DEC_RAD, tracking, state.ALT_RAD, state.AZ_RAD,
-                              state.PA_RAD, state.DomAlt_Pos_RAD, state.DomAz_Pos_RAD, state.TelAlt_Pos_RAD,
-                              state.TelAz_Pos_RAD, state.Rotator_Pos_RAD, state.Filter_Pos, initfinal)
-
-#        sql = 'INSERT INTO %s VALUES (NULL, ' % (dbTable)
-#        sql += '%d, ' % (self.sessionID)
-#        sql += '%d, ' % (self.slewCount)
-#        sql += '%f, %f, %f, ' % (state.TIME, state.RA_RAD, state.DEC_RAD)
-#        sql += '"%s", ' % (tracking)
-#        sql += '%f, %f, %f, ' % (state.ALT_RAD, state.AZ_RAD, state.PA_RAD)
-#        sql += '%f, %f, ' % (state.DomAlt_Pos_RAD, state.DomAz_Pos_RAD)
-#        sql += '%f, %f, ' % (state.TelAlt_Pos_RAD, state.TelAz_Pos_RAD)
-#        sql += '%f, ' % (state.Rotator_Pos_RAD)
-#        sql += '"%s" )' % (state.Filter_Pos)
-#        (n, dummy) = self.lsstDB.executeSQL(sql)
-
-#	return n
-        return slewState
-
-    def DBrecordMaximumSpeeds(self):
-
-        slewSpeeds = speedsSlew(self.current_state.DomAlt_Spd_RDS, self.current_state.DomAz_Spd_RDS,
-                                self.current_state.TelAlt_Spd_RDS, self.current_state.TelAz_Spd_RDS,
-                                self.current_state.Rotator_Spd_RDS)
-#        sql = 'INSERT INTO %s VALUES (NULL, ' % ('SlewMaxSpeeds')
-#        sql += '%d, ' % (self.sessionID)
-#        sql += '%d, ' % (self.slewCount)
-#        sql += '%f, %f, ' % (self.current_state.DomAlt_Spd_RDS, self.current_state.DomAz_Spd_RDS)
-#        sql += '%f, %f, ' % (self.current_state.TelAlt_Spd_RDS, self.current_state.TelAz_Spd_RDS)
-#        sql += '%f )    ' % (self.current_state.Rotator_Spd_RDS)
-#        (n, dummy) = self.lsstDB.executeSQL(sql)
-
-#        return n
-        return slewSpeeds
+        return (delay, rotator_skypos, rotator_telpos, altitude, azimuth, parallactic)
 
     def GetFilter(self):
         """
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+
+"""
+InstrumentBench
+
+Inherits from: object
+
+Class Description
+The InstrumentBench class measures the cost of the Instrument kinematic
+model outside of a full Simulator. It replays a sequence of pointings
+through an Instrument built without a DB connection and times every
+call to
+
+    InstrumentState.RaDec2AltAz
+    InstrumentState.AltAz2RaDec
+    InstrumentState.GetShortestDistanceWithWrap
+    Instrument.GetDelayForTarget
+    Instrument.GetSlewDelay
+    Instrument.Observe
+
+in the same order the scheduler uses them for the winner of a decision.
+
+A pointing sequence is one row per visit with the columns
+
+    date ra dec filter exptime
+
+with date in seconds since the simulation epoch, ra and dec in decimal
+degrees and exptime in seconds. Sequences can be generated from a seed,
+saved with WritePointings and replayed later with ReadPointings, so two
+versions of the code can be timed on exactly the same input.
+
+The report is a dictionary with the latency percentiles (microseconds)
+per call, the total throughput and a checksum of the computed delays,
+meant to be dumped as JSON with sorted keys and diffed between versions.
+
+===================================
+Interface methods
+
+- __init__
+- GeneratePointings
+- ReadPointings
+- WritePointings
+- Run
+"""
+
+from utilities import *
+from Database import *
+from Instrument import *
+import random
+import timeit
+
+DefaultBenchPointings = 5000
+
+# calls timed by Run, in the order they are made for each pointing
+BENCH_CALLS = ["RaDec2AltAz", "AltAz2RaDec", "GetShortestDistanceWithWrap",
+               "GetDelayForTarget", "GetSlewDelay", "Observe"]
+
+POINTING_COLUMNS = ["date", "ra", "dec", "filter", "exptime"]
+
+
+def percentile(sortedValues, p):
+    """
+    Nearest rank percentile p (0-100) of an already sorted list.
+    """
+    if len(sortedValues) == 0:
+        return 0.0
+    k = int(math.ceil(p / 100.0 * len(sortedValues))) - 1
+    return sortedValues[min(max(k, 0), len(sortedValues) - 1)]
+
+
+class InstrumentBench(object):
+    """
+    Replay of pointing sequences through a DB-less Instrument.
+    """
+    def __init__(self, instrumentConf=DefaultInstrumentConfigFile, siteConf=DefaultSiteConfigFile):
+        """
+        Standard initializer.
+
+        instrumentConf  Configuration file with parameters for Instrument.
+        siteConf        Site configuration file, for the observatory
+                        profile and the simulation epoch.
+        """
+        self.instrumentConf = instrumentConf
+        self.siteConf = siteConf
+
+        configDict, pairs = readConfFile(siteConf)
+        self.obsProfile = (configDict["longitude"] * DEG2RAD,
+                           configDict["latitude"] * DEG2RAD,
+                           configDict["height"],
+                           configDict["seeingEpoch"],
+                           configDict["pressure"],
+                           configDict["temperature"],
+                           configDict["relativeHumidity"])
+        self.simEpoch = configDict["seeingEpoch"]
+
+        self.lsstDB = Database(False, dbConnect=False)
+        self.instrument = self.newInstrument()
+
+        return
+
+    def newInstrument(self):
+        """
+        Build a parked Instrument with no DB.
+        """
+        return Instrument(self.lsstDB, 0, {}, self.obsProfile, self.instrumentConf, verbose=-1)
+
+    def dateProfile(self, date):
+        """
+        (date, mjd, lst_RAD) for date in seconds since the simulation epoch.
+        """
+        mjd = self.simEpoch + date / DAY
+        lst_RAD = self.instrument.current_state.Date2LSTrad(date)
+        return (date, mjd, lst_RAD)
+
+    def GeneratePointings(self, count=DefaultBenchPointings, seed=DefaultBenchSeed, exptime=34.0):
+        """
+        Reproducible synthetic pointing sequence.
+
+        The pointings are spread around the meridian at the time of each
+        visit, one visit every exptime plus a typical slew, with an
+        occasional filter change.
+
+        Input
+        count       number of pointings
+        seed        random seed
+        exptime     exposure time (seconds)
+
+        Return
+        list of (date, ra, dec, filter, exptime)
+        """
+        rnd = random.Random(seed)
+        filters = sorted(self.instrument.GetMountedFiltersList())
+        filter = self.instrument.GetFilter()
+
+        pointings = []
+        date = 0.0
+        for i in xrange(count):
+            lst_DEG = self.instrument.current_state.Date2LSTrad(date) * RAD2DEG
+            ra = divmod(lst_DEG + rnd.uniform(-60.0, 60.0), 360.0)[1]
+            dec = rnd.uniform(-85.0, 5.0)
+            if rnd.random() < 0.05:
+                filter = rnd.choice(filters)
+            pointings.append((date, ra, dec, filter, exptime))
+            date += exptime + rnd.uniform(5.0, 20.0)
+
+        return pointings
+
+    def ReadPointings(self, fileName):
+        """
+        Read a pointing sequence written by WritePointings. Lines starting
+        with '#' are skipped, columns are comma or blank separated.
+        """
+        pointings = []
+        for line in open(fileName):
+            line = line.strip()
+            if len(line) == 0 or line.startswith('#'):
+                continue
+            cols = line.replace(',', ' ').split()
+            if len(cols) != len(POINTING_COLUMNS):
+                raise IOError('bad pointing line in %s: %s' % (fileName, line))
+            pointings.append((float(cols[0]), float(cols[1]), float(cols[2]), cols[3], float(cols[4])))
+
+        return pointings
+
+    def WritePointings(self, pointings, fileName):
+        """
+        Write a pointing sequence that can be replayed with ReadPointings.
+        """
+        f = open(fileName, 'w')
+        f.write('#' + ','.join(POINTING_COLUMNS) + '\n')
+        for (date, ra, dec, filter, exptime) in pointings:
+            f.write('%r,%r,%r,%s,%r\n' % (date, ra, dec, filter, exptime))
+        f.close()
+
+        return
+
+    def Run(self, pointings):
+        """
+        Replay the pointings through a new parked Instrument.
+
+        Input
+        pointings   list of (date, ra, dec, filter, exptime)
+
+        Return
+        report dictionary
+        """
+        self.instrument = self.newInstrument()
+        inst = self.instrument
+        timer = timeit.default_timer
+
+        latency = {}
+        for call in BENCH_CALLS:
+            latency[call] = []
+
+        observed = 0
+        rejected = 0
+        delaySum = 0.0
+
+        t0 = timer()
+        for (date, ra, dec, filter, exptime) in pointings:
+            ra_RAD = ra * DEG2RAD
+            dec_RAD = dec * DEG2RAD
+            dateProfile = self.dateProfile(date)
+            state = inst.next_state
+
+            t = timer()
+            (alt_RAD, az_RAD, pa_RAD, ha_HOU) = state.RaDec2AltAz(ra_RAD, dec_RAD, date)
+            latency["RaDec2AltAz"].append(timer() - t)
+
+            t = timer()
+            state.AltAz2RaDec(alt_RAD, az_RAD, date)
+            latency["AltAz2RaDec"].append(timer() - t)
+
+            t = timer()
+            state.GetShortestDistanceWithWrap(az_RAD, state.TelAz_Pos_RAD, state.TelAz_MinPos_RAD,
+                                              state.TelAz_MaxPos_RAD)
+            latency["GetShortestDistanceWithWrap"].append(timer() - t)
+
+            t = timer()
+            delay = inst.GetDelayForTarget(ra_RAD, dec_RAD, dateProfile, exptime, filter)
+            latency["GetDelayForTarget"].append(timer() - t)
+
+            if delay < 0.0:
+                rejected += 1
+                continue
+
+            # targetposition was left set by GetDelayForTarget
+            t = timer()
+            inst.GetSlewDelay(inst.targetposition, state, allSlewData=True)
+            latency["GetSlewDelay"].append(timer() - t)
+
+            t = timer()
+            (slewdelay, rotator_skypos, rotator_telpos, altitude, azimuth, parallactic) = \
+                inst.Observe(ra_RAD, dec_RAD, dateProfile, exptime, filter, delay)
+            latency["Observe"].append(timer() - t)
+
+            # the slew records are not written anywhere
+            inst.slewBuffer.Clear()
+
+            observed += 1
+            delaySum += slewdelay
+        wall = timer() - t0
+
+        calls = {}
+        for call in BENCH_CALLS:
+            values = sorted(latency[call])
+            total = sum(values)
+            calls[call] = {"count": len(values),
+                           "total_s": total,
+                           "mean_us": 1e6 * total / max(len(values), 1),
+                           "p50_us": 1e6 * percentile(values, 50),
+                           "p90_us": 1e6 * percentile(values, 90),
+                           "p99_us": 1e6 * percentile(values, 99),
+                           "max_us": 1e6 * percentile(values, 100),
+                           "calls_per_s": len(values) / max(total, 1e-12)}
+
+        report = {"format": BENCH_FORMAT_VERSION,
+                  "instrumentConf": os.path.basename(self.instrumentConf),
+                  "siteConf": os.path.basename(self.siteConf),
+                  "pointings": len(pointings),
+                  "observed": observed,
+                  "rejected": rejected,
+                  "delay_sum_s": round(delaySum, 6),
+                  "calls": calls,
+                  "wall_s": wall,
+                  "pointings_per_s": len(pointings) / max(wall, 1e-12)}
+
+        return report
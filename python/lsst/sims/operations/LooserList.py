@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""
+LooserList
+
+Inherits from: object
+
+Class Description
+The suggestions of a proposal that were not among the n winners of
+the last decision. They are only looked at when the winner of the
+decision was not one of this proposal's winners (serendipity), and then
+only until the first match, so they are kept as a binary heap and the
+list is never sorted as a whole: iterating yields the loosers from the
+highest to the lowest rank, popping from a copy of the heap only as far
+as the caller goes. An optional materialize function is applied to each
+observation before it is yielded, so that proposals can defer filling
+the observation details until a looser is actually looked at.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+List interface
+- __len__
+- __iter__
+- remove
+"""
+
+import heapq
+
+
+class LooserList(object):
+    def __init__(self, heap=None, materialize=None):
+        """
+        Standard initializer.
+
+        heap        list of (-rank, observation) satisfying the heap
+                    invariant, as left by Proposal.getSuggestList.
+        materialize function called on each observation before it is
+                    yielded, returning the observation.
+        """
+        if heap is None:
+            heap = []
+        self.heap = heap
+        self.materialize = materialize
+
+        return
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        queue = list(self.heap)
+        while queue:
+            observation = heapq.heappop(queue)[1]
+            if self.materialize is not None:
+                observation = self.materialize(observation)
+            yield observation
+
+    def remove(self, observation):
+        """
+        Remove the highest ranked occurrence of observation.
+
+        Raise
+        ValueError if observation is not in the list.
+        """
+        index = None
+        for i in xrange(len(self.heap)):
+            if self.heap[i][1] == observation and (index is None or self.heap[i] < self.heap[index]):
+                index = i
+        if index is None:
+            raise ValueError('LooserList.remove(x): x not in list')
+
+        last = self.heap.pop()
+        if index < len(self.heap):
+            self.heap[index] = last
+            heapq.heapify(self.heap)
+
+        return
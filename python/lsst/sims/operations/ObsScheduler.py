@@ -33,6 +33,7 @@ Handle Proposal instances
 
 Record the observation
 - closeObservation
+- recordWinner
 """
 
 from utilities import *
@@ -40,8 +41,25 @@ from LSSTObject import *
 from Proposal import *
 from Observation import *
 from TimeHistory import *
+from FieldIndex import *
 import copy
 import heapq
+import numpy
+import time
+from multiprocessing.pool import ThreadPool
+
+# targetXblk value of the (field, filter) entries without exclusive block
+NO_XBLK = -1
+
+def timedSuggestObs(proposal, args):
+    """
+    Call proposal.suggestObs(*args).
+    Return (suggestions, elapsed seconds).
+    """
+    t0 = time.time()
+    targetObs = proposal.suggestObs(*args)
+    return (targetObs, time.time() - t0)
+
 
 class ObsScheduler(LSSTObject):
     def __init__(self, lsstDB, schedulingData, obsProfile, dbTableDict, telescope, weather, sky, filters,
@@ -113,8 +131,14 @@ class ObsScheduler(LSSTObject):
         self.targets = {}
         # self.targetProfiles = {}
 
-        self.targetRank = {}
-        self.targetXblk = {}
+        # Dense (field x filter) aggregation of the proposal ranks. Rows
+        # follow the sorted fieldIDs of self.targets and columns the sorted
+        # filter names, see buildTargetArrays().
+        self.filterNames = sorted(self.filters.filterNames)
+        self.filterColumn = {}
+        for k in range(len(self.filterNames)):
+            self.filterColumn[self.filterNames[k]] = k
+        self.buildTargetArrays()
         # self.masterTargets = {}
         self.winner = None
 
@@ -156,6 +180,72 @@ class ObsScheduler(LSSTObject):
         except:
             self.minDistance2Moon = 0.0
 
+        # Optional pruning of the candidates evaluated with the slew model:
+        # only the CandidatePruningTopK highest ranked candidates and the
+        # candidates within CandidatePruningRadius of the current telescope
+        # position go through GetDelayForTarget.
+        try:
+            self.candidatePruning = eval(str(config_dict["CandidatePruning"]))
+        except:
+            self.candidatePruning = False
+        try:
+            self.candidatePruningTopK = int(config_dict["CandidatePruningTopK"])
+        except:
+            self.candidatePruningTopK = 50
+        try:
+            self.candidatePruningRadius = float(config_dict["CandidatePruningRadius"]) * DEG2RAD
+        except:
+            self.candidatePruningRadius = 20.0 * DEG2RAD
+        # Audit mode also evaluates the full candidate list to count how
+        # often the pruning changed the winner.
+        try:
+            self.candidatePruningAudit = eval(str(config_dict["CandidatePruningAudit"]))
+        except:
+            self.candidatePruningAudit = False
+
+        # Optional concurrent evaluation of the proposals flagged with
+        # parallelSuggest, in a pool of ParallelProposalsThreads threads
+        # (default one per such proposal).
+        try:
+            self.parallelProposals = eval(str(config_dict["ParallelProposals"]))
+        except:
+            self.parallelProposals = False
+        try:
+            self.parallelProposalsThreads = int(config_dict["ParallelProposalsThreads"])
+        except:
+            self.parallelProposalsThreads = 0
+        self.proposalPool = None
+        # {propID: [suggestObs calls, seconds]}
+        self.proposalTiming = {}
+
+        # Incremental ranking instead of the reuseRankingCount counter:
+        # proposals are evaluated again only when the look-ahead tick, the
+        # seeing or the transparency change, or after an observation that
+        # affected them.
+        try:
+            self.incrementalRanking = eval(str(config_dict["IncrementalRanking"]))
+        except:
+            self.incrementalRanking = False
+        # {propID: (rows, cols, ranks, exclusive)} of the last suggestObs
+        self.proposalSuggestions = {}
+        self.dirtyProposals = set()
+        self.rankingTick = None
+        self.rankingTransparency = None
+        self.rankingExclusive = False
+        self.rankingStats = {'decisions': 0, 'full': 0, 'evaluated': 0, 'reused': 0}
+
+        self.fieldIndex = None
+        self.pruningStats = {'decisions': 0, 'candidates': 0, 'evaluated': 0, 'audited': 0,
+                             'winnerChanged': 0}
+        if self.candidatePruning:
+            sql = 'select fieldID,fieldRA,fieldDec from %s order by fieldID;' % (self.dbTableDict['field'])
+            (n, res) = self.lsstDB.executeSQL(sql)
+            self.fieldIndex = FieldIndex(res)
+            if self.log:
+                self.log.info("obsScheduler: candidate pruning topK=%d radius=%f deg fields=%d audit=%s" %
+                              (self.candidatePruningTopK, self.candidatePruningRadius * RAD2DEG,
+                               len(self.fieldIndex), self.candidatePruningAudit))
+
         return
 
     def startNight(self, dateProfile, moonProfile, startNewLunation, startNewYear, fov, nRun, nightCnt):
@@ -220,24 +310,73 @@ class ObsScheduler(LSSTObject):
                 # Notify all proposal of startYear Processing
                 proposal.startNewYear()
 
+        self.buildTargetArrays()
+
         self.schedulingData.startNight(dateProfile)
 
         return
 
+    def buildTargetArrays(self):
+        """
+        Index the fields in self.targets and allocate the rank matrices
+        targetRank (summed proposal rank), targetXblk (propID requiring
+        an exclusive block or NO_XBLK) and targetSeen (suggested at all).
+        """
+        fields = sorted(self.targets.iterkeys())
+        self.targetFieldID = numpy.array(fields, dtype=numpy.int64)
+        self.targetRow = {}
+        for row in range(len(fields)):
+            self.targetRow[fields[row]] = row
+        self.targetRA = [self.targets[fieldID][0] for fieldID in fields]
+        self.targetDec = [self.targets[fieldID][1] for fieldID in fields]
+
+        shape = (len(fields), len(self.filterNames))
+        self.targetRank = numpy.zeros(shape)
+        self.targetXblk = numpy.empty(shape, dtype=numpy.int64)
+        self.targetXblk.fill(NO_XBLK)
+        self.targetSeen = numpy.zeros(shape, dtype=bool)
+
+        # the stored suggestions refer to the previous rows
+        self.proposalSuggestions = {}
+        self.rankingTick = None
+
+        return
+
     # flush sky brightness cache and reset recalcSky to zero to
     # recalculate the sky for precise behavior regarding twilight
 
     def flushSkyCache(self):
         self.recalcSky = 0
+        self.rankingTick = None
         self.sky.skyBrightnessCache.clear()
 
     def startDay(self, moonProfile):
 
+        self.flushSlewRecords()
+
         self.moonProfile = moonProfile
         (moonRA_RAD, moonDec_RAD, moonPhase_PERCENT) = self.moonProfile
 
         if self.log:
             self.log.info('obsScheduler: startDay(): moonPhase=%f' % (moonPhase_PERCENT))
+            self.log.info('obsScheduler: startDay(): pointing cache hits=%d misses=%d' %
+                          (self.telescope.pointingCache.hits, self.telescope.pointingCache.misses))
+            for proposal in self.proposals_list:
+                if proposal.propID in self.proposalTiming:
+                    (calls, seconds) = self.proposalTiming[proposal.propID]
+                    self.log.info('obsScheduler: startDay(): propID=%d %s suggestObs calls=%d time=%.3fs' %
+                                  (proposal.propID, proposal.propFullName, calls, seconds))
+            if self.incrementalRanking:
+                stats = self.rankingStats
+                self.log.info('obsScheduler: startDay(): ranking decisions=%d full=%d evaluated=%d '
+                              'reused=%d' % (stats['decisions'], stats['full'], stats['evaluated'],
+                                             stats['reused']))
+            if self.candidatePruning:
+                stats = self.pruningStats
+                self.log.info('obsScheduler: startDay(): pruning decisions=%d candidates=%d evaluated=%d '
+                              'audited=%d winnerChanged=%d' % (stats['decisions'], stats['candidates'],
+                                                               stats['evaluated'], stats['audited'],
+                                                               stats['winnerChanged']))
 
         if self.NewMoonPeriod:
             if moonPhase_PERCENT > self.NewMoonPhaseThreshold:
@@ -390,26 +529,13 @@ class ObsScheduler(LSSTObject):
         (sdnight, sdtime) = self.schedulingData.findNightAndTime(date)
 
         #	self.log.info("ObsScheduler:suggestObservation: reuseRanking=%d" % self.reuseRanking)
-        if self.reuseRanking <= 0:
-            # Dictionary of {fieldID: {filter: totRank}}
-            self.targetRank = {}
-            self.targetXblk = {}
+        if self.incrementalRanking:
+            self.updateRanking(date, sdnight, sdtime)
 
+        elif self.reuseRanking <= 0:
             # Recompute sky data?
             if self.recalcSky <= 0:
-                # Fetch raw seeing data
-                seeing = self.weather.getSeeing(date)
-                self.rawSeeing = seeing
-
-                # Adjust seeing if too good to be true
-                if seeing < self.tooGoodSeeingLimit:
-                    if self.log:
-                        self.log.info("obsScheduler:suggestObservation: seeing (%f) too good, reset to %f "
-                                      "date:%d." % (seeing, self.tooGoodSeeingLimit, date))
-                    seeing = self.tooGoodSeeingLimit
-
-                # factor in the seeing fudge for the weather data supplied
-                self.seeing = seeing * self.runSeeingFudge
+                self.updateSeeing(date)
 
                 # Compute sky quantities for each field
                 # self.targetProfiles = map (self.computeTargetProfiles, self.targets)
@@ -429,53 +555,9 @@ class ObsScheduler(LSSTObject):
             #                                    (dateProfile)
             # proximity = distance((ra_RAD,dec_RAD), sortedFieldRaDec)
 
-            totPotentialTargets = 0
-
-            for proposal in self.proposals_list:
-                if not proposal.IsActive(date, self.nightCnt):
-                    continue
-
-                # note: since proximity is ordered accd sortedFieldID--need to
-                #       pass that array instead of self.targets.
-                targetObs = proposal.suggestObs(self.dateProfile, self.numSuggObsPerProp, self.exclusiveObs,
-                                                self.minDistance2Moon, self.rawSeeing, self.seeing,
-                                                self.transparency, sdnight, sdtime)
-                if not targetObs:
-                    continue
-
-                self.expTime = proposal.exposureTime
-                propID = proposal.propID
-
-                for obs in targetObs:
-                    fieldID = obs.fieldID
-                    rank = obs.propRank
-                    filter = obs.filter
-
-                    # self.log.info("ObsScheduler.suggestObservations(): propID=%d fieldID=%d rank=%f "
-                    #               "filter=%s exclusive=%s" % (propID, fieldID, rank, filter,
-                    #                                           obs.exclusiveBlockRequired))
-
-                    ra = obs.ra
-                    dec = obs.dec
-                    if obs.exclusiveBlockRequired:
-                        propIDforXblk = propID
-                    else:
-                        propIDforXblk = None
-
-                    if fieldID not in self.targetRank:
-                        self.targetRank[fieldID] = {filter: rank}
-                        self.targetXblk[fieldID] = {filter: propIDforXblk}
-                        totPotentialTargets += 1
-                    else:
-                        if filter not in self.targetRank[fieldID]:
-                            self.targetRank[fieldID][filter] = rank
-                            self.targetXblk[fieldID][filter] = propIDforXblk
-                            totPotentialTargets += 1
-                        else:
-                            self.targetRank[fieldID][filter] += rank
-                            if propIDforXblk is not None:
-                                self.targetXblk[fieldID][filter] = propIDforXblk
-
+            proposals = [p for p in self.proposals_list if p.IsActive(date, self.nightCnt)]
+            self.storeSuggestions(proposals, self.evaluateProposals(proposals, sdnight, sdtime))
+            totPotentialTargets = self.aggregateRanks(proposals)
 #          self.log.info("totPotentialTargets = %d" % totPotentialTargets)
 
             if totPotentialTargets == 0:
@@ -488,45 +570,36 @@ class ObsScheduler(LSSTObject):
                 self.reuseRanking = self.reuseRankingCount
 
         # Choose the best target (taking slew time into consideration)
-        maxrank = 0
         self.winner = None
         t = 0
         s = 0
 
-        fields = sorted(self.targetRank.iterkeys())
-        for fieldID in fields:
-            keyList = sorted(self.targetRank[fieldID].iterkeys())
-            for key in keyList:
-                rank = self.targetRank[fieldID][key]
-                if rank <= 0.0:
-                    continue
-                filter = key
-                expTime = float(self.expTime)
-                propIDforXblk = self.targetXblk[fieldID][filter]
-                ra = self.targets[fieldID][0]
-                dec = self.targets[fieldID][1]
-
-                # Compute slew time
-                slewTime = self.telescope.GetDelayForTarget(ra_RAD=ra * DEG2RAD, dec_RAD=dec * DEG2RAD,
-                                                            dateProfile=self.dateProfile,
-                                                            exposureTime=expTime, filter=filter)
-                # slewTime <0 means an invalid position for the telescope
-                #                       too low or too close to zenith
-                if slewTime >= 0.0:
-                    # Now, divide the field rank by the slew time
-                    slewRank = rank + self.maxSlewTimeBonus * max(44.0 / (slewTime + 40.0) - 0.1, 0.0)
-                    # self.log.info("candidate fieldID=%s filter=%s rank=%f slewTime=%f slewRank=%f" %
-                    #               (fieldID, filter, rank, slewTime, slewRank))
-                    if slewRank > maxrank:
-                        maxrank = slewRank
-                        # Save current winner details for later Obs instan
-                        win_slewTime = slewTime
-                        win_exposureTime = expTime
-                        win_fieldID = int(fieldID)
-                        win_filter = filter
-                        win_propXblk = propIDforXblk
-                        win_ra = ra
-                        win_dec = dec
+        # (row, column) of the candidates, ordered by fieldID and filter
+        candidates = numpy.nonzero(self.targetRank > 0.0)
+
+        if self.candidatePruning:
+            evaluated = self.pruneCandidates(candidates)
+        else:
+            evaluated = candidates
+
+        (maxrank, win) = self.rankCandidates(evaluated)
+
+        if self.candidatePruning:
+            self.pruningStats['decisions'] += 1
+            self.pruningStats['candidates'] += len(candidates[0])
+            self.pruningStats['evaluated'] += len(evaluated[0])
+            if self.candidatePruningAudit and len(evaluated[0]) < len(candidates[0]):
+                self.pruningStats['audited'] += 1
+                (fullrank, fullwin) = self.rankCandidates(candidates)
+                if (fullwin is not None) and (win is None or fullwin[2:4] != win[2:4]):
+                    self.pruningStats['winnerChanged'] += 1
+                    if self.log and self.verbose > 1:
+                        self.log.info("obsScheduler:suggestObservation: pruning changed winner date=%d "
+                                      "full=%s rank=%f pruned=%s rank=%f" % (date, str(fullwin[2:4]),
+                                                                             fullrank, str(win and win[2:4]),
+                                                                             maxrank))
+        if win is not None:
+            (win_slewTime, win_exposureTime, win_fieldID, win_filter, win_propXblk, win_ra, win_dec) = win
 
         # Return the best ranking
         if maxrank > 0:
@@ -562,6 +635,237 @@ class ObsScheduler(LSSTObject):
         # return (maxrank, t, s)
         return self.winner
 
+    def updateSeeing(self, date):
+        """
+        Fetch the seeing for date into self.rawSeeing and self.seeing.
+        """
+        # Fetch raw seeing data
+        seeing = self.weather.getSeeing(date)
+        self.rawSeeing = seeing
+
+        # Adjust seeing if too good to be true
+        if seeing < self.tooGoodSeeingLimit:
+            if self.log:
+                self.log.info("obsScheduler:suggestObservation: seeing (%f) too good, reset to %f "
+                              "date:%d." % (seeing, self.tooGoodSeeingLimit, date))
+            seeing = self.tooGoodSeeingLimit
+
+        # factor in the seeing fudge for the weather data supplied
+        self.seeing = seeing * self.runSeeingFudge
+
+        return
+
+    def updateRanking(self, date, sdnight, sdtime):
+        """
+        Incremental ranking. All the active proposals are evaluated again
+        when the look-ahead tick sdtime, the seeing or the transparency
+        changed, or around exclusive blocks. Otherwise only the proposals
+        marked dirty by closeObservation (or not evaluated yet) are, and
+        the suggestions of the others are reused.
+        """
+        rawSeeing = self.weather.getSeeing(date)
+        full = (sdtime != self.rankingTick or rawSeeing != self.rawSeeing or
+                self.transparency != self.rankingTransparency or
+                self.exclusiveObs is not None or self.rankingExclusive)
+        if full:
+            self.updateSeeing(date)
+            self.rankingTick = sdtime
+            self.rankingTransparency = self.transparency
+
+        proposals = [p for p in self.proposals_list if p.IsActive(date, self.nightCnt)]
+        if full:
+            evaluate = proposals
+        else:
+            evaluate = [p for p in proposals
+                        if p.propID in self.dirtyProposals or p.propID not in self.proposalSuggestions]
+        self.storeSuggestions(evaluate, self.evaluateProposals(evaluate, sdnight, sdtime))
+        self.dirtyProposals = set()
+        self.rankingExclusive = self.exclusiveObs is not None
+
+        self.rankingStats['decisions'] += 1
+        self.rankingStats['full'] += int(full)
+        self.rankingStats['evaluated'] += len(evaluate)
+        self.rankingStats['reused'] += len(proposals) - len(evaluate)
+
+        if self.aggregateRanks(proposals) == 0:
+            if self.log:
+                self.log.info("obsScheduler:suggestObservation: No suggestions from proposals")
+
+        return
+
+    def storeSuggestions(self, proposals, suggestions):
+        """
+        Keep the suggestions of each proposal as (rows, columns, ranks,
+        exclusive) arrays over the rank matrices.
+        """
+        for k in range(len(proposals)):
+            rows = []
+            cols = []
+            ranks = []
+            xblk = []
+            for obs in suggestions[k] or []:
+                # self.log.info("ObsScheduler.suggestObservations(): propID=%d fieldID=%d rank=%f "
+                #               "filter=%s exclusive=%s" % (propID, obs.fieldID, obs.propRank,
+                #                                           obs.filter, obs.exclusiveBlockRequired))
+                rows.append(self.targetRow[obs.fieldID])
+                cols.append(self.filterColumn[obs.filter])
+                ranks.append(obs.propRank)
+                xblk.append(obs.exclusiveBlockRequired)
+            self.proposalSuggestions[proposals[k].propID] = (numpy.array(rows, dtype=numpy.int64),
+                                                             numpy.array(cols, dtype=numpy.int64),
+                                                             numpy.array(ranks, dtype=float),
+                                                             numpy.array(xblk, dtype=bool))
+
+        return
+
+    def aggregateRanks(self, proposals):
+        """
+        Rebuild the rank matrices from the stored suggestions of the given
+        proposals. The suggestions are scatter-added in proposal and
+        suggestion order, so the sums are the same as adding them one by
+        one.
+
+        Return
+            number of (field, filter) entries suggested
+        """
+        # (field x filter) matrices of total rank and exclusive block
+        self.targetRank.fill(0.0)
+        self.targetXblk.fill(NO_XBLK)
+        self.targetSeen.fill(False)
+
+        for proposal in proposals:
+            (rows, cols, ranks, xblk) = self.proposalSuggestions[proposal.propID]
+            if len(rows) == 0:
+                continue
+
+            self.expTime = proposal.exposureTime
+            numpy.add.at(self.targetRank, (rows, cols), ranks)
+            self.targetSeen[rows, cols] = True
+            if xblk.any():
+                self.targetXblk[rows[xblk], cols[xblk]] = proposal.propID
+
+        return int(numpy.count_nonzero(self.targetSeen))
+
+    def evaluateProposals(self, proposals, sdnight, sdtime):
+        """
+        Collect the suggestions of the given proposals for the current
+        decision. With ParallelProposals the proposals flagged with
+        parallelSuggest run in the thread pool while the others run in
+        this thread, in order.
+
+        Return
+            list of the suggestObs results, in the order of proposals
+        """
+        args = (self.dateProfile, self.numSuggObsPerProp, self.exclusiveObs, self.minDistance2Moon,
+                self.rawSeeing, self.seeing, self.transparency, sdnight, sdtime)
+
+        pending = {}
+        if self.parallelProposals:
+            for k in range(len(proposals)):
+                if proposals[k].parallelSuggest:
+                    pending[k] = self.getProposalPool().apply_async(timedSuggestObs, (proposals[k], args))
+
+        results = [None] * len(proposals)
+        for k in range(len(proposals)):
+            if k not in pending:
+                results[k] = timedSuggestObs(proposals[k], args)
+        for k in pending:
+            results[k] = pending[k].get()
+
+        suggestions = []
+        for k in range(len(proposals)):
+            (targetObs, seconds) = results[k]
+            timing = self.proposalTiming.setdefault(proposals[k].propID, [0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            suggestions.append(targetObs)
+
+        return suggestions
+
+    def getProposalPool(self):
+        """
+        Thread pool for evaluateProposals, created on first use.
+        """
+        if self.proposalPool is None:
+            threads = self.parallelProposalsThreads
+            if threads <= 0:
+                threads = max(len([p for p in self.proposals_list if p.parallelSuggest]), 1)
+            self.proposalPool = ThreadPool(threads)
+            if self.log:
+                self.log.info("obsScheduler: parallel proposal evaluation threads=%d" % (threads))
+
+        return self.proposalPool
+
+    def rankCandidates(self, candidates):
+        """
+        Combine the proposal rank of each candidate with the slew time
+        bonus and find the best one.
+
+        Input
+            candidates  (rows, columns) arrays of the candidates in
+                        self.targetRank, in evaluation order.
+
+        Return
+            (maxrank, winner) where winner is None or
+            (slewTime, exposureTime, fieldID, filter, propIDforXblk, ra, dec)
+        """
+        (rows, cols) = candidates
+        if len(rows) == 0:
+            return (0, None)
+
+        expTime = float(self.expTime)
+        slewTime = numpy.empty(len(rows))
+        k = 0
+        for (row, col) in zip(rows.tolist(), cols.tolist()):
+            # Compute slew time
+            slewTime[k] = self.telescope.GetDelayForTarget(ra_RAD=self.targetRA[row] * DEG2RAD,
+                                                           dec_RAD=self.targetDec[row] * DEG2RAD,
+                                                           dateProfile=self.dateProfile,
+                                                           exposureTime=expTime, filter=self.filterNames[col])
+            k += 1
+
+        # Now, add the slew time bonus to the field rank.
+        # slewTime <0 means an invalid position for the telescope
+        #                       too low or too close to zenith
+        slewRank = self.targetRank[rows, cols] + self.maxSlewTimeBonus * numpy.maximum(
+            44.0 / (slewTime + 40.0) - 0.1, 0.0)
+        slewRank[slewTime < 0.0] = 0.0
+
+        # argmax keeps the first candidate among equal ranks
+        k = int(numpy.argmax(slewRank))
+        if not slewRank[k] > 0:
+            return (0, None)
+
+        (row, col) = (rows[k], cols[k])
+        propIDforXblk = int(self.targetXblk[row, col])
+        if propIDforXblk == NO_XBLK:
+            propIDforXblk = None
+        winner = (float(slewTime[k]), expTime, int(self.targetFieldID[row]), self.filterNames[col],
+                  propIDforXblk, self.targetRA[row], self.targetDec[row])
+
+        return (float(slewRank[k]), winner)
+
+    def pruneCandidates(self, candidates):
+        """
+        Reduce the candidates to the CandidatePruningTopK highest ranked
+        ones plus all the candidates whose field is within
+        CandidatePruningRadius of the current telescope position.
+        The evaluation order of the kept candidates is preserved.
+        """
+        (rows, cols) = candidates
+        if len(rows) <= self.candidatePruningTopK:
+            return candidates
+
+        keep = numpy.zeros(len(rows), dtype=bool)
+        # stable sort, equal ranks keep their evaluation order
+        keep[numpy.argsort(-self.targetRank[rows, cols], kind='mergesort')[:self.candidatePruningTopK]] = True
+        (ra_RAD, dec_RAD) = self.telescope.GetCurrentTelescopePosition(self.dateProfile)
+        near = self.fieldIndex.fieldsWithin(ra_RAD, dec_RAD, self.candidatePruningRadius)
+        if near:
+            keep |= numpy.in1d(self.targetFieldID[rows], numpy.array(list(near), dtype=numpy.int64))
+
+        return (rows[keep], cols[keep])
+
 #    def computeTargetProfiles (self, fieldID):
         """
         Precompute quantities relating to a Field for subsequent use
@@ -614,11 +918,11 @@ class ObsScheduler(LSSTObject):
         Needs to pass along the required slew time since not embeded in Obs
         """
         # Move the telescope
-        (delay, rotatorSkyPos_RAD, rotatorTelPos_RAD, alt_RAD, az_RAD, slewdata,
-            slewinitstate, slewfinalstate, slewmaxspeeds,
-            listslewactivities) = self.telescope.Observe(winner.ra * DEG2RAD, winner.dec * DEG2RAD,
-                                                         self.dateProfile, winner.exposureTime,
-                                                         winner.filter, winner.slewTime)
+        (delay, rotatorSkyPos_RAD, rotatorTelPos_RAD, alt_RAD, az_RAD,
+            pa_RAD) = self.telescope.Observe(winner.ra * DEG2RAD, winner.dec * DEG2RAD, self.dateProfile,
+                                             winner.exposureTime, winner.filter, winner.slewTime)
+        # the slew records stay in telescope.slewBuffer until flushSlewRecords()
+        slewCount = self.telescope.slewCount
         #print "SUCCESS: delay:%f rotSkyPos:%f rotTelPos:%f" % (delay,rotator_skypos_RAD,rotator_telpos_RAD)
 
         # MM - debug error check
@@ -631,7 +935,7 @@ class ObsScheduler(LSSTObject):
         winner.rotatorTelPos = rotatorTelPos_RAD
         winner.altitude = alt_RAD
         winner.azimuth = az_RAD
-        winner.parallactic = slewfinalstate.pa
+        winner.parallactic = pa_RAD
 
         (sunAlt, sunAz) = self.sky.getSunAltAz(self.dateProfile)
         winner.airmass = 1 / math.cos(1.5708 - alt_RAD)
@@ -681,7 +985,7 @@ class ObsScheduler(LSSTObject):
         winner.visitTime = round(winner.exposureTime) - 4.0
 
         self.log.info("visit=%i night=%i date=%i field=%i filter=%s expTime=%f visitTime=%f lst=%f" %
-                      (slewdata.slewCount, winner.night, winner.date, winner.fieldID, winner.filter,
+                      (slewCount, winner.night, winner.date, winner.fieldID, winner.filter,
                        winner.exposureTime, winner.visitTime, winner.lst))
         self.log.info("    finRank=%f airmass=%f brightness=%f filtBright=%f rawSeeing=%f seeing=%f" %
                       (winner.finRank, winner.airmass, winner.skyBrightness, winner.filterSkyBright,
@@ -694,7 +998,7 @@ class ObsScheduler(LSSTObject):
                        winner.moonBright, winner.darkBright))
 
         # need to ask Francisco about rawSeeing, sending 0.0 right now and also about wind and humidity
-        obsHist = self.lsstDB.addObservation(slewdata.slewCount, winner.filter, winner.date, winner.mjd,
+        obsHist = self.lsstDB.addObservation(slewCount, winner.filter, winner.date, winner.mjd,
                                              winner.night, winner.visitTime, winner.exposureTime,
                                              winner.finRank, winner.seeing, winner.transparency,
                                              winner.airmass, winner.skyBrightness, winner.filterSkyBright,
@@ -705,26 +1009,21 @@ class ObsScheduler(LSSTObject):
                                              winner.phaseAngle, winner.rScatter, winner.mieScatter,
                                              winner.moonIllum, winner.moonBright, winner.darkBright,
                                              winner.rawSeeing, 0.0, 0.0, self.sessionID, winner.fieldID)
-        slewHist = self.lsstDB.addSlewHistory(slewdata.slewCount, slewdata.startDate, slewdata.endDate,
-                                              slewdata.slewTime, slewdata.slewDist, obsHist.obsHistID,
-                                              obsHist.Session_sessionID)
-
-        self.lsstDB.addSlewState(slewinitstate.slewStateDate, slewinitstate.tra, slewinitstate.tdec,
-                                 slewinitstate.tracking, slewinitstate.alt, slewinitstate.az,
-                                 slewinitstate.pa, slewinitstate.DomAlt, slewinitstate.DomAz,
-                                 slewinitstate.TelAlt, slewinitstate.TelAz, slewinitstate.RotTelPos,
-                                 slewinitstate.Filter, slewinitstate.state, slewHist.slewID)
-        self.lsstDB.addSlewState(slewfinalstate.slewStateDate, slewfinalstate.tra, slewfinalstate.tdec,
-                                 slewfinalstate.tracking, slewfinalstate.alt, slewfinalstate.az,
-                                 slewfinalstate.pa, slewfinalstate.DomAlt, slewfinalstate.DomAz,
-                                 slewfinalstate.TelAlt, slewfinalstate.TelAz, slewfinalstate.RotTelPos,
-                                 slewfinalstate.Filter, slewfinalstate.state, slewHist.slewID)
-
-        self.lsstDB.addSlewMaxSpeeds(slewmaxspeeds.DomAltSpd, slewmaxspeeds.DomAzSpd, slewmaxspeeds.TelAltSpd,
-                                     slewmaxspeeds.TelAzSpd, slewmaxspeeds.RotSpd, slewHist.slewID)
-
-        for act in listslewactivities:
-            self.lsstDB.addSlewActivities(act.activity, act.actDelay, act.inCriticalPath, slewHist.slewID)
+
+        self.recordWinner(winner, obsHist.obsHistID)
+
+        return
+
+    def recordWinner(self, winner, obsHistID):
+        """
+        Notify the active proposals that the winner observation took
+        place and take it out of the rank matrices.
+
+        Input
+            winner      the observed Observation
+            obsHistID   its ObsHistory key
+        """
+        (date, mjd, lst_RAD) = self.dateProfile
 
         # Take observation. Delete winning Field/Filters from masterTargets.
         # Could reset rank to 0.0 as done previously.  Let's see if this works.
@@ -732,8 +1031,13 @@ class ObsScheduler(LSSTObject):
 
         for proposal in self.proposals_list:
             if proposal.IsActive(date, self.nightCnt):
-                # obs = proposal.closeObservation(winner, obsHist.obsHistID, self.twilightProfile)
-                proposal.closeObservation(winner, obsHist.obsHistID, self.twilightProfile)
+                # obs = proposal.closeObservation(winner, obsHistID, self.twilightProfile)
+                proposal.closeObservation(winner, obsHistID, self.twilightProfile)
+
+                # the proposals that took the observation or that do not
+                # accept consecutive visits must be evaluated again
+                if proposal.last_observed_wasForThisProposal or not proposal.AcceptConsecutiveObs:
+                    self.dirtyProposals.add(proposal.propID)
 
                 # print "ObsScheduler.closeObs(): In proposal?: fieldID: %d date: %d propID: %d" % \
                 #     (self.winner.fieldID, t, proposal.propID)
@@ -746,7 +1050,12 @@ class ObsScheduler(LSSTObject):
                 # # serendipitious obs will not be in proposal top targets
                 #                    if fieldFilter in self.masterTargets[obs.propID]:
                 #                        del self.masterTargets[obs.propID][fieldFilter]
-        self.targetRank[winner.fieldID][winner.filter] = 0.0
+        (row, col) = (self.targetRow[winner.fieldID], self.filterColumn[winner.filter])
+        self.targetRank[row, col] = 0.0
+        if self.incrementalRanking:
+            # nor the reused suggestions propose the winner again
+            for (rows, cols, ranks, xblk) in self.proposalSuggestions.itervalues():
+                ranks[(rows == row) & (cols == col)] = 0.0
 
         return
 
@@ -841,4 +1150,22 @@ class ObsScheduler(LSSTObject):
         #	for proposal in self.interProposalRank.keys ():
         for proposal in self.proposals_list:
             proposal.closeProposal(time)
+
+        if self.proposalPool is not None:
+            self.proposalPool.close()
+            self.proposalPool.join()
+            self.proposalPool = None
+
+        self.flushSlewRecords()
+        return
+
+    def flushSlewRecords(self):
+        """
+        Write the slew records buffered by the telescope since the last
+        flush to the DB in bulk.
+        """
+        if self.log and self.verbose > 0:
+            self.log.info('obsScheduler: flushSlewRecords(): %d slews' % (len(self.telescope.slewBuffer)))
+
+        self.lsstDB.addSlewBuffer(self.telescope.slewBuffer, self.sessionID)
         return
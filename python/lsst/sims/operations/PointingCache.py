@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+PointingCache
+
+Inherits from: object
+
+Class Description
+Per-decision cache of the horizontal coordinates of sky positions.
+During a scheduling decision the same (ra, dec) is converted to
+(alt, az, pa) several times: once per candidate filter in
+Instrument.GetDelayForTarget, and again for the winner in
+Instrument.Observe. The cache keeps the pal.altaz results for the
+current local sidereal time and is emptied as soon as a different
+time is requested, so it never grows beyond one decision.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Lookups
+- GetAltAzPa
+- Clear
+"""
+
+import palpy as pal
+
+
+class PointingCache(object):
+    def __init__(self, latitude_RAD):
+        """
+        Standard initializer.
+
+        latitude_RAD    latitude of the observatory (radians)
+        """
+        self.latitude_RAD = latitude_RAD
+        self.lst_RAD = None
+        self.pointings = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        return
+
+    def GetAltAzPa(self, ra_RAD, dec_RAD, dateProfile):
+        """
+        Horizontal coordinates of a sky position.
+
+        Input
+            ra_RAD          right ascension (radians)
+            dec_RAD         declination (radians)
+            dateProfile     (date, mjd, lst_RAD)
+
+        Return
+            (alt_RAD, az_RAD, pa_RAD) as returned by pal.altaz
+        """
+        (date, mjd, lst_RAD) = dateProfile
+        if lst_RAD != self.lst_RAD:
+            self.lst_RAD = lst_RAD
+            self.pointings = {}
+
+        key = (ra_RAD, dec_RAD)
+        try:
+            pointing = self.pointings[key]
+            self.hits += 1
+        except KeyError:
+            (az_RAD, d1, d2, alt_RAD, d4, d5, pa_RAD, d7, d8) = pal.altaz(lst_RAD - ra_RAD, dec_RAD,
+                                                                          self.latitude_RAD)
+            pointing = (alt_RAD, az_RAD, pa_RAD)
+            self.pointings[key] = pointing
+            self.misses += 1
+
+        return pointing
+
+    def Clear(self):
+        """
+        Drop the cached pointings.
+        """
+        self.lst_RAD = None
+        self.pointings = {}
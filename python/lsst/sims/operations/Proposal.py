@@ -93,8 +93,11 @@ from ObsHistory import *
 from MissedHistory import *
 from Distribution import *
 from Sequence import *
+from LooserList import *
+from FieldCatalog import *
 
 import heapq
+import numpy
 
 #skyBrightKeys = [0, 18, 50, 80, 100]
 #filterOffset = { }
@@ -185,6 +188,13 @@ class Proposal(object):
         self.logfile = logfile
         self.verbose = verbose
 
+        # True if suggestObs only reads shared objects and writes nothing
+        # to the DB, so that ObsScheduler can run it in a worker thread.
+        self.parallelSuggest = False
+
+        # in-memory copy of the fields of the proposal, see getFieldCatalog
+        self.fieldCatalog = None
+
         self.missedHistory = MissedHistory(lsstDB=self.lsstDB, dbTableDict=self.dbTableDict, log=self.log,
                                            logfile=self.logfile, verbose=self.verbose)
 
@@ -357,47 +367,24 @@ class Proposal(object):
 
     def buildUserRegionDB(self, regions, fieldTable):
         """
-        Build a short-term DB containing a user-specified subset of the FieldDB.
-        The DB table will need to be deleted at the end of the run or during
-        a subsequent garbage collection run on the DB.
+        Build the in-memory subset of the FieldDB covering user-specified
+        regions: for each region, the closest field overlapping it.
 
         Input
-            regions     list of (ra,dec,diameter) defining cone of interest for
-                        a user defined region. All parameters are radians.
+            regions     list of "ra,dec,diameter" strings defining the cone
+                        of interest of a user defined region. All
+                        parameters are degrees.
 
             fieldTable  base Field DB table from which to draw the overlapping
                         fields
 
         Output
-            tablename   temporary Field DB table name
-        """
-
-        # Create short-term overlappingField table
-        overlappingField = "OlapField_%d_%d" % (self.sessionID, self.propID)
-        # sql = 'drop table if exists %s; ' %(overlappingField)
-        # print sql
-        # # Send the SQL commmand to the DB
-        # (n, res) = self.lsstDB.executeSQL (sql)
-
-        # sql = 'create table %s (fieldID int unsigned not null primary key,' % (overlappingField)
-        # sql += 'fieldFov float NOT NULL,fieldRA float NOT NULL,fieldDec float NOT NULL,fieldGL float NOT '\
-        #        'NULL,fieldGB float NOT NULL,fieldEL float NOT NULL,fieldEB float NOT NULL);'
-        # # Send the SQL commmand to the DB
-        # (n, res) = self.lsstDB.executeSQL(sql)
-
-        olapTable = self.lsstDB.createOlapTable(overlappingField)
-
-        # Load entire FieldDB in-core
-        sql = 'select fieldID,fieldFov,fieldRA,fieldDec,fieldGL,fieldGB,fieldEL,fieldEB from %s order by '\
-              'fieldID;' % (fieldTable)
-        # Send the SQL commmand to the DB
-        (n, res) = self.lsstDB.executeSQL(sql)
-
-        # for each entry in regions:
-        #       parse into components,
-        #ra_rad = []
-        #dec_rad = []
-        #diameter_div2_rad = []
+            catalog     FieldCatalog of the overlapping fields
+        """
+        # Entire FieldDB in-core
+        catalog = self.lsstDB.getFieldCatalog(fieldTable)
+
+        mask = numpy.zeros(len(catalog), dtype=bool)
         for k in range(len(regions)):
             ra_deg, dec_deg, diameter_deg = regions[k].split(',', 3)
 
@@ -405,32 +392,25 @@ class Proposal(object):
             dec_rad = float(dec_deg) * DEG2RAD
             diameter_div2_rad = float(diameter_deg) * DEG2RAD / 2
 
-            # for each entry in FieldDB
-            closestField = None
-            closestDistance = None
-            for (id, fov, ra, dec, gl, gb, el, eb) in res:
-                # convert (ra,dec) to radians
-                ofRa = ra * DEG2RAD
-                ofDec = dec * DEG2RAD
-                # Create distance measure to determine overlapping region&field
-                ofFov_div2 = fov * DEG2RAD / 2
-
-                distance = dist(ra_rad, dec_rad, ofRa, ofDec)
-                if distance < (ofFov_div2 + diameter_div2_rad):
-                    if closestDistance is None:
-                        closestDistance = distance
-                        closestField = (id, fov, ra, dec, gl, gb, el, eb)
-                    else:
-                        if distance < closestDistance:
-                            closestDistance = distance
-                            closestField = (id, fov, ra, dec, gl, gb, el, eb)
-
-            if closestField is not None:
-                (id, fov, ra, dec, gl, gb, el, eb) = closestField
-                self.lsstDB.addOlap(olapTable, id, fov, ra, dec, gl, gb, el, eb)
-                self.log.info('Proposal: buildUserRegionDB(): Field=%i, RA=%f DEC=%f' % (id, ra, dec))
-
-        return olapTable
+            closest = catalog.closestOverlapping(ra_rad, dec_rad, diameter_div2_rad)
+            if closest is not None:
+                mask[closest] = True
+                if self.log:
+                    self.log.info('Proposal: buildUserRegionDB(): Field=%i, RA=%f DEC=%f' %
+                                  (catalog.fieldID[closest], catalog.ra[closest], catalog.dec[closest]))
+
+        return catalog.subset(mask)
+
+    def getFieldCatalog(self):
+        """
+        Return the FieldCatalog of the fields of this proposal: the user
+        regions if any (see buildUserRegionDB), otherwise the Field table
+        self.dbField, read from the DB the first time only.
+        """
+        if self.fieldCatalog is None:
+            self.fieldCatalog = self.lsstDB.getFieldCatalog(self.dbField)
+
+        return self.fieldCatalog
 
     def getPropID(self):
         """
@@ -915,33 +895,44 @@ class Proposal(object):
         # Add the relative proposal priority coefficient.
         observation.propRank *= self.relativeProposalPriority
 
-        # Add it to queue (heappush places min on top, so invert rank)
-        heapq.heappush(self.queue, (-rankInternal, observation))
+        # Add it to queue (the heap places min on top, so invert rank).
+        # The heap is only built by getSuggestList.
+        self.queue.append((-rankInternal, observation))
 
         return
 
+    def materializeSuggestion(self, observation):
+        """
+        Hook for the proposals that queue their suggestions before filling
+        in the Observation details, called on the winners and on the
+        loosers that are looked at. Return the observation.
+        """
+        return observation
+
     def getSuggestList(self, n=1):
 
         # Choose the n highest ranking observations
 
-        self.winners = []
-        for i in range(n):
-            try:
-                self.winners.append(heapq.heappop(self.queue)[1])
-                if self.log and self.verbose > 1:
-                    self.log.info('Proposal: suggestObs() propID=%d field=%i propRank=%.2f' %
-                                  (self.propID, self.winners[-1].fieldID, self.winners[-1].propRank))
-            except:
-                break
+        if self.AcceptSerendipity:
+            # heapify is linear, then only the winners are popped and the
+            # rest of the heap is kept unsorted as the loosers
+            heapq.heapify(self.queue)
+            self.winners = []
+            for i in range(min(n, len(self.queue))):
+                self.winners.append(self.materializeSuggestion(heapq.heappop(self.queue)[1]))
+            self.loosers = LooserList(self.queue, self.materializeSuggestion)
+        else:
+            self.winners = [self.materializeSuggestion(o) for (rank, o) in heapq.nsmallest(n, self.queue)]
+            self.loosers = LooserList()
+        self.queue = []
+
+        if self.log and self.verbose > 1:
+            for o in self.winners:
+                self.log.info('Proposal: suggestObs() propID=%d field=%i propRank=%.2f' %
+                              (self.propID, o.fieldID, o.propRank))
 
         # ZZZ - MM commented out. Why should we sort the list by fieldID?
         #self.winners.sort(compareWinners)
-        self.loosers = []
-        while self.AcceptSerendipity:
-            try:
-                self.loosers.append(heapq.heappop(self.queue)[1])
-            except:
-                break
 
         return (self.winners)
 
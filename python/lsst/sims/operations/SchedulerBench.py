@@ -0,0 +1,424 @@
+#!/usr/bin/env python
+
+"""
+SchedulerBench
+
+Inherits from: ObsScheduler : LSSTObject : object
+
+Class Description
+The SchedulerBench class measures the decision rate of the scheduler
+(ObsScheduler.suggestObservation) outside of a full Simulator. It is an
+ObsScheduler built without a configuration file or a DB connection,
+whose proposals, telescope, weather and look-ahead slots are synthetic
+and reproducible:
+
+    proposals   suggest their numSuggObsPerProp best (field, filter)
+                entries, ranked from fixed weights, the look-ahead slot,
+                the seeing and the number of visits already taken. The
+                ranks are rounded to 0.05 so that ties happen.
+    telescope   slew delay growing with the distance to the current
+                position, 120 seconds for a filter change, rounded to
+                half seconds, and no slew above a declination limit.
+    weather     seeing changing every BENCH_SEEING_STEP seconds.
+
+Every decision is followed by the bookkeeping of the winner
+(ObsScheduler.recordWinner), so that the ranks change over the run. The
+run can also use the dictionary aggregation and the candidate loop the
+scheduler had before the rank matrices (legacy), on the same
+suggestions, to compare both the winners and the rates. With pruning,
+the report also holds the CandidatePruning counters.
+
+The report is a dictionary with the number of decisions, their rate and
+a checksum of the winners, meant to be dumped as JSON with sorted keys
+and diffed between versions.
+
+===================================
+Interface methods
+
+- __init__
+- Populate
+- Run
+- legacyRankCandidates
+"""
+
+from ObsScheduler import *
+import random
+import timeit
+import zlib
+
+DefaultBenchFields = 2000
+DefaultBenchProposals = 4
+DefaultBenchSuggestions = 500
+DefaultBenchDecisions = 1000
+
+BENCH_FILTERS = ['u', 'g', 'r', 'i', 'z', 'y']
+
+# seconds between two decisions, per look-ahead slot and per seeing value
+BENCH_DECISION_STEP = 40
+BENCH_TICK = 600
+BENCH_SEEING_STEP = 1800
+
+# declination above which the telescope cannot point (radians)
+BENCH_MAX_DEC_RAD = 0.3
+
+
+class BenchObservation(object):
+    """
+    Suggestion of a BenchProposal.
+    """
+    def __init__(self, fieldID, filter, propRank):
+        self.fieldID = fieldID
+        self.filter = filter
+        self.propRank = propRank
+        self.exclusiveBlockRequired = False
+
+
+class BenchProposal(object):
+    """
+    Synthetic proposal over a fixed list of (field, filter) targets.
+    """
+    def __init__(self, propID, fieldIDs, filters, weights, parallelSuggest=False):
+        """
+        Standard initializer.
+
+        propID          proposal identifier
+        fieldIDs        fieldID of each target
+        filters         filter of each target
+        weights         numpy array of the base rank of each target
+        parallelSuggest True if suggestObs can run in a thread pool
+        """
+        self.propID = propID
+        self.fieldIDs = fieldIDs
+        self.filters = filters
+        self.weights = weights
+        self.parallelSuggest = parallelSuggest
+        self.exposureTime = 34.0
+        self.AcceptConsecutiveObs = True
+
+        self.index = {}
+        for k in range(len(fieldIDs)):
+            self.index[(fieldIDs[k], filters[k])] = k
+        self.visits = numpy.zeros(len(fieldIDs))
+        self.winners = set()
+        self.last_observed_wasForThisProposal = False
+
+        return
+
+    def IsActive(self, date, nightCnt):
+
+        return True
+
+    def suggestObs(self, dateProfile, numSuggObs, exclusiveObs, minDistance2Moon, rawSeeing, seeing,
+                   transparency, sdnight, sdtime):
+        """
+        Return the numSuggObs best targets, highest rank first.
+        """
+        rank = self.weights * (1.0 + (sdtime + self.propID) % 3) / ((1.0 + self.visits) * seeing)
+        rank = numpy.round(rank * 20.0) / 20.0
+        suggestions = []
+        for k in numpy.argsort(-rank, kind='mergesort')[:numSuggObs].tolist():
+            if rank[k] > 0.0:
+                suggestions.append(BenchObservation(self.fieldIDs[k], self.filters[k], float(rank[k])))
+        self.winners = set([(obs.fieldID, obs.filter) for obs in suggestions])
+
+        return suggestions
+
+    def closeObservation(self, obs, obsHistID, twilightProfile):
+        """
+        Count a visit of the target if it was suggested.
+        """
+        key = (obs.fieldID, obs.filter)
+        self.last_observed_wasForThisProposal = key in self.winners
+        if self.last_observed_wasForThisProposal:
+            self.visits[self.index[key]] += 1
+            self.winners.discard(key)
+
+        return
+
+
+class BenchFilters(object):
+    def __init__(self):
+        self.filterNames = list(BENCH_FILTERS)
+        self.ExposureFactor = dict([(filter, 1.0) for filter in BENCH_FILTERS])
+
+
+class BenchTelescope(object):
+    def __init__(self):
+        self.Point(0.0, -0.5, 'r')
+
+    def Point(self, ra_RAD, dec_RAD, filter):
+        """
+        Move to a position, without delay.
+        """
+        self.ra_RAD = ra_RAD
+        self.dec_RAD = dec_RAD
+        self.filter = filter
+
+    def GetDelayForTarget(self, ra_RAD, dec_RAD, dateProfile, exposureTime, filter):
+        if dec_RAD > BENCH_MAX_DEC_RAD:
+            return -1.0
+        delay = 2.0 + 20.0 * (abs(ra_RAD - self.ra_RAD) + abs(dec_RAD - self.dec_RAD))
+        if filter != self.filter:
+            delay = max(delay, 120.0)
+        return round(2.0 * delay) / 2.0
+
+    def GetCurrentTelescopePosition(self, dateProfile):
+        return (self.ra_RAD, self.dec_RAD)
+
+    def GetMountedFiltersList(self):
+        return list(BENCH_FILTERS)
+
+
+class BenchWeather(object):
+    def getSeeing(self, date):
+        return 0.6 + 0.1 * ((date // BENCH_SEEING_STEP) % 5)
+
+
+class BenchSchedulingData(object):
+    def findNightAndTime(self, date):
+        return (0, int(date // BENCH_TICK))
+
+
+class SchedulerBench(ObsScheduler):
+    """
+    DB-less ObsScheduler with synthetic proposals.
+    """
+    def __init__(self, fields=DefaultBenchFields, proposals=DefaultBenchProposals,
+                 suggestions=DefaultBenchSuggestions, seed=DefaultBenchSeed, incremental=False,
+                 parallel=False, threads=0, pruning=False, audit=False):
+        """
+        Standard initializer. Does not call the ObsScheduler one, only
+        the attributes used by suggestObservation and recordWinner are
+        set. Every decision evaluates the proposals again
+        (reuseRankingCount = 0), unless incremental is True.
+
+        fields      number of fields
+        proposals   number of proposals
+        suggestions suggestions per proposal (numSuggObsPerProp)
+        seed        random seed
+        incremental True for the IncrementalRanking mode
+        parallel    True for the ParallelProposals mode, all the
+                    proposals being parallelSuggest
+        threads     ParallelProposalsThreads
+        pruning     True for the CandidatePruning mode, with the default
+                    CandidatePruningTopK and CandidatePruningRadius
+        audit       CandidatePruningAudit
+        """
+        self.nFields = fields
+        self.nProposals = proposals
+        self.seed = seed
+
+        self.log = False
+        self.verbose = -1
+        self.lsstDB = None
+        self.sessionID = 0
+
+        self.filters = BenchFilters()
+        self.telescope = BenchTelescope()
+        self.weather = BenchWeather()
+        self.schedulingData = BenchSchedulingData()
+
+        self.filterNames = sorted(self.filters.filterNames)
+        self.filterColumn = {}
+        for k in range(len(self.filterNames)):
+            self.filterColumn[self.filterNames[k]] = k
+
+        self.maxSlewTimeBonus = 5.0
+        self.numSuggObsPerProp = suggestions
+        self.recalcSkyCount = 0
+        self.reuseRankingCount = 0
+        self.tooGoodSeeingLimit = 0.25
+        self.runSeeingFudge = 1.0
+        self.minDistance2Moon = 0.0
+        self.twilightProfile = None
+
+        self.candidatePruning = pruning
+        self.candidatePruningTopK = 50
+        self.candidatePruningRadius = 20.0 * DEG2RAD
+        self.candidatePruningAudit = audit
+        self.fieldIndex = None
+        self.parallelProposals = parallel
+        self.parallelProposalsThreads = threads
+        self.proposalPool = None
+        self.incrementalRanking = incremental
+
+        return
+
+    def Populate(self):
+        """
+        Create the fields and the proposals, and reset the state of the
+        scheduler.
+        """
+        random.seed(self.seed)
+        self.targets = {}
+        for fieldID in range(1, self.nFields + 1):
+            self.targets[fieldID] = (random.uniform(0.0, 360.0), random.uniform(-90.0, 30.0))
+        if self.candidatePruning:
+            self.fieldIndex = FieldIndex([(fieldID, ra, dec) for (fieldID, (ra, dec)) in
+                                          sorted(self.targets.items())])
+
+        self.proposals_list = []
+        for propID in range(1, self.nProposals + 1):
+            fieldIDs = []
+            filters = []
+            for fieldID in sorted(self.targets.keys()):
+                if random.random() < 0.6:
+                    for filter in random.sample(BENCH_FILTERS, 3):
+                        fieldIDs.append(fieldID)
+                        filters.append(filter)
+            weights = numpy.array([random.choice([0.25, 0.5, 0.75, 1.0]) for k in range(len(fieldIDs))])
+            self.proposals_list.append(BenchProposal(propID, fieldIDs, filters, weights,
+                                                     parallelSuggest=self.parallelProposals))
+
+        self.nightCnt = 0
+        self.recalcSky = 0
+        self.reuseRanking = 0
+        self.exclusiveObs = None
+        self.winner = None
+        self.buildTargetArrays()
+        self.proposalTiming = {}
+        self.dirtyProposals = set()
+        self.rankingTransparency = None
+        self.rankingExclusive = False
+        self.rankingStats = {'decisions': 0, 'full': 0, 'evaluated': 0, 'reused': 0}
+        self.pruningStats = {'decisions': 0, 'candidates': 0, 'evaluated': 0, 'audited': 0,
+                             'winnerChanged': 0}
+        self.telescope.Point(0.0, -0.5, 'r')
+
+        return
+
+    def legacyRankCandidates(self, proposals, suggestions):
+        """
+        Sum the ranks of the suggestions in dictionaries and pick the
+        winner with a loop over the candidates, the way suggestObservation
+        did before the rank matrices.
+
+        Input
+        proposals   evaluated proposals
+        suggestions their suggestObs results, in the same order
+
+        Return
+            (maxrank, winner) as rankCandidates
+        """
+        targetRank = {}
+        targetXblk = {}
+        for k in range(len(proposals)):
+            if not suggestions[k]:
+                continue
+            self.expTime = proposals[k].exposureTime
+            propID = proposals[k].propID
+            for obs in suggestions[k]:
+                if obs.exclusiveBlockRequired:
+                    propIDforXblk = propID
+                else:
+                    propIDforXblk = None
+                if obs.fieldID not in targetRank:
+                    targetRank[obs.fieldID] = {obs.filter: obs.propRank}
+                    targetXblk[obs.fieldID] = {obs.filter: propIDforXblk}
+                elif obs.filter not in targetRank[obs.fieldID]:
+                    targetRank[obs.fieldID][obs.filter] = obs.propRank
+                    targetXblk[obs.fieldID][obs.filter] = propIDforXblk
+                else:
+                    targetRank[obs.fieldID][obs.filter] += obs.propRank
+                    if propIDforXblk is not None:
+                        targetXblk[obs.fieldID][obs.filter] = propIDforXblk
+
+        maxrank = 0
+        winner = None
+        for fieldID in sorted(targetRank.iterkeys()):
+            for filter in sorted(targetRank[fieldID].iterkeys()):
+                rank = targetRank[fieldID][filter]
+                if not rank > 0.0:
+                    continue
+                expTime = float(self.expTime)
+                (ra, dec) = self.targets[fieldID]
+                slewTime = self.telescope.GetDelayForTarget(ra_RAD=ra * DEG2RAD, dec_RAD=dec * DEG2RAD,
+                                                            dateProfile=self.dateProfile,
+                                                            exposureTime=expTime, filter=filter)
+                if slewTime >= 0.0:
+                    slewRank = rank + self.maxSlewTimeBonus * max(44.0 / (slewTime + 40.0) - 0.1, 0.0)
+                    if slewRank > maxrank:
+                        maxrank = slewRank
+                        winner = (slewTime, expTime, int(fieldID), filter, targetXblk[fieldID][filter], ra,
+                                  dec)
+
+        return (maxrank, winner)
+
+    def legacySuggestObservation(self, dateProfile, moonProfile, cloudiness):
+        """
+        suggestObservation with legacyRankCandidates.
+        """
+        self.dateProfile = dateProfile
+        self.moonProfile = moonProfile
+        self.transparency = cloudiness
+        (date, mjd, lst_RAD) = dateProfile
+        (sdnight, sdtime) = self.schedulingData.findNightAndTime(date)
+        self.updateSeeing(date)
+
+        proposals = [p for p in self.proposals_list if p.IsActive(date, self.nightCnt)]
+        (maxrank, win) = self.legacyRankCandidates(proposals,
+                                                   self.evaluateProposals(proposals, sdnight, sdtime))
+        self.winner = None
+        if maxrank > 0:
+            (slewTime, exposureTime, fieldID, filter, propXblk, ra, dec) = win
+            self.winner = Observation(ra=ra, dec=dec, fieldID=fieldID, filter=filter, slewTime=slewTime,
+                                      exposureTime=exposureTime * self.filters.ExposureFactor[filter],
+                                      exclusiveBlockRequired=(propXblk is not None), propID=propXblk,
+                                      dateProfile=dateProfile, moonProfile=moonProfile)
+            self.winner.finRank = maxrank
+
+        return self.winner
+
+    def Run(self, decisions=DefaultBenchDecisions, legacy=False):
+        """
+        Make a number of decisions, from a fresh population, recording
+        each winner.
+
+        Input
+        decisions   number of decisions
+        legacy      True to rank with legacyRankCandidates
+
+        Return
+        report dictionary
+        """
+        self.Populate()
+        self.winners = []
+        moonProfile = (0.0, 0.0, 0.0)
+        timer = timeit.default_timer
+
+        t0 = timer()
+        for k in xrange(decisions):
+            date = k * BENCH_DECISION_STEP
+            dateProfile = (date, 49353.0 + date / 86400.0, 0.0)
+            if legacy:
+                winner = self.legacySuggestObservation(dateProfile, moonProfile, 0.0)
+            else:
+                winner = self.suggestObservation(dateProfile, moonProfile, None, 0.0)
+            if winner is None:
+                continue
+            self.winners.append((winner.fieldID, winner.filter, winner.finRank, winner.slewTime))
+            self.telescope.Point(winner.ra * DEG2RAD, winner.dec * DEG2RAD, winner.filter)
+            self.recordWinner(winner, k + 1)
+        total_s = timer() - t0
+
+        if self.proposalPool is not None:
+            self.proposalPool.close()
+            self.proposalPool = None
+
+        report = {"format": BENCH_FORMAT_VERSION,
+                  "fields": self.nFields,
+                  "proposals": self.nProposals,
+                  "suggestions": self.numSuggObsPerProp,
+                  "legacy": legacy,
+                  "incremental": self.incrementalRanking,
+                  "parallel": self.parallelProposals,
+                  "pruning": self.candidatePruning,
+                  "decisions": decisions,
+                  "observations": len(self.winners),
+                  "total_s": total_s,
+                  "decisions_per_s": decisions / max(total_s, 1e-9),
+                  "winners_crc": zlib.crc32(repr(self.winners)) & 0xffffffff}
+        if self.candidatePruning:
+            report["pruning_stats"] = dict(self.pruningStats)
+
+        return report
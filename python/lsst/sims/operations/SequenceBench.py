@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+
+"""
+SequenceBench
+
+Inherits from: TransSubSeqProp : Proposal : object
+
+Class Description
+The SequenceBench class measures the cost of the night start bookkeeping
+of the transient sub-sequence proposals (TransSubSeqProp.startNightSequences)
+outside of a full Simulator. It is a TransSubSeqProp built without a
+configuration file or a DB connection, holding a reproducible population
+of synthetic sequences in every state (idle, active, complete and lost)
+over a target region of 1.5 times as many fields. Every simulated night
+the region for new sequences moves, so that sequences are deleted,
+created and restarted, and the time of each startNightSequences call is
+recorded.
+
+The report is a dictionary with the number of sequences, the wall time
+per night and the counters of the last night, meant to be dumped as
+JSON with sorted keys and diffed between versions.
+
+===================================
+Interface methods
+
+- __init__
+- Populate
+- Run
+"""
+
+from TransSubSeqProp import *
+import random
+import timeit
+
+DefaultBenchSequences = 10000
+DefaultBenchNights = 10
+
+# share of the synthetic sequences in each state
+BENCH_STATES = [(SEQ_IDLE, 0.10), (SEQ_ACTIVE, 0.60), (SEQ_COMPLETE, 0.15), (SEQ_LOST, 0.15)]
+
+
+class SequenceBench(TransSubSeqProp):
+    """
+    DB-less TransSubSeqProp with synthetic sequences.
+    """
+    def __init__(self, count=DefaultBenchSequences, seed=DefaultBenchSeed, randomize=False):
+        """
+        Standard initializer. Does not call the TransSubSeqProp one, only
+        the attributes used by startNightSequences are set.
+
+        count       number of sequences
+        seed        random seed
+        randomize   True to pick the new fields at random
+        """
+        self.count = count
+        self.seed = seed
+        self.randomize = randomize
+
+        self.propID = 0
+        self.log = False
+        self.verbose = -1
+
+        # one subsequence of three nightly events of one visit
+        self.WLtype = False
+        self.numGroupedVisits = 1
+        self.masterSubSequence = None
+        self.subSeqName = ['main']
+        self.subSeqNested = ['.']
+        self.subSeqFilters = ['r']
+        self.subSeqExposures = ['1']
+        self.subSeqEvents = [3]
+        self.subSeqMaxMissed = [1]
+        self.subSeqInterval = [DAY]
+        self.subSeqWindowStart = [-0.5]
+        self.subSeqWindowMax = [0.5]
+        self.subSeqWindowEnd = [1.0]
+        self.overflowLevel = 0.0
+        self.overflow = False
+        self.progressToStartBoost = 1.0
+        self.maxBoostToComplete = 0.0
+
+        self.maxNumberActiveSequences = count + count / 10
+        self.minNumberActiveSequences = self.maxNumberActiveSequences
+        self.restartLostSequences = True
+        self.restartCompleteSequences = True
+
+        self.Populate()
+
+        return
+
+    def __del__(self):
+        """
+        Nothing to close, the Proposal initializer was not called.
+        """
+        return
+
+    def Populate(self):
+        """
+        Build the targets and the synthetic sequences.
+        """
+        rnd = random.Random(self.seed)
+
+        self.SeqCount = 0
+        self.sequenceStore = SequenceStore(capacity=self.count)
+        self.sequences = {}
+        self.targets = {}
+        for fieldID in xrange(self.count * 3 / 2):
+            self.targets[fieldID] = (rnd.uniform(0.0, 360.0), rnd.uniform(-90.0, 0.0))
+        self.targetsNewSeq = {}
+        self.tonightTargets = {}
+        self.tonightSubseqsForTarget = {}
+
+        for fieldID in rnd.sample(sorted(self.targets.keys()), self.count):
+            self.SeqCount += 1
+            seq = SuperSequence(self.propID, fieldID, self.SeqCount, self.WLtype, self.numGroupedVisits,
+                                self.masterSubSequence, self.subSeqName, self.subSeqNested,
+                                self.subSeqFilters, self.subSeqExposures, self.subSeqEvents,
+                                self.subSeqMaxMissed, self.subSeqInterval, self.subSeqWindowStart,
+                                self.subSeqWindowMax, self.subSeqWindowEnd, self.overflowLevel,
+                                self.progressToStartBoost, self.maxBoostToComplete,
+                                store=self.sequenceStore)
+            x = rnd.random()
+            for (state, share) in BENCH_STATES:
+                if x < share:
+                    break
+                x -= share
+            date = 0.0
+            if state == SEQ_ACTIVE:
+                seq.ObserveEvent(date, 'main', 1)
+            elif state == SEQ_COMPLETE:
+                for obsID in range(self.subSeqEvents[0]):
+                    seq.ObserveEvent(date + obsID * DAY, 'main', obsID)
+            elif state == SEQ_LOST:
+                for misID in range(self.subSeqMaxMissed[0] + 1):
+                    seq.MissEvent(date + misID * DAY, 'main', misID)
+            self.sequences[fieldID] = seq
+
+        return
+
+    def newSeqRegion(self, night):
+        """
+        Region for new sequences of the given night: half of the targets,
+        moving by a tenth of the targets every night.
+        """
+        fieldIDs = sorted(self.targets.keys())
+        n = len(fieldIDs)
+        start = (night * n / 10) % n
+        region = (fieldIDs + fieldIDs)[start:start + n / 2]
+
+        return dict([(fieldID, self.targets[fieldID]) for fieldID in region])
+
+    def Run(self, nights=DefaultBenchNights):
+        """
+        Time startNightSequences over a number of nights, from a fresh
+        population of sequences.
+
+        Input
+        nights      number of simulated nights
+
+        Return
+        report dictionary
+        """
+        self.Populate()
+        random.seed(self.seed)
+        timer = timeit.default_timer
+
+        night_s = []
+        for night in xrange(nights):
+            self.targetsNewSeq = self.newSeqRegion(night)
+            runProgress = float(night) / max(nights, 1)
+            t0 = timer()
+            counters = self.startNightSequences(runProgress, self.randomize)
+            night_s.append(timer() - t0)
+
+        report = {"format": BENCH_FORMAT_VERSION,
+                  "sequences": self.count,
+                  "nights": nights,
+                  "randomize": self.randomize,
+                  "night_s": night_s,
+                  "total_s": sum(night_s),
+                  "max_s": max(night_s + [0.0]),
+                  "counters": dict(counters) if nights > 0 else {},
+                  "final_sequences": len(self.sequences),
+                  "global_progress": self.globalProgress if nights > 0 else 0.0}
+
+        return report
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+"""
+SequenceStore
+
+Inherits from: object
+
+Class Description
+Struct-of-arrays storage of the scalar state of the SuperSequence and
+SubSequence instances of a proposal. Each sequence and subsequence owns
+one row of a column table; the instances read and write their state
+(state, event counters, sequence number, dates...) through properties
+bound to their row, so they behave as before while the state of all the
+sequences of a proposal can be queried at once, keyed by fieldID.
+The event histories and obsID/misID lists are variable length and stay
+on the instances.
+
+Method Types
+Constructor/Initializers
+- __init__
+
+Rows
+- addSequence
+- addSubSequence
+- releaseSequence
+- releaseSubSequence
+- Rows
+
+Vectorized queries
+- GetState
+- IsIdle
+- IsActive
+- IsComplete
+- IsLost
+- GetProgress
+- Select
+"""
+
+import numpy
+
+SEQ_IDLE = 0
+SEQ_ACTIVE = 1
+SEQ_COMPLETE = 2
+SEQ_LOST = 3
+
+SEQUENCE_COLUMNS = (('field', int),
+                    ('WLtype', bool),
+                    ('seqNum', int),
+                    ('state', int),
+                    ('aborted', bool),
+                    ('date', float),
+                    ('nAllEvents', int),
+                    ('nObsEvents', int),
+                    ('nMisEvents', int),
+                    ('nTargetEvents', int))
+
+SUBSEQUENCE_COLUMNS = (('state', int),
+                       ('aborted', bool),
+                       ('date', float),
+                       ('nAllEvents', int),
+                       ('nObsEvents', int),
+                       ('nMisEvents', int),
+                       ('subeventIndex', int),
+                       ('exposuresLeft', int),
+                       ('exclusiveBlockNeeded', bool),
+                       ('pairNum', int))
+
+def storedColumn(table, column):
+    """
+    Return a property that reads and writes attribute column of a view
+    in its row (storeRow) of the given table of its store (sequenceStore).
+    """
+    def getColumn(self):
+        return getattr(self.sequenceStore, table).columns[column][self.storeRow].item()
+
+    def setColumn(self, value):
+        getattr(self.sequenceStore, table).columns[column][self.storeRow] = value
+
+    return property(getColumn, setColumn)
+
+class ColumnTable(object):
+    """
+    Growable set of equal length numpy columns, with reuse of the
+    released rows.
+    """
+    def __init__(self, columns, capacity):
+
+        self.dtypes = dict(columns)
+        self.columns = {}
+        for (name, dtype) in columns:
+            self.columns[name] = numpy.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+        self.size = 0
+        self.free = []
+
+        return
+
+    def add(self):
+
+        if self.free:
+            row = self.free.pop()
+        else:
+            if self.size == self.capacity:
+                self.capacity *= 2
+                for name in self.columns.keys():
+                    column = numpy.zeros(self.capacity, dtype=self.dtypes[name])
+                    column[:self.size] = self.columns[name]
+                    self.columns[name] = column
+            row = self.size
+            self.size += 1
+
+        for column in self.columns.values():
+            column[row] = 0
+
+        return row
+
+    def release(self, row):
+
+        self.free.append(row)
+
+        return
+
+class SequenceStore(object):
+    def __init__(self, capacity=64):
+        """
+        Standard initializer.
+
+        capacity    initial number of rows of the tables, grown as needed.
+        """
+        self.sequences = ColumnTable(SEQUENCE_COLUMNS, capacity)
+        self.subsequences = ColumnTable(SUBSEQUENCE_COLUMNS, capacity)
+
+        # row of the sequence of each field
+        self.fieldRow = {}
+
+        return
+
+    def addSequence(self, field, WLtype):
+        """
+        Allocate the row of the sequence of a field.
+
+        Return
+        row index
+        """
+        row = self.sequences.add()
+        self.sequences.columns['field'][row] = field
+        self.sequences.columns['WLtype'][row] = WLtype
+        self.fieldRow[field] = row
+
+        return row
+
+    def addSubSequence(self):
+        """
+        Allocate the row of a subsequence.
+
+        Return
+        row index
+        """
+        return self.subsequences.add()
+
+    def releaseSequence(self, row):
+        """
+        Release the row of a sequence that is no longer used.
+        """
+        field = self.sequences.columns['field'][row].item()
+        if self.fieldRow.get(field) == row:
+            del self.fieldRow[field]
+        self.sequences.release(row)
+
+        return
+
+    def releaseSubSequence(self, row):
+        """
+        Release the row of a subsequence that is no longer used.
+        """
+        self.subsequences.release(row)
+
+        return
+
+    def Rows(self, fieldIDs):
+        """
+        Return the array of the rows of the sequences of fieldIDs.
+
+        Raise
+        KeyError if a field has no sequence in the store.
+        """
+        return numpy.array([self.fieldRow[fieldID] for fieldID in fieldIDs], dtype=int)
+
+    def GetState(self, fieldIDs):
+        """
+        Return the array of the states of the sequences of fieldIDs.
+        """
+        return self.sequences.columns['state'][self.Rows(fieldIDs)]
+
+    def IsIdle(self, fieldIDs):
+        return self.GetState(fieldIDs) == SEQ_IDLE
+
+    def IsActive(self, fieldIDs):
+        return self.GetState(fieldIDs) == SEQ_ACTIVE
+
+    def IsComplete(self, fieldIDs):
+        return self.GetState(fieldIDs) == SEQ_COMPLETE
+
+    def IsLost(self, fieldIDs):
+        return self.GetState(fieldIDs) == SEQ_LOST
+
+    def GetProgress(self, fieldIDs):
+        """
+        Return the array of SuperSequence.GetProgress() of the sequences
+        of fieldIDs.
+        """
+        rows = self.Rows(fieldIDs)
+        columns = self.sequences.columns
+        events = numpy.where(columns['WLtype'][rows], columns['nObsEvents'][rows],
+                             columns['nAllEvents'][rows])
+        target = columns['nTargetEvents'][rows]
+
+        return numpy.where(target == 0, 1.0, events / numpy.maximum(target, 1).astype(float))
+
+    def Select(self, fieldIDs, states):
+        """
+        Return the list of the fieldIDs whose sequence is in one of the
+        given states, in the order of fieldIDs.
+        """
+        fieldIDs = list(fieldIDs)
+        if fieldIDs == []:
+            return []
+        mask = numpy.in1d(self.GetState(fieldIDs), list(states))
+
+        return [fieldIDs[i] for i in numpy.nonzero(mask)[0]]
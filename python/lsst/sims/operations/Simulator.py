@@ -191,6 +191,9 @@ class Simulator(object):
 
         self.setupSimulation()
 
+        # write the configuration collected during the setup in bulk
+        self.lsstDB.flushWrites()
+
         # initialize the count of lunations - needed to track year boundaries
         self.lunationCount = 0
         # init count of nights
@@ -624,6 +627,9 @@ class Simulator(object):
 
         self.nightCnt += 1
 
+        # all the rows of the night are committed together in startDay
+        self.lsstDB.beginTransaction()
+
         # compute the moonProfile and dateProfile for the current simdate
         self.dateProfile = self.sky.computeDateProfile(date)
         (date, MJD, lst_RAD) = self.dateProfile
@@ -690,6 +696,9 @@ class Simulator(object):
         self.moonProfile = self.sky.computeMoonProfile(date)
         self.obsScheduler.startDay(self.moonProfile)
 
+        # write the rows of the night still buffered by the DB and commit them
+        self.lsstDB.commitTransaction()
+
         return
 
     def setupSimulation(self):
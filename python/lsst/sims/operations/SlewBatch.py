@@ -0,0 +1,316 @@
+#!/usr/bin/env python
+
+"""
+SlewBatch
+
+Inherits from: object
+
+Class Description
+The SlewBatch class evaluates the Instrument slew model for large sets
+of hypothetical (from, to) pointing pairs without running a full
+Simulator. It is meant for offline studies of the speeds, accelerations
+and prerequisites configured in Instrument.conf.
+
+Each pair is one row with the columns
+
+    fromAlt fromAz fromRot toAlt toAz toRot [filterChange]
+
+with all the angles in decimal degrees. Azimuth and rotator angles are
+absolute (cable wrap) positions. The optional filterChange column flags,
+when non zero, that the slew includes a change to another mounted filter.
+
+For each pair the total slew delay, the delay of each activity (in the
+order of InstrumentSlewParams.activities) and the critical path are
+computed. The critical path is returned as a bit mask over the same
+list of activities.
+
+Pairs can be read from a NumPy .npy file (memory mapped) or from a text
+file with comma or blank separated columns. Large inputs are processed
+in chunks that are distributed over a pool of worker processes.
+
+===================================
+Interface methods
+
+- __init__
+- ComputeSlew
+- Compute
+- CriticalPathTags
+- ReadPairs
+- Run
+"""
+
+from utilities import *
+from Database import *
+from Instrument import *
+import multiprocessing
+import numpy
+
+DefaultChunkSize = 10000
+
+NUM_PAIR_COLUMNS = 6
+
+# worker side SlewBatch instance, created once per process by _initWorker
+_workerBatch = None
+
+
+def _initWorker(instrumentConf, obsProfile):
+    global _workerBatch
+    _workerBatch = SlewBatch(instrumentConf=instrumentConf, obsProfile=obsProfile)
+
+
+def _computeChunk(pairs):
+    return _workerBatch.Compute(pairs)
+
+
+class SlewBatch(object):
+    """
+    Batch evaluation of the Instrument slew model for pointing pairs.
+    """
+    def __init__(self, instrumentConf=DefaultInstrumentConfigFile,
+                 obsProfile=(-70.59 * DEG2RAD, -29.67 * DEG2RAD, 2737, 49353, 0, 0, 0)):
+        """
+        Standard initializer.
+
+        instrumentConf  Configuration file with parameters for Instrument.
+        obsProfile      observatory profile, only used to build the
+                        Instrument states:
+                        (lon_RAD, lat_RAD, height, simEpoch, pressure,
+                         temperature, relHumidity)
+        """
+        self.instrumentConf = instrumentConf
+        self.obsProfile = obsProfile
+
+        # the slew model does not need a DB, only the configuration
+        self.lsstDB = Database(False, dbConnect=False)
+        self.instrument = Instrument(self.lsstDB, 0, {}, obsProfile, instrumentConf, verbose=-1)
+
+        self.activities = list(self.instrument.slew_params.activities)
+        self.numActivities = len(self.activities)
+        self.activityBit = {}
+        for k in range(self.numActivities):
+            self.activityBit[self.activities[k]] = 1 << k
+
+        # filters used for the slews without and with filter change
+        self.filter = self.instrument.current_state.GetFilter()
+        self.changeFilter = self.filter
+        for filter in self.instrument.current_state.GetMountedFiltersList():
+            if filter != self.filter:
+                self.changeFilter = filter
+                break
+
+        self.prev_state = copy.deepcopy(self.instrument.current_state)
+        self.prev_state.Tracking = True
+        self.targetposition = InstrumentPosition()
+
+        return
+
+    def ComputeSlew(self, fromAlt, fromAz, fromRot, toAlt, toAz, toRot, filterChange=False):
+        """
+        Compute the slew between two telescope positions.
+
+        Input
+        fromAlt, fromAz, fromRot    initial position (degrees)
+        toAlt, toAz, toRot          final position (degrees)
+        filterChange                True if the slew changes filter
+
+        Return
+        (delay, delays, criticalPath) where delays is a dictionary
+        {activity: delay} of the activities with non zero delay and
+        criticalPath is the critical path bit mask.
+        """
+        alt_RAD = fromAlt * DEG2RAD
+        az_RAD = fromAz * DEG2RAD
+        rot_RAD = fromRot * DEG2RAD
+
+        state = self.prev_state
+        state.ALT_RAD = alt_RAD
+        state.AZ_RAD = divmod(az_RAD, TWOPI)[1]
+        state.DomAlt_Pos_RAD = alt_RAD
+        state.DomAz_Pos_RAD = az_RAD
+        state.TelAlt_Pos_RAD = alt_RAD
+        state.TelAz_Pos_RAD = az_RAD
+        state.Rotator_Pos_RAD = rot_RAD
+        state.Filter_Pos = self.filter
+
+        if filterChange:
+            filter = self.changeFilter
+        else:
+            filter = self.filter
+
+        self.targetposition.Set(0.0, 0.0, 0.0, filter, 0.0, 0.0, toAlt * DEG2RAD, toAz * DEG2RAD,
+                                toRot * DEG2RAD)
+
+        (delay, target_state) = self.instrument.GetSlewDelay(self.targetposition, state, allSlewData=True)
+
+        criticalPath = 0
+        for activity in self.instrument.lastslew_criticalpath:
+            criticalPath |= self.activityBit[activity]
+
+        return (delay, self.instrument.lastslew_delays, criticalPath)
+
+    def Compute(self, pairs):
+        """
+        Compute the slews for an array of pointing pairs in this process.
+
+        Input
+        pairs       array of shape (N, 6) or (N, 7), see module doc.
+
+        Return
+        (delay, activityDelays, criticalPath) NumPy arrays of shape
+        (N,), (N, numActivities) and (N,) respectively.
+        """
+        pairs = numpy.atleast_2d(numpy.asarray(pairs, dtype=float))
+        npairs = pairs.shape[0]
+        if npairs and pairs.shape[1] < NUM_PAIR_COLUMNS:
+            raise InputParamError('pointing pairs need at least %d columns, got %d' %
+                                  (NUM_PAIR_COLUMNS, pairs.shape[1]))
+        withFilter = pairs.shape[1] > NUM_PAIR_COLUMNS
+
+        delay = numpy.zeros(npairs)
+        activityDelays = numpy.zeros((npairs, self.numActivities))
+        criticalPath = numpy.zeros(npairs, dtype=numpy.int64)
+
+        for i in xrange(npairs):
+            row = pairs[i]
+            if withFilter:
+                filterChange = row[NUM_PAIR_COLUMNS] != 0
+            else:
+                filterChange = False
+            (delay[i], delays, criticalPath[i]) = self.ComputeSlew(row[0], row[1], row[2], row[3], row[4],
+                                                                   row[5], filterChange)
+            for activity in delays.keys():
+                activityDelays[i, self.activities.index(activity)] = delays[activity]
+
+        return (delay, activityDelays, criticalPath)
+
+    def CriticalPathTags(self, criticalPath):
+        """
+        Translate a critical path bit mask into the list of activity names.
+        """
+        return [activity for activity in self.activities if criticalPath & self.activityBit[activity]]
+
+    def ReadPairs(self, inFile, chunkSize=DefaultChunkSize):
+        """
+        Generator over the pointing pairs stored in inFile, in chunks of
+        at most chunkSize rows.
+
+        Input
+        inFile      .npy file or text file (comma or blank separated,
+                    lines starting with # and non numeric headers are
+                    skipped)
+        chunkSize   maximum number of rows per chunk
+
+        Raise
+        InputParamError if a text line does not have the number of columns
+        of the first data line.
+        """
+        if inFile.endswith('.npy'):
+            data = numpy.load(inFile, mmap_mode='r')
+            for start in xrange(0, data.shape[0], chunkSize):
+                yield numpy.array(data[start:start + chunkSize], dtype=float)
+            return
+
+        rows = []
+        # number of columns of the first data row, kept by all the others
+        ncolumns = None
+        for (lineNumber, line) in enumerate(open(inFile), 1):
+            line = line.strip()
+            if line == '' or line[0] == '#':
+                continue
+            try:
+                row = [float(x) for x in line.replace(',', ' ').split()]
+            except ValueError:
+                # header line
+                continue
+            if ncolumns is None:
+                ncolumns = len(row)
+            elif len(row) != ncolumns:
+                raise InputParamError('%s line %d: %d columns, expected %d' %
+                                      (inFile, lineNumber, len(row), ncolumns))
+            rows.append(row)
+            if len(rows) == chunkSize:
+                yield numpy.array(rows)
+                rows = []
+        if rows:
+            yield numpy.array(rows)
+
+    def Run(self, inFile, outFile=None, processes=None, chunkSize=DefaultChunkSize):
+        """
+        Compute the slews for all the pointing pairs in inFile.
+
+        Input
+        inFile      input file, see ReadPairs
+        outFile     if given, results are written to this file. A .npz
+                    file stores the arrays returned below (plus the
+                    activity names), otherwise a CSV file with one row
+                    per pair is written.
+        processes   number of worker processes. Defaults to the number
+                    of CPUs. Inputs that fit in a single chunk are
+                    computed in this process.
+        chunkSize   number of pairs per work unit
+
+        Return
+        (delay, activityDelays, criticalPath) as in Compute.
+        """
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+
+        chunks = self.ReadPairs(inFile, chunkSize)
+        first = []
+        for chunk in chunks:
+            first.append(chunk)
+            if len(first) == 2:
+                break
+
+        pool = None
+        if processes > 1 and len(first) > 1:
+            pool = multiprocessing.Pool(processes, _initWorker, (self.instrumentConf, self.obsProfile))
+            results = pool.imap(_computeChunk, self._chainChunks(first, chunks))
+        else:
+            results = (self.Compute(chunk) for chunk in self._chainChunks(first, chunks))
+
+        csvFile = None
+        if outFile is not None and not outFile.endswith('.npz'):
+            csvFile = open(outFile, 'w')
+            csvFile.write('delay,%s,criticalPath\n' % (','.join(self.activities)))
+
+        delays = []
+        activityDelays = []
+        criticalPaths = []
+        try:
+            for (delay, activityDelay, criticalPath) in results:
+                delays.append(delay)
+                activityDelays.append(activityDelay)
+                criticalPaths.append(criticalPath)
+                if csvFile is not None:
+                    for i in xrange(len(delay)):
+                        csvFile.write('%f,%s,%s\n' %
+                                      (delay[i], ','.join(['%f' % (d) for d in activityDelay[i]]),
+                                       '|'.join(self.CriticalPathTags(criticalPath[i]))))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if csvFile is not None:
+                csvFile.close()
+
+        if delays:
+            delay = numpy.concatenate(delays)
+            activityDelay = numpy.concatenate(activityDelays)
+            criticalPath = numpy.concatenate(criticalPaths)
+        else:
+            delay = numpy.zeros(0)
+            activityDelay = numpy.zeros((0, self.numActivities))
+            criticalPath = numpy.zeros(0, dtype=numpy.int64)
+
+        if outFile is not None and outFile.endswith('.npz'):
+            numpy.savez(outFile, delay=delay, activityDelays=activityDelay, criticalPath=criticalPath,
+                        activities=numpy.array(self.activities))
+
+        return (delay, activityDelay, criticalPath)
+
+    def _chainChunks(self, first, chunks):
+        for chunk in first:
+            yield chunk
+        for chunk in chunks:
+            yield chunk
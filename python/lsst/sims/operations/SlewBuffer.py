@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+"""
+SlewBuffer
+
+Inherits from: object
+
+Class Description
+Columnar append buffers for the slew records of the SlewHistory,
+SlewState, SlewMaxSpeeds and SlewActivities tables. Instrument.Observe
+appends one slew at a time directly into typed array.array columns and
+Database.addSlewBuffer drains all the pending slews in bulk, so no
+per-visit record objects are allocated.
+
+Slews are identified by their slewCount, which is also the obsHistID of
+the corresponding ObsHistory entry. The DB slewID is only known once
+the SlewHistory rows have been written, which is why the dependent
+tables are keyed by slewCount here.
+
+Method Types
+Constructor/Initializers
+- __init__
+- Clear
+
+Append
+- AddHistory
+- AddState
+- AddMaxSpeeds
+- AddActivities
+
+Drain
+- HistoryRows
+- StateRows
+- MaxSpeedsRows
+- ActivitiesRows
+"""
+
+import array
+
+
+class SlewBuffer(object):
+    def __init__(self, activities):
+        """
+        Standard initializer.
+
+        activities  list of the slew activity names, as in
+                    InstrumentSlewParams.activities
+        """
+        self.activities = list(activities)
+        self.activityIndex = {}
+        for k in range(len(self.activities)):
+            self.activityIndex[self.activities[k]] = k
+
+        # filter names are interned, the state columns store the index
+        self.filterNames = []
+        self.filterIndex = {}
+
+        self.Clear()
+
+        return
+
+    def Clear(self):
+        """
+        Drop all the buffered slews.
+        """
+        # SlewHistory
+        self.slewCount = array.array('l')
+        self.startDate = array.array('d')
+        self.endDate = array.array('d')
+        self.slewTime = array.array('d')
+        self.slewDist = array.array('d')
+
+        # SlewState
+        self.stateSlewCount = array.array('l')
+        self.stateDate = array.array('d')
+        self.stateRA = array.array('d')
+        self.stateDec = array.array('d')
+        self.stateTracking = array.array('b')
+        self.stateAlt = array.array('d')
+        self.stateAz = array.array('d')
+        self.statePA = array.array('d')
+        self.stateDomAlt = array.array('d')
+        self.stateDomAz = array.array('d')
+        self.stateTelAlt = array.array('d')
+        self.stateTelAz = array.array('d')
+        self.stateRotTelPos = array.array('d')
+        self.stateFilter = array.array('h')
+        self.stateInitFinal = array.array('b')
+
+        # SlewMaxSpeeds
+        self.speedSlewCount = array.array('l')
+        self.domAltSpd = array.array('d')
+        self.domAzSpd = array.array('d')
+        self.telAltSpd = array.array('d')
+        self.telAzSpd = array.array('d')
+        self.rotSpd = array.array('d')
+
+        # SlewActivities
+        self.actSlewCount = array.array('l')
+        self.actIndex = array.array('h')
+        self.actDelay = array.array('d')
+        self.actCritical = array.array('b')
+
+        return
+
+    def __len__(self):
+        return len(self.slewCount)
+
+    def AddHistory(self, slewCount, startDate, endDate, slewTime, slewDist):
+
+        self.slewCount.append(slewCount)
+        self.startDate.append(startDate)
+        self.endDate.append(endDate)
+        self.slewTime.append(slewTime)
+        self.slewDist.append(slewDist)
+
+    def AddState(self, slewCount, state, initfinal):
+        """
+        Append the state of the moving systems.
+
+        Input
+        slewCount   slew identifier
+        state       InstrumentState instance
+        initfinal   SLEWINITSTATE or SLEWFINALSTATE
+        """
+        filter = state.Filter_Pos
+        try:
+            filterIndex = self.filterIndex[filter]
+        except KeyError:
+            filterIndex = len(self.filterNames)
+            self.filterIndex[filter] = filterIndex
+            self.filterNames.append(filter)
+
+        self.stateSlewCount.append(slewCount)
+        self.stateDate.append(state.TIME)
+        self.stateRA.append(state.RA_RAD)
+        self.stateDec.append(state.DEC_RAD)
+        self.stateTracking.append(bool(state.Tracking))
+        self.stateAlt.append(state.ALT_RAD)
+        self.stateAz.append(state.AZ_RAD)
+        self.statePA.append(state.PA_RAD)
+        self.stateDomAlt.append(state.DomAlt_Pos_RAD)
+        self.stateDomAz.append(state.DomAz_Pos_RAD)
+        self.stateTelAlt.append(state.TelAlt_Pos_RAD)
+        self.stateTelAz.append(state.TelAz_Pos_RAD)
+        self.stateRotTelPos.append(state.Rotator_Pos_RAD)
+        self.stateFilter.append(filterIndex)
+        self.stateInitFinal.append(initfinal)
+
+    def AddMaxSpeeds(self, slewCount, state):
+        """
+        Append the maximum speeds reached during the slew into state.
+        """
+        self.speedSlewCount.append(slewCount)
+        self.domAltSpd.append(state.DomAlt_Spd_RDS)
+        self.domAzSpd.append(state.DomAz_Spd_RDS)
+        self.telAltSpd.append(state.TelAlt_Spd_RDS)
+        self.telAzSpd.append(state.TelAz_Spd_RDS)
+        self.rotSpd.append(state.Rotator_Spd_RDS)
+
+    def AddActivities(self, slewCount, delays, criticalpath):
+        """
+        Append the activities of the slew.
+
+        Input
+        slewCount       slew identifier
+        delays          {activity: delay} of the activities with delay
+        criticalpath    list of the activities in the critical path
+        """
+        for activity in delays.keys():
+            self.actSlewCount.append(slewCount)
+            self.actIndex.append(self.activityIndex[activity])
+            self.actDelay.append(delays[activity])
+            self.actCritical.append(activity in criticalpath)
+
+    def HistoryRows(self, sessionID):
+        """
+        Rows for SlewHistory (slewCount, startDate, endDate, slewTime,
+        slewDist, ObsHistory_obsHistID, ObsHistory_Session_sessionID).
+        """
+        return [(self.slewCount[i], self.startDate[i], self.endDate[i], self.slewTime[i], self.slewDist[i],
+                 self.slewCount[i], sessionID) for i in xrange(len(self.slewCount))]
+
+    def StateRows(self, slewID):
+        """
+        Rows for SlewState, slewID maps slewCount to the DB slewID.
+        """
+        return [(self.stateDate[i], self.stateRA[i], self.stateDec[i], str(bool(self.stateTracking[i])),
+                 self.stateAlt[i], self.stateAz[i], self.statePA[i], self.stateDomAlt[i], self.stateDomAz[i],
+                 self.stateTelAlt[i], self.stateTelAz[i], self.stateRotTelPos[i],
+                 self.filterNames[self.stateFilter[i]], self.stateInitFinal[i],
+                 slewID[self.stateSlewCount[i]]) for i in xrange(len(self.stateSlewCount))]
+
+    def MaxSpeedsRows(self, slewID):
+        """
+        Rows for SlewMaxSpeeds, slewID maps slewCount to the DB slewID.
+        """
+        return [(self.domAltSpd[i], self.domAzSpd[i], self.telAltSpd[i], self.telAzSpd[i], self.rotSpd[i],
+                 slewID[self.speedSlewCount[i]]) for i in xrange(len(self.speedSlewCount))]
+
+    def ActivitiesRows(self, slewID):
+        """
+        Rows for SlewActivities, slewID maps slewCount to the DB slewID.
+        """
+        return [(self.activities[self.actIndex[i]], self.actDelay[i], str(bool(self.actCritical[i])),
+                 slewID[self.actSlewCount[i]]) for i in xrange(len(self.actSlewCount))]
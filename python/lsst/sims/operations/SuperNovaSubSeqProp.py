@@ -276,9 +276,9 @@ class SuperNovaSubSeqProp (TransSubSeqProp):
                         line['key'], line['val'])
 
         self.dbField = dbTableDict['field']
-        # If user-defined regions have been defined, build new FieldDB
+        # If user-defined regions have been defined, keep only their fields
         if not (self.userRegion[0] == None) :
-            self.dbField = self.buildUserRegionDB(self.userRegion,self.dbField)
+            self.fieldCatalog = self.buildUserRegionDB(self.userRegion,self.dbField)
                                                                                 
 	Nfilters          = len(self.filters.filterNamesSorted)
 	self.maxIXfilter  = float(Nfilters-1)
@@ -377,11 +377,7 @@ class SuperNovaSubSeqProp (TransSubSeqProp):
        #s0 = stacksize()
        ##self.log.info("SN: updateTargetList entry: mem: %d resMem: %d stack: %d" % (m0, r0, s0))
 
-       dbFov = 'fieldFov'
-       dbRA = 'fieldRA'
        dbDec = 'fieldDec'
-       dbID = 'fieldID'
-
 
        (date,mjd,lst_RAD) = dateProfile
        (lon_RAD,lat_RAD,elev_M,epoch_MJD,d1,d2,d3) = obsProfile
@@ -425,88 +421,38 @@ class SuperNovaSubSeqProp (TransSubSeqProp):
 
        # self.targets is a convenience dictionary. Its keys are
        # fieldIDs, its values are the corresponding RA and Dec.
-       fields = {}
-       fovEpsilon1 = fov - .01
-       fovEpsilon2 = fov + .01
-
-       sql = 'SELECT %s, %s, %s from %s ' % (dbRA,
-                                             dbDec,
-                                             dbID,
-                                             self.dbField)
-
-       sql += 'WHERE %s BETWEEN %f AND %f AND ' % (dbFov,
-                                                   fovEpsilon1,
-                                                   fovEpsilon2)
+       catalog = self.getFieldCatalog ()
+       mask = catalog.fovMask (fov)
 
        # subtract galactic exclusion zone
-       taperB = self.taperB
-       taperL = self.taperL
-       peakL = self.peakL
-       band = peakL - taperL
-       if ( (taperB != 0.) & (taperL != 0.) ) :
-          sql += '( (fieldGL < 180. AND abs(fieldGB) > (%f - (%f * abs(fieldGL)) / %f) ) OR ' % (peakL,
-                   band,
-                   taperB)
-          sql += '(fieldGL > 180. AND abs(fieldGB) > (%f - (%f * abs(fieldGL-360.)) / %f))) AND ' % (peakL,
-                   band,
-                   taperB)
+       mask &= catalog.galacticTaperMask (self.peakL, self.taperL, self.taperB)
 
        # subtract un-viewable sky
-       if (raMax > raMin):
-           sql += '%s BETWEEN %f AND %f AND ' % (dbRA,
-                                                 raMin,
-                                                 raMax)
-       elif (raMax < raMin):
-           sql += '(%s BETWEEN %f AND 360.0 OR ' % (dbRA,
-                                                    raMin)
-           sql += '%s BETWEEN 0.0 AND %f) AND ' % (dbRA,
-                                                   raMax)
-       else:
-           sql += '%s BETWEEN 0.0 AND 360.0 AND ' % (dbRA)
+       mask &= catalog.raWindowMask (raMin, raMax)
        # select reduced range for starting new sequences
-       sqlNewSeq = sql
-       if (raMaxNewSeq > raMinNewSeq):
-           sqlNewSeq += '%s BETWEEN %f AND %f AND ' % (dbRA,
-                                                 raMinNewSeq,
-                                                 raMaxNewSeq)
-       elif (raMaxNewSeq < raMinNewSeq):
-           sqlNewSeq += '(%s BETWEEN %f AND 360.0 OR ' % (dbRA,
-                                                    raMinNewSeq)
-           sqlNewSeq += '%s BETWEEN 0.0 AND %f) AND ' % (dbRA,
-                                                   raMaxNewSeq)
-       else:
-           sqlNewSeq += '%s BETWEEN 0.0 AND 360.0 AND ' % (dbRA)
+       maskNewSeq = mask & catalog.raWindowMask (raMinNewSeq, raMaxNewSeq)
 
        DecLimit = math.acos(1./float(self.maxAirmass))  * RAD2DEG
-       sql += '%s BETWEEN %f AND %f  and %f < %s < %f' % (dbDec,
-                                        (lat_RAD*RAD2DEG)-DecLimit,
-                                        (lat_RAD*RAD2DEG)+DecLimit,
-                                        -abs(self.maxReach),dbDec,abs(self.maxReach))
-       sqlNewSeq += '%s BETWEEN %f AND %f  and %f < %s < %f' % (dbDec,
-                                        (lat_RAD*RAD2DEG)-DecLimit,
-                                        (lat_RAD*RAD2DEG)+DecLimit,
-                                        -abs(self.maxReach),dbDec,abs(self.maxReach))
-
-       # Send the query to the DB
-       (n, res) = self.lsstDB.executeSQL (sql)
-
-       # Build the output dictionary
-       for (ra, dec, fieldID) in res:
-           fields[fieldID] = (ra, dec)
+       maskDec = catalog.betweenMask (dbDec,
+                                      (lat_RAD*RAD2DEG)-DecLimit,
+                                      (lat_RAD*RAD2DEG)+DecLimit)
+       # MySQL evaluated the former "-maxReach < fieldDec < maxReach" clause
+       # as "(-maxReach < fieldDec) < maxReach", comparing a 0/1 truth value.
+       maskDec &= (catalog.dec > sqlFloat (-abs(self.maxReach))) < sqlFloat (abs(self.maxReach))
+       mask &= maskDec
+       maskNewSeq &= maskDec
+
+       fields = catalog.select (mask)
 
        self.targets = fields.copy()
 
        self.computeTargetsHAatTwilight(lst_RAD)
 
-       #print (sql)
-       print ('*** Found %d SNSS fields for propID=%d***' % (len (res),self.propID))
+       print ('*** Found %d SNSS fields for propID=%d***' % (len (fields),self.propID))
 
-       (n, res) = self.lsstDB.executeSQL (sqlNewSeq)
-       fields = {}
-       for (ra, dec, fieldID) in res:
-           fields[fieldID] = (ra, dec)
+       fields = catalog.select (maskNewSeq)
        self.targetsNewSeq = fields.copy()
-       print ('*** Found %d SNSS fields for propID=%d for new sequences ***' % (len (res),self.propID))
+       print ('*** Found %d SNSS fields for propID=%d for new sequences ***' % (len (fields),self.propID))
 
        ## Benchmark memory use - exit
        #m1 = memory()
@@ -26,21 +26,67 @@ Position in the sequence
 """
 
 
+import numpy
+
 from utilities import *
 from LSSTObject import *
 from Distribution import *
+from SequenceStore import *
+
+def rankTimeWindowArray(date, nextDate, interval, windowStart, windowMax, windowEnd):
+    """
+    Evaluates SubSequence.RankTimeWindow for many subsequences at once.
+
+    Input
+    date:         current date (s).
+    nextDate:     array of the next event dates (s).
+    interval:     array of the intervals to the next events (s).
+    windowStart:  array of the window start parameters.
+    windowMax:    array of the window maximum parameters.
+    windowEnd:    array of the window end parameters.
+
+    Return
+    array of ranks, with the same conventions as RankTimeWindow:
+    -0.1 not tonight, 0.0 waiting, -1.0 event missed.
+    """
+    scale = numpy.asarray(interval, dtype=float)
+    deltat = date - numpy.asarray(nextDate, dtype=float)
 
-SEQ_IDLE = 0
-SEQ_ACTIVE = 1
-SEQ_COMPLETE = 2
-SEQ_LOST = 3
+    w_start = numpy.asarray(windowStart, dtype=float) * scale
+    w_inflex = numpy.asarray(windowMax, dtype=float) * scale
+    w_end = numpy.asarray(windowEnd, dtype=float) * scale
+
+    # the rising edge is only used where w_start < deltat <= w_inflex
+    rise = w_inflex - w_start
+    rise = numpy.where(rise > 0.0, rise, 1.0)
+
+    return numpy.select([deltat <= w_start - DAY, deltat <= w_start, deltat <= w_inflex, deltat <= w_end],
+                        [-0.1, 0.0, (deltat - w_start) / rise, 1.0], -1.0)
 
 class SubSequence(LSSTObject):
     """
     Base class for the Sequence hiarchy.
     """
+    # scalar state, kept in the row of this subsequence in its SequenceStore
+    state = storedColumn('subsequences', 'state')
+    aborted = storedColumn('subsequences', 'aborted')
+    date = storedColumn('subsequences', 'date')
+    nAllEvents = storedColumn('subsequences', 'nAllEvents')
+    nObsEvents = storedColumn('subsequences', 'nObsEvents')
+    nMisEvents = storedColumn('subsequences', 'nMisEvents')
+    subeventIndex = storedColumn('subsequences', 'subeventIndex')
+    exposuresLeft = storedColumn('subsequences', 'exposuresLeft')
+    exclusiveBlockNeeded = storedColumn('subsequences', 'exclusiveBlockNeeded')
+    pairNum = storedColumn('subsequences', 'pairNum')
+
     def __init__(self, propID, field, WLtype, numGroupedVisits, subName, subNested, subFilters, subExposures,
-                 subEvents, subMaxMissed, subInterval, subWindowStart, subWindowMax, subWindowEnd):
+                 subEvents, subMaxMissed, subInterval, subWindowStart, subWindowMax, subWindowEnd,
+                 store=None):
+
+        if store is None:
+            store = SequenceStore(capacity=1)
+        self.sequenceStore = store
+        self.storeRow = store.addSubSequence()
 
         self.propID = propID
         self.field = field
@@ -92,6 +138,18 @@ class SubSequence(LSSTObject):
         self.Restart()
         return
 
+    def Release(self):
+        """
+        Release the rows of this subsequence and of its nested
+        subsequence in the SequenceStore. The instance must not be used
+        afterwards.
+        """
+        if self.nestedSubSequence is not None:
+            self.nestedSubSequence.Release()
+        self.sequenceStore.releaseSubSequence(self.storeRow)
+
+        return
+
     def Restart(self):
 
         if self.nestedSubSequence is not None:
@@ -287,6 +345,19 @@ class SubSequence(LSSTObject):
 
         return rank
 
+    def GetTimeWindowParams(self):
+        """
+        Return the parameters RankTimeWindow evaluates, taken from the
+        nested subsequence while it is in progress, as
+        (nextDate, interval, windowStart, windowMax, windowEnd).
+        """
+        if self.nestedSubSequence is not None:
+            if self.nestedSubSequence.IsIdle() is False:
+                return self.nestedSubSequence.GetTimeWindowParams()
+
+        return (self.GetNextDate(), self.GetNextInterval(), self.subWindowStart, self.subWindowMax,
+                self.subWindowEnd)
+
     def ObserveEvent(self, date, obsHistID):
 
         if self.nestedSubSequence is not None:
@@ -394,11 +465,21 @@ class SuperSequence(LSSTObject):
     """
     Base class for the Sequence hiarchy.
     """
+    # scalar state, kept in the row of this sequence in its SequenceStore
+    seqNum = storedColumn('sequences', 'seqNum')
+    state = storedColumn('sequences', 'state')
+    aborted = storedColumn('sequences', 'aborted')
+    date = storedColumn('sequences', 'date')
+    nAllEvents = storedColumn('sequences', 'nAllEvents')
+    nObsEvents = storedColumn('sequences', 'nObsEvents')
+    nMisEvents = storedColumn('sequences', 'nMisEvents')
+    nTargetEvents = storedColumn('sequences', 'nTargetEvents')
+
     def __init__(self, propID, field, seqNum, WLtype, numGroupedVisits, masterSubSequence, subSeqName,
                  subSeqNested, subSeqFilters, subSeqExposures, subSeqEvents, subSeqMaxMissed, subSeqInterval,
                  subSeqWindowStart, subSeqWindowMax, subSeqWindowEnd, overflowLevel=0.0,
                  progressToStartBoost=1.0, maxBoostToComplete=0.0, log=None, logfile='./SuperSequence.log',
-                 verbose=0):
+                 verbose=0, store=None):
         """
         Standard initializer.
 
@@ -416,9 +497,15 @@ class SuperSequence(LSSTObject):
         logfile     Name (and path) of the desired log file.
                     Defaults "./Sequence.log".
         verbose:    Log verbosity: 0=minimal, 1=wordy, >1=very verbose
+        store:      SequenceStore keeping the state of the sequence and
+                    of its subsequences. Defaults to a private store.
 
 
         """
+        if store is None:
+            store = SequenceStore(capacity=len(subSeqName))
+        self.sequenceStore = store
+        self.storeRow = store.addSequence(field, WLtype)
 
         self.propID = propID
         self.field = field
@@ -460,7 +547,8 @@ class SuperSequence(LSSTObject):
                                                  self.subSeqInterval[n],
                                                  self.subSeqWindowStart[n],
                                                  self.subSeqWindowMax[n],
-                                                 self.subSeqWindowEnd[n])
+                                                 self.subSeqWindowEnd[n],
+                                                 store)
 
         #second find the nested subsequences and attaches them
         nestedlist = []
@@ -485,6 +573,17 @@ class SuperSequence(LSSTObject):
 
         return
 
+    def Release(self):
+        """
+        Release the rows of this sequence and of its subsequences in the
+        SequenceStore. The instance must not be used afterwards.
+        """
+        for name in self.subSeqName:
+            self.subSequence[name].Release()
+        self.sequenceStore.releaseSequence(self.storeRow)
+
+        return
+
     def Restart(self, seqNum):
 
         self.seqNum = seqNum
@@ -763,5 +862,17 @@ class SuperSequence(LSSTObject):
 
         return (rank, timeWindow)
 
+    def GetTimeWindowParams(self, name):
+        """
+        Return the time window parameters of the subsequence, see
+        SubSequence.GetTimeWindowParams, when RankTimeWindow ranks it
+        by its time window, else None.
+        """
+        subsequence = self.subSequence[name]
+        if subsequence.HasTimeWindow() and subsequence.GetProgress() < 1.0:
+            return subsequence.GetTimeWindowParams()
+
+        return None
+
     def GetRemainingAllowedMisses(self, name):
         return self.subSequence[name].GetRemainingAllowedMisses()
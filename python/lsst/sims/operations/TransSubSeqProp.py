@@ -7,9 +7,52 @@ from Observation import *
 from ObsHistory import *
 from Sequence import *
 from SuperSequence import *
+from SequenceStore import *
 from Proposal import *
 from SeqHistory import *
 import copy
+import random
+import numpy
+
+
+def remainingTree(n):
+    """
+    Binary indexed tree counting the n entries of a list that are still
+    to be picked, all of them to start with.
+    """
+    tree = [0] * (n + 1)
+    for i in xrange(1, n + 1):
+        tree[i] += 1
+        j = i + (i & -i)
+        if j <= n:
+            tree[j] += tree[i]
+
+    return tree
+
+
+def pickRemaining(tree, k):
+    """
+    Remove the k-th (from 0) remaining entry from the tree and return its
+    index in the list, in O(log n).
+    """
+    n = len(tree) - 1
+    i = 0
+    step = 1
+    while 2 * step <= n:
+        step *= 2
+    while step > 0:
+        if i + step <= n and tree[i + step] <= k:
+            i += step
+            k -= tree[i]
+        step /= 2
+    index = i
+    i += 1
+    while i <= n:
+        tree[i] -= 1
+        i += i & -i
+
+    return index
+
 
 class TransSubSeqProp(Proposal):
     """
@@ -72,6 +115,9 @@ class TransSubSeqProp(Proposal):
         self.sequences = {}
         self.tonightSubseqsForTarget = {}
 
+        # Scalar state of all the sequences, for querying them at once.
+        self.sequenceStore = SequenceStore()
+
         # Create the ObsHistory instance and cleanup any leftover
         self.obsHistory = ObsHistory(lsstDB=self.lsstDB, dbTableDict=self.dbTableDict, log=self.log,
                                      logfile=self.logfile, verbose=self.verbose)
@@ -162,51 +208,79 @@ class TransSubSeqProp(Proposal):
         (date, mjd, lst_RAD) = dateProfile
         runProgress = date / YEAR / nRun
 
-        self.tonightTargets = self.targets.copy()
+        counters = self.startNightSequences(runProgress, randomizeSequencesSelection)
+
+        if self.log:
+            self.log.info('%sProp: startNight() propID=%d Sequences: new=%i deletedidle=%i '
+                          'restartedlost=%i restartedcomplete=%i total=%i targetprogress=%.3f%% '
+                          'runprogress=%.3f%%' % (self.propFullName, self.propID, counters['new'],
+                                                  counters['deletedidle'], counters['restartedlost'],
+                                                  counters['restartedcomplete'], counters['kept'],
+                                                  100 * self.globalProgress, 100 * runProgress))
+
+        return
+
+    def startNightSequences(self, runProgress, randomizeSequencesSelection):
+        """
+        Night start bookkeeping of the sequences: deletes the idle
+        sequences of the fields that left the region for new sequences,
+        starts or restarts sequences in that region while the progress
+        and the number of active sequences allow it, and builds
+        tonightTargets and tonightSubseqsForTarget from the fields with a
+        sequence to pursue. Membership tests are done on dictionaries
+        and sets, and the state of the sequences is read from the
+        sequence store, so the cost is linear in the number of fields.
+
+        Input
+        runProgress     fraction of the run elapsed.
+        randomizeSequencesSelection
+                        True to pick the new fields at random, else in
+                        fieldID order.
+
+        Return
+        dictionary of counters new, deletedidle, restartedlost,
+        restartedcomplete and kept, also kept in self.sequenceCounters.
+        """
+        counters = {'new': 0, 'deletedidle': 0, 'restartedlost': 0, 'restartedcomplete': 0, 'kept': 0}
 
         # deletes all sequences that did not start while the fields were
-        # in the region for starting new sequences.
-        notstarted = 0
-        for fieldID in self.sequences.keys():
-            if fieldID not in self.targetsNewSeq.keys():
-                if self.sequences[fieldID].IsIdle():
-                    # self.log.info('%sProp: startNight() deleted sequence field=%d at progress=%.3f%% '
-                    #               'state=%d nevents=%d' % (self.propFullName, fieldID,
-                    #                                        100*self.sequences[fieldID].GetProgress(),
-                    #                                        self.sequences[fieldID].state,
-                    #                                        self.sequences[fieldID].nAllEvents))
-                    notstarted += 1
-                    del self.sequences[fieldID]
+        # in the region for starting new sequences, and collects the
+        # sequences of the target region.
+        fieldIDs = self.sequences.keys()
+        tonightFields = []
+        for (fieldID, idle) in zip(fieldIDs, self.sequenceStore.IsIdle(fieldIDs).tolist()):
+            if idle and fieldID not in self.targetsNewSeq:
+                counters['deletedidle'] += 1
+                self.sequences[fieldID].Release()
+                del self.sequences[fieldID]
+            elif fieldID in self.targets:
+                tonightFields.append(fieldID)
 
         # counts the active sequences in the target region
-        currentActiveSequences = 0
-        coaddedProgress = 0.0
-        coaddedNumber = 0
-        for fieldID in self.sequences.keys():
-            if fieldID in self.tonightTargets.keys():
-                coaddedProgress += self.sequences[fieldID].GetProgress()
-                coaddedNumber += 1
-                if (not self.sequences[fieldID].IsLost()) and (not self.sequences[fieldID].IsComplete()):
-                    currentActiveSequences += 1
-
-        # creates the sequence object for all the new fields in the restricted area
-        newseq = 0
-        restartedlost = 0
-        restartedcomplete = 0
-        keptsequences = 0
-        #listOfNewFields=self.targetsNewSeq.keys()
+        coaddedProgress = sum(self.sequenceStore.GetProgress(tonightFields).tolist(), 0.0)
+        coaddedNumber = len(tonightFields)
+        currentActiveSequences = len(self.sequenceStore.Select(tonightFields, [SEQ_IDLE, SEQ_ACTIVE]))
+
+        # creates the sequence object for all the new fields in the restricted area.
+        # The fields are taken in fieldID order, or at random among the
+        # remaining ones with the draws of random.choice, so that a seed
+        # picks the same fields as with list.remove.
+        droppedFields = set()
         listOfNewFields = sorted(self.targetsNewSeq.iterkeys())
-        while (len(listOfNewFields) > 0 and currentActiveSequences < self.maxNumberActiveSequences and
+        nNewFields = len(listOfNewFields)
+        if randomizeSequencesSelection:
+            remaining = remainingTree(nNewFields)
+        while (nNewFields > 0 and currentActiveSequences < self.maxNumberActiveSequences and
                 (coaddedProgress / max(coaddedNumber, 1) > runProgress or
                     currentActiveSequences < self.minNumberActiveSequences)):
             if randomizeSequencesSelection:
-                fieldID = random.choice(listOfNewFields)
+                fieldID = listOfNewFields[pickRemaining(remaining, int(random.random() * nNewFields))]
             else:
-                fieldID = listOfNewFields[0]
-            listOfNewFields.remove(fieldID)
+                fieldID = listOfNewFields[len(listOfNewFields) - nNewFields]
+            nNewFields -= 1
 
             # create a new sequence object
-            if fieldID not in self.sequences.keys():
+            if fieldID not in self.sequences:
                 self.SeqCount += 1
                 self.sequences[fieldID] = SuperSequence(self.propID, fieldID, self.SeqCount, self.WLtype,
                                                         self.numGroupedVisits,
@@ -216,77 +290,53 @@ class TransSubSeqProp(Proposal):
                                                         self.subSeqMaxMissed, self.subSeqInterval,
                                                         self.subSeqWindowStart, self.subSeqWindowMax,
                                                         self.subSeqWindowEnd, self.overflowLevel,
-                                                        self.progressToStartBoost, self.maxBoostToComplete)
+                                                        self.progressToStartBoost, self.maxBoostToComplete,
+                                                        store=self.sequenceStore)
                 coaddedNumber += 1
-                newseq += 1
+                counters['new'] += 1
                 currentActiveSequences += 1
             # was sequence lost?
             elif self.sequences[fieldID].IsLost():
                 if self.restartLostSequences:
                     self.SeqCount += 1
                     self.sequences[fieldID].Restart(self.SeqCount)
-                    restartedlost += 1
+                    counters['restartedlost'] += 1
                     currentActiveSequences += 1
                 else:
-                    # ZZZZ - mm debug 2nd delete of tonightTargets
-                    # print "Prop[%d].startNight() while targetsNewSeq: seq lost: delete "\
-                    #       "self.tonightTargets[%d] date = %d" % (self.propID, fieldID, date)
-                    del self.tonightTargets[fieldID]
+                    droppedFields.add(fieldID)
             # was sequence completed?
             elif self.sequences[fieldID].IsComplete():
                 if self.restartCompleteSequences and not self.overflow:
                     self.SeqCount += 1
                     self.sequences[fieldID].Restart(self.SeqCount)
-                    restartedcomplete += 1
+                    counters['restartedcomplete'] += 1
                     currentActiveSequences += 1
                 else:
-                    # ZZZZ - mm debug 2nd delete of tonightTargets
-                    # print "Prop[%d].startNight() while targetsNewSeq: seq complete: "\
-                    #       "delete self.tonightTargets[%d] date = %d" % (self.propID, fieldID, date)
-                    del self.tonightTargets[fieldID]
-            #else:
-            #    prog = self.sequences[fieldID].GetProgress()
-            #    if prog >= 1.0:
-            #    print "seqnNum=%i fieldID=%i progress=%f" % (self.sequences[fieldID].seqNum, fieldID, prog,
-            #                                                 str(self.sequences[fieldID].allHistory),
-            #                                                 self.sequences[fieldID].state)
-
-        # From the broad target area, just keep the fields
-        # associated to a target that is not lost and not complete
+                    droppedFields.add(fieldID)
+
+        # From the broad target area, just keep the fields associated to a
+        # started sequence that is not lost and not complete
+        candidateFields = [fieldID for fieldID in self.targets
+                           if fieldID in self.sequences and fieldID not in droppedFields]
+        if self.overflow:
+            keptStates = [SEQ_IDLE, SEQ_ACTIVE, SEQ_COMPLETE]
+        else:
+            keptStates = [SEQ_IDLE, SEQ_ACTIVE]
+        self.tonightTargets = {}
         self.tonightSubseqsForTarget = {}
-        for fieldID in self.tonightTargets.keys():
-            if fieldID in self.sequences.keys():
-                complete_seq = self.sequences[fieldID].IsComplete() and not self.overflow
-                if self.sequences[fieldID].IsLost() or complete_seq:
-                    # ZZZZ - mm debug 2nd delete of tonightTargets
-                    # print "Prop[%d].startNight() for tonightTargets() in self.sequences: seq is lost or "\
-                    #       "complete: delete self.tonightTargets[%d] date = %d" % (self.propID, fieldID,
-                    #                                                               date)
-                    # print "how would we ever get here?"
-                    del self.tonightTargets[fieldID]
-                else:
-                    keptsequences += 1
-                    self.tonightSubseqsForTarget[fieldID] = list(self.sequences[fieldID].subSeqName)
-            # only pursue targets that are already started sequences
-            else:
-                # ZZZZ - mm debug 2nd delete of tonightTargets
-                # print "TSS.startNight() for tonightTargets() and not in self.sequences: delete "\
-                #       "self.tonightTargets[%d] date = %d" % (fieldID, date)
-                del self.tonightTargets[fieldID]
+        for fieldID in self.sequenceStore.Select(candidateFields, keptStates):
+            self.tonightTargets[fieldID] = self.targets[fieldID]
+            self.tonightSubseqsForTarget[fieldID] = list(self.sequences[fieldID].subSeqName)
+        counters['kept'] = len(self.tonightTargets)
 
         if coaddedNumber > 0:
             self.globalProgress = coaddedProgress / coaddedNumber
         else:
             self.globalProgress = 0.0
 
-        if self.log:
-            self.log.info('%sProp: startNight() propID=%d Sequences: new=%i deletedidle=%i '
-                          'restartedlost=%i restartedcomplete=%i total=%i targetprogress=%.3f%% '
-                          'runprogress=%.3f%%' % (self.propFullName, self.propID, newseq, notstarted,
-                                                  restartedlost, restartedcomplete, keptsequences,
-                                                  100 * self.globalProgress, 100 * runProgress))
+        self.sequenceCounters = counters
 
-        return
+        return counters
 
     def GetProgressPerFilter(self):
 
@@ -507,6 +557,14 @@ class TransSubSeqProp(Proposal):
             events_nofilter = 0
             events_noseeing = 0
 
+            # Rank the subsequences of the fields above the horizon and away
+            # from the moon at once, see rankSubsequences.
+            rankedFields = [fieldID for fieldID in listOfFieldsToEvaluate
+                            if self.schedulingData.airmass[sdtime][fieldID] <= self.maxAirmass and
+                            self.schedulingData.dist2moon[sdtime][fieldID] >= minDistance2Moon]
+            ranking = self.rankSubsequences(rankedFields, date)
+            transitedFields = set()
+
             for fieldID in listOfFieldsToEvaluate:
 
                 fieldRecordList = []
@@ -570,26 +628,12 @@ class TransSubSeqProp(Proposal):
                     if allfiltersavailable is False:
                         continue
 
-                    # Boost factor according to the remaining observable days on sky
-                    if self.DaysLeftToStartBoost > 0.0 and self.rankDaysLeftMax != 0.0:
-                        observableDaysLeft = max((self.ha_twilight[fieldID] + self.ha_maxairmass) * 15.0, 0.0)
-                        rankDaysLeft = max(1.0 - observableDaysLeft / self.DaysLeftToStartBoost, 0.0)
+                    # Once an event of the field was missed the sequence changed
+                    # state, so the rest of its subsequences are ranked again.
+                    if fieldID in transitedFields:
+                        (rankTime, timeWindow, rank) = self.rankSubsequence(fieldID, subseq, date)
                     else:
-                        rankDaysLeft = 0.0
-
-                    if self.WLtype or self.sequences[fieldID].IsActive(subseq):
-                        (rankTime, timeWindow) = self.sequences[fieldID].RankTimeWindow(subseq, date)
-                        rankLossRisk = max(1.0 - 0.5 *
-                                           self.sequences[fieldID].GetRemainingAllowedMisses(subseq),
-                                           0.0)
-                    elif self.sequences[fieldID].IsIdle(subseq):
-                        rankTime = self.rankIdleSeq / self.rankTimeMax
-                        timeWindow = True
-                        rankLossRisk = 0.0
-                    else:
-                        rankTime = 0.0
-                        timeWindow = False
-                        rankLossRisk = 0.0
+                        (rankTime, timeWindow, rank) = ranking[(fieldID, subseq)]
 
                     if rankTime == -0.1:
                         events_nottonight += 1
@@ -600,17 +644,6 @@ class TransSubSeqProp(Proposal):
                         #       + str(self.ha_maxairmass) + ' observableDaysLeft=' + str(observableDaysLeft)\
                         #       + ' rankDaysLeft=' + str(rankDaysLeft)
 
-                        if timeWindow:
-                            factor = self.rankTimeMax
-                        else:
-                            if self.globalProgress < 1.0:
-                                    factor = self.rankIdleSeq / (1.0 - self.globalProgress)
-                            elif self.overflowLevel > 0.0:
-                                factor = self.rankIdleSeq / (self.overflowLevel / self.globalProgress)
-
-                        rank = rankTime * factor + rankLossRisk * self.rankLossRiskMax \
-                            + rankDaysLeft * self.rankDaysLeftMax
-
                         filter = self.sequences[fieldID].GetNextFilter(subseq)
                         #print 'fieldID='+str(fieldID)+' subseq='+str(subseq)+' filter='+str(filter)
                         exclusiveBlockRequired = self.sequences[fieldID].GetExclusiveBlockNeed(subseq)
@@ -658,6 +691,7 @@ class TransSubSeqProp(Proposal):
                     elif rankTime < 0.0:
 
                         events_missed += 1
+                        transitedFields.add(fieldID)
 
                         oh_filter = self.sequences[fieldID].GetNextFilter(subseq)
                         obsHist = self.lsstDB.addMissedObservation(oh_filter, date, mjd, sdnight, lst_RAD,
@@ -731,6 +765,141 @@ class TransSubSeqProp(Proposal):
             # The cycle has ended and next one hasn't started yet (full moon for NEA)
             return []
 
+    def idleRankFactor(self):
+        """
+        Return the factor of the rank of the subsequences without a
+        time window, given the global progress of the proposal. Past the
+        goal without an overflow level the factor is 0.0; the inline code
+        of suggestObs left it undefined there, raising UnboundLocalError
+        or reusing the factor of the previous subsequence.
+        """
+        if self.globalProgress < 1.0:
+            return self.rankIdleSeq / (1.0 - self.globalProgress)
+        elif self.overflowLevel > 0.0:
+            return self.rankIdleSeq / (self.overflowLevel / self.globalProgress)
+        else:
+            return 0.0
+
+    def rankSubsequence(self, fieldID, subseq, date):
+        """
+        Rank one subsequence of tonight from its sequence object.
+
+        Input
+        fieldID     field of the sequence.
+        subseq      subsequence name.
+        date        simulated time (s).
+
+        Return
+        (rankTime, timeWindow, rank) where rankTime is the time window
+        rank (-0.1 not tonight, 0.0 waiting, <0.0 missed) and rank the
+        proposal rank of the event, 0.0 unless rankTime > 0.0.
+        """
+        # Boost factor according to the remaining observable days on sky
+        if self.DaysLeftToStartBoost > 0.0 and self.rankDaysLeftMax != 0.0:
+            observableDaysLeft = max((self.ha_twilight[fieldID] + self.ha_maxairmass) * 15.0, 0.0)
+            rankDaysLeft = max(1.0 - observableDaysLeft / self.DaysLeftToStartBoost, 0.0)
+        else:
+            rankDaysLeft = 0.0
+
+        if self.WLtype or self.sequences[fieldID].IsActive(subseq):
+            (rankTime, timeWindow) = self.sequences[fieldID].RankTimeWindow(subseq, date)
+            rankLossRisk = max(1.0 - 0.5 * self.sequences[fieldID].GetRemainingAllowedMisses(subseq), 0.0)
+        elif self.sequences[fieldID].IsIdle(subseq):
+            rankTime = self.rankIdleSeq / self.rankTimeMax
+            timeWindow = True
+            rankLossRisk = 0.0
+        else:
+            rankTime = 0.0
+            timeWindow = False
+            rankLossRisk = 0.0
+
+        if rankTime > 0.0:
+            if timeWindow:
+                factor = self.rankTimeMax
+            else:
+                factor = self.idleRankFactor()
+            rank = rankTime * factor + rankLossRisk * self.rankLossRiskMax \
+                + rankDaysLeft * self.rankDaysLeftMax
+        else:
+            rank = 0.0
+
+        return (rankTime, timeWindow, rank)
+
+    def rankSubsequences(self, fieldList, date):
+        """
+        Rank the subsequences of tonight of many fields at once, with
+        the same result as rankSubsequence on each of them. The next
+        event date, interval, window parameters and remaining misses of
+        the subsequences ranked by their time window are gathered in
+        arrays, and the time window, loss risk and days left terms are
+        evaluated as array expressions; the few subsequences ranked by
+        their progress are ranked by their sequence object.
+
+        Input
+        fieldList   fields to rank.
+        date        simulated time (s).
+
+        Return
+        dictionary {(fieldID, subseq): (rankTime, timeWindow, rank)}
+        """
+        keys = []
+        rankTime = []
+        timeWindow = []
+        remainingMisses = []
+        haTwilight = []
+        windowRows = []
+        windowParams = []
+        for fieldID in fieldList:
+            sequence = self.sequences[fieldID]
+            if sequence.IsLost():
+                continue
+            for subseq in self.tonightSubseqsForTarget[fieldID]:
+                if self.WLtype or sequence.IsActive(subseq):
+                    params = sequence.GetTimeWindowParams(subseq)
+                    if params is None:
+                        (rt, tw) = sequence.RankTimeWindow(subseq, date)
+                    else:
+                        (rt, tw) = (0.0, True)
+                        windowRows.append(len(keys))
+                        windowParams.append(params)
+                    misses = sequence.GetRemainingAllowedMisses(subseq)
+                elif sequence.IsIdle(subseq):
+                    (rt, tw, misses) = (self.rankIdleSeq / self.rankTimeMax, True, None)
+                else:
+                    (rt, tw, misses) = (0.0, False, None)
+                keys.append((fieldID, subseq))
+                rankTime.append(rt)
+                timeWindow.append(tw)
+                remainingMisses.append(misses)
+                haTwilight.append(self.ha_twilight[fieldID])
+
+        if keys == []:
+            return {}
+
+        rankTime = numpy.array(rankTime, dtype=float)
+        if windowRows != []:
+            (nextDate, interval, windowStart, windowMax, windowEnd) = zip(*windowParams)
+            rankTime[windowRows] = rankTimeWindowArray(date, nextDate, interval, windowStart, windowMax,
+                                                       windowEnd)
+
+        hasRisk = numpy.array([misses is not None for misses in remainingMisses])
+        misses = numpy.array([0.0 if misses is None else misses for misses in remainingMisses], dtype=float)
+        rankLossRisk = numpy.where(hasRisk, numpy.maximum(1.0 - 0.5 * misses, 0.0), 0.0)
+
+        # Boost factor according to the remaining observable days on sky
+        if self.DaysLeftToStartBoost > 0.0 and self.rankDaysLeftMax != 0.0:
+            haTwilight = numpy.array(haTwilight, dtype=float)
+            observableDaysLeft = numpy.maximum((haTwilight + self.ha_maxairmass) * 15.0, 0.0)
+            rankDaysLeft = numpy.maximum(1.0 - observableDaysLeft / self.DaysLeftToStartBoost, 0.0)
+        else:
+            rankDaysLeft = numpy.zeros(len(keys))
+
+        factor = numpy.where(timeWindow, self.rankTimeMax, self.idleRankFactor())
+        rank = rankTime * factor + rankLossRisk * self.rankLossRiskMax + rankDaysLeft * self.rankDaysLeftMax
+        rank = numpy.where(rankTime > 0.0, rank, 0.0)
+
+        return dict(zip(keys, zip(rankTime.tolist(), timeWindow, rank.tolist())))
+
     def getFieldCoordinates(self, fieldID):
         """
         Given a fieldID, fetch the corresponding values for RA and Dec
@@ -869,23 +1038,22 @@ class TransSubSeqProp(Proposal):
         if self.log:
             self.log.info('%sProp: FinishSequences()' % (self.propFullName))
 
-        for fieldID in self.sequences.keys():
-            if (not self.sequences[fieldID].IsComplete()) and (not self.sequences[fieldID].IsLost()):
-                if self.log:
-                    self.log.info('%sProp: suggestObs() propID=%d sequence LOST for field=%i end of cycle' %
-                                  (self.propFullName, self.propID, fieldID))
-                self.sequences[fieldID].Abort()
-
-                # Update sequence history DB
-                seq = self.sequences[fieldID]
-                seqHist = self.lsstDB.addSeqHistory(seq.date, obsdate, seq.seqNum, seq.GetProgress(),
-                                                    seq.GetNumTargetEvents(), seq.GetNumActualEvents(),
-                                                    CYCLE_END, 0, fieldID, self.sessionID, self.propID)
-                for obsID in seq.GetListObsID():
-                    self.lsstDB.addSeqHistoryObsHistory(seqHist.sequenceID, obsID, self.sessionID)
-
-                for misID in seq.GetListMisID():
-                    self.lsstDB.addSeqHistoryMissedHistory(seqHist.sequenceID, misID, self.sessionID)
+        for fieldID in self.sequenceStore.Select(self.sequences.keys(), [SEQ_IDLE, SEQ_ACTIVE]):
+            if self.log:
+                self.log.info('%sProp: suggestObs() propID=%d sequence LOST for field=%i end of cycle' %
+                              (self.propFullName, self.propID, fieldID))
+            self.sequences[fieldID].Abort()
+
+            # Update sequence history DB
+            seq = self.sequences[fieldID]
+            seqHist = self.lsstDB.addSeqHistory(seq.date, obsdate, seq.seqNum, seq.GetProgress(),
+                                                seq.GetNumTargetEvents(), seq.GetNumActualEvents(),
+                                                CYCLE_END, 0, fieldID, self.sessionID, self.propID)
+            for obsID in seq.GetListObsID():
+                self.lsstDB.addSeqHistoryObsHistory(seqHist.sequenceID, obsID, self.sessionID)
+
+            for misID in seq.GetListMisID():
+                self.lsstDB.addSeqHistoryMissedHistory(seqHist.sequenceID, misID, self.sessionID)
 
         return
 
@@ -896,29 +1064,23 @@ class TransSubSeqProp(Proposal):
         if self.log:
             self.log.info('%sProp: closeProposal()' % (self.propFullName))
 
-        for fieldID in self.sequences.keys():
-            if (not self.sequences[fieldID].IsComplete()) and (not self.sequences[fieldID].IsLost()):
-                if self.log:
-                    self.log.info('%sProp: closeProposal() propID=%d sequence LOST for field=%i end of '
-                                  'simulation' % (self.propFullName, self.propID, fieldID))
-                #self.sequences[fieldID].Abort()
-
-                # Update sequence history DB
-                seq = self.sequences[fieldID]
-                seqHist = self.lsstDB.addSeqHistory(seq.date, time, seq.seqNum, seq.GetProgress(),
-                                                    seq.GetNumTargetEvents(), seq.GetNumActualEvents(),
-                                                    SIMULATION_END, 0, fieldID, self.sessionID, self.propID)
-                for obsID in seq.GetListObsID():
-                    self.lsstDB.addSeqHistoryObsHistory(seqHist.sequenceID, obsID, self.sessionID)
-
-                for misID in seq.GetListMisID():
-                    self.lsstDB.addSeqHistoryMissedHistory(seqHist.sequenceID, misID, self.sessionID)
-
-        # delete OlapField user-defined region table
-        if self.userRegion[0] is not None:
-            overlappingField = "OlapField_%d_%d" % (self.sessionID, self.propID)
-            # Result from below is never used
-            self.lsstDB.dropTable(overlappingField)
+        for fieldID in self.sequenceStore.Select(self.sequences.keys(), [SEQ_IDLE, SEQ_ACTIVE]):
+            if self.log:
+                self.log.info('%sProp: closeProposal() propID=%d sequence LOST for field=%i end of '
+                              'simulation' % (self.propFullName, self.propID, fieldID))
+            #self.sequences[fieldID].Abort()
+
+            # Update sequence history DB
+            seq = self.sequences[fieldID]
+            seqHist = self.lsstDB.addSeqHistory(seq.date, time, seq.seqNum, seq.GetProgress(),
+                                                seq.GetNumTargetEvents(), seq.GetNumActualEvents(),
+                                                SIMULATION_END, 0, fieldID, self.sessionID, self.propID)
+            for obsID in seq.GetListObsID():
+                self.lsstDB.addSeqHistoryObsHistory(seqHist.sequenceID, obsID, self.sessionID)
+
+            for misID in seq.GetListMisID():
+                self.lsstDB.addSeqHistoryMissedHistory(seqHist.sequenceID, misID, self.sessionID)
+
         return
 
     def RestartSequences(self):
@@ -926,13 +1088,12 @@ class TransSubSeqProp(Proposal):
         if self.log:
             self.log.info('%sProp: RestartFinishedSequences() propID=%d' % (self.propFullName, self.propID))
 
-        for fieldID in self.sequences.keys():
-            if self.sequences[fieldID].IsLost() or self.sequences[fieldID].IsComplete():
-                self.SeqCount += 1
-                self.sequences[fieldID].Restart(self.SeqCount)
-                if self.log and self.verbose > 0:
-                    self.log.info('%sProp: RestartSequences() sequence for propID=%d field=%i restarted' %
-                                  (self.propFullName, self.propID, fieldID))
+        for fieldID in self.sequenceStore.Select(self.sequences.keys(), [SEQ_LOST, SEQ_COMPLETE]):
+            self.SeqCount += 1
+            self.sequences[fieldID].Restart(self.SeqCount)
+            if self.log and self.verbose > 0:
+                self.log.info('%sProp: RestartSequences() sequence for propID=%d field=%i restarted' %
+                              (self.propFullName, self.propID, fieldID))
 
         return
 
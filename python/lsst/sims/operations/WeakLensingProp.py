@@ -7,6 +7,7 @@ from Distribution import *
 from Sequence import *
 from Proposal import *
 import math
+import numpy
 
 
 class WeakLensingProp(Proposal):
@@ -56,6 +57,8 @@ class WeakLensingProp(Proposal):
 
         self.schedulingData = schedulingData
         self.weakLensConf = weakLensConf
+        # suggestObs ranks from the SchedulingData look-ahead arrays only
+        self.parallelSuggest = True
         self.GoalVisitsFieldFilter = {}
         self.sky = sky
 
@@ -218,13 +221,16 @@ class WeakLensingProp(Proposal):
         self.dbTableDict = dbTableDict
 
         self.dbField = self.dbTableDict['field']
-        # If user-defined regions have been defined, build new FieldDB
+        # If user-defined regions have been defined, keep only their fields
         if self.userRegion[0] is not None:
-            self.dbField = self.buildUserRegionDB(self.userRegion, self.dbField)
+            self.fieldCatalog = self.buildUserRegionDB(self.userRegion, self.dbField)
 
         print "WeakLensingProp:init: dbField: %s" % (self.dbField)
 
         self.winners = []
+        # {Observation: index} of the suggestions of rankAreaDistribution
+        # not filled in yet, see materializeSuggestion()
+        self.pendingSuggestions = {}
 
         self.obsHistory = None
         self.sessionID = sessionID
@@ -297,16 +303,15 @@ class WeakLensingProp(Proposal):
 
     def rankAreaDistribution(self, listOfFieldsToEvaluate, sdnight, sdtime, dateProfile, rawSeeing, seeing,
                              transparency):
-
+        """
+        Rank the (field x filter) targets with arrays of visits, goals,
+        airmass, brightness and seeing. The proposed targets are queued
+        with their pooled Observation, which is only filled in by
+        materializeSuggestion for the winners and the loosers looked at.
+        """
         (date, mjd, lst_RAD) = dateProfile
-        (moonRA_RAD, moonDec_RAD, moonPhase_PERCENT) = self.schedulingData.moonProfile[sdnight]
 
         fields_received = len(listOfFieldsToEvaluate)
-        fields_invisible = 0
-        fields_moon = 0
-        ffilter_allowed = 0
-        ffilter_badseeing = 0
-        ffilter_proposed = 0
 
         needTonight = self.GoalVisitsTonight - self.VisitsTonight
         if needTonight > 0:
@@ -314,116 +319,121 @@ class WeakLensingProp(Proposal):
         else:
             GlobalNeedFactor = (self.maxNeedAfterOverflow / (-needTonight + 1)) / self.GoalVisitsTonight
 
-        for fieldID in listOfFieldsToEvaluate:
-            # Not used
-            #ra = self.targets[fieldID][0]
-            #dec = self.targets[fieldID][1]
-
-            if fieldID == self.last_observed_fieldID and self.last_observed_wasForThisProposal and \
-                    not self.AcceptConsecutiveObs:
-                continue
-
-            #-----------------------------------------------------------
-            #       Field cuts
-            #-----------------------------------------------------------
-            # First, discard all the targets which are not visible right now.
-            airmass = self.schedulingData.airmass[sdtime][fieldID]
-            if airmass > self.maxAirmass:
-                fields_invisible += 1
-                if self.log and self.verbose > 1:
-                    self.log.info('TOSS: propID=%d field=%d  WeakLensingProp: suggestObs(): too low:%f' %
-                                  (self.propID, fieldID, airmass))
-                continue
-
-            distance2moon = self.schedulingData.dist2moon[sdtime][fieldID]
-            if distance2moon < self.minDistance2Moon:
-                fields_moon += 1
-                # remove the target for the rest of the night if it is too close to the moon
-                del self.targets[fieldID]
-                continue
-
-            nVisits = {}
-            progress = {}
-            progress_avg = 0.0
-            for filter in self.FilterNames:
-                try:
-                    nVisits[filter] = self.visits[filter][fieldID]
-                except:
-                    nVisits[filter] = 0.
-                progress[filter] = nVisits[filter] / self.GoalVisitsFieldFilter[filter]
-                progress_avg += min(progress[filter], 1.0) / len(self.FilterNames)
-
-            FieldNeedFactor = 1.0 - progress_avg
-            if self.ProgressToStartBoost < progress_avg < 1.0:
-                progAvMinusBoost = progress_avg - self.ProgressToStartBoost
-                oneMinusBoost = 1.0 - self.ProgressToStartBoost
-                FieldNeedFactor += self.MaxBoostToComplete * progAvMinusBoost / oneMinusBoost
-
-            skyBrightness = self.schedulingData.brightness[sdtime][fieldID]
-            allowedFilterList = self.allowedFiltersForBrightness(skyBrightness)
-            filterSeeingList = self.filters.computeFilterSeeing(seeing, airmass)
-
-            for filter in allowedFilterList:
-                ffilter_allowed += 1
-                #-----------------------------------------------------------
-                #       Field/filter cuts
-                #-----------------------------------------------------------
-                if filterSeeingList[filter] > self.FilterMaxSeeing[filter]:
-                    ffilter_badseeing += 1
-                    if self.log and self.verbose > 1:
-                        self.log.info('TOSS: propID=%d field=%d  filter=%s  WeakLensingProp: suggestObs(): '
-                                      'bad seeing:%f' % (self.propID, fieldID, filter,
-                                                         filterSeeingList[filter]))
-                    continue
-
-                #-----------------------------------------------------------
-                #           Ranking
-                #-----------------------------------------------------------
-                # Assign the priority to the fields. The priority/rank is
-                # reflecting the fact that we want to end up observing in
-                # each filter with a given frequency (see above).
-
-                # The partial rank for this field/filter varies between
-                # 0 and 1. It is 0 if we already have self.filterVisits[filter]
-                # visits. It is 1 if we have no visit...
-                if GlobalNeedFactor > 0.0:
-                    if FieldNeedFactor > 0.0:
-                        if progress[filter] < 1.0:
-                            FilterNeedFactor = 1.0 - progress[filter]
-                            rank = self.scale * 0.5 * (FieldNeedFactor + FilterNeedFactor) / GlobalNeedFactor
-                        else:
-                            rank = 0.0
-                    else:
-                        visitsMinusGoal = nVisits[filter] - self.GoalVisitsFieldFilter[filter] + 1
-                        numerator = self.maxNeedAfterOverflow / visitsMinusGoal
-                        FilterNeedFactor = numerator / self.GoalVisitsFieldFilter[filter]
-                        rank = self.scale * FilterNeedFactor / GlobalNeedFactor
-                else:
-                    rank = 0.0
-
-                if rank > 0.0:
-                    ffilter_proposed += 1
-                    recordFieldFilter = self.obsPool[fieldID][filter]
-                    recordFieldFilter.date = date
-                    recordFieldFilter.mjd = mjd
-                    recordFieldFilter.night = sdnight
-                    recordFieldFilter.propRank = rank
-                    recordFieldFilter.rawSeeing = rawSeeing
-                    recordFieldFilter.seeing = filterSeeingList[filter]
-                    recordFieldFilter.transparency = transparency
-                    recordFieldFilter.airmass = airmass
-                    recordFieldFilter.skyBrightness = skyBrightness
-                    recordFieldFilter.filterSkyBright = 0.0
-                    recordFieldFilter.lst = lst_RAD
-                    recordFieldFilter.altitude = self.schedulingData.alt[sdtime][fieldID]
-                    recordFieldFilter.azimuth = self.schedulingData.az[sdtime][fieldID]
-                    recordFieldFilter.parallactic = self.schedulingData.pa[sdtime][fieldID]
-                    recordFieldFilter.distance2moon = distance2moon
-                    recordFieldFilter.moonRA = moonRA_RAD
-                    recordFieldFilter.moonDec = moonDec_RAD
-                    recordFieldFilter.moonPhase = moonPhase_PERCENT
-
-                    self.addToSuggestList(recordFieldFilter)
+        if self.last_observed_wasForThisProposal and not self.AcceptConsecutiveObs:
+            fields = [f for f in listOfFieldsToEvaluate if f != self.last_observed_fieldID]
+        else:
+            fields = list(listOfFieldsToEvaluate)
+
+        #-----------------------------------------------------------
+        #       Field cuts
+        #-----------------------------------------------------------
+        # First, discard all the targets which are not visible right now.
+        airmassNow = self.schedulingData.airmass[sdtime]
+        airmass = numpy.array([airmassNow[f] for f in fields], dtype=float)
+        invisible = airmass > self.maxAirmass
+        fields_invisible = int(numpy.count_nonzero(invisible))
+        if self.log and self.verbose > 1:
+            for i in numpy.nonzero(invisible)[0]:
+                self.log.info('TOSS: propID=%d field=%d  WeakLensingProp: suggestObs(): too low:%f' %
+                              (self.propID, fields[i], airmass[i]))
+
+        dist2moonNow = self.schedulingData.dist2moon[sdtime]
+        distance2moon = numpy.array([numpy.inf if invisible[i] else dist2moonNow[fields[i]]
+                                     for i in xrange(len(fields))], dtype=float)
+        moon = distance2moon < self.minDistance2Moon
+        fields_moon = int(numpy.count_nonzero(moon))
+        for i in numpy.nonzero(moon)[0]:
+            # remove the target for the rest of the night if it is too close to the moon
+            del self.targets[fields[i]]
+
+        keep = numpy.nonzero(~(invisible | moon))[0]
+        fields = [fields[i] for i in keep]
+        airmass = airmass[keep]
+        distance2moon = distance2moon[keep]
+
+        # visits and progress per (field, filter)
+        nFilters = len(self.FilterNames)
+        goal = numpy.array([self.GoalVisitsFieldFilter[filter] for filter in self.FilterNames], dtype=float)
+        nVisits = numpy.zeros((len(fields), nFilters))
+        for j in range(nFilters):
+            visits = self.visits.get(self.FilterNames[j], {})
+            nVisits[:, j] = [visits.get(f, 0.) for f in fields]
+        progress = nVisits / goal
+        progress_avg = numpy.zeros(len(fields))
+        for j in range(nFilters):
+            progress_avg += numpy.minimum(progress[:, j], 1.0) / nFilters
+
+        FieldNeedFactor = 1.0 - progress_avg
+        boost = (self.ProgressToStartBoost < progress_avg) & (progress_avg < 1.0)
+        if boost.any():
+            progAvMinusBoost = progress_avg[boost] - self.ProgressToStartBoost
+            oneMinusBoost = 1.0 - self.ProgressToStartBoost
+            FieldNeedFactor[boost] += self.MaxBoostToComplete * progAvMinusBoost / oneMinusBoost
+
+        brightnessNow = self.schedulingData.brightness[sdtime]
+        skyBrightness = numpy.array([brightnessNow[f] for f in fields], dtype=float)
+        filterSeeing = self.filters.computeFilterSeeingArray(seeing, airmass)
+
+        #-----------------------------------------------------------
+        #       Field/filter cuts
+        #-----------------------------------------------------------
+        allowed = numpy.zeros((len(fields), nFilters), dtype=bool)
+        badseeing = numpy.zeros((len(fields), nFilters), dtype=bool)
+        seeingFieldFilter = numpy.zeros((len(fields), nFilters))
+        for j in range(nFilters):
+            filter = self.FilterNames[j]
+            if filter in self.mountedFiltersList:
+                allowed[:, j] = (self.FilterMinBrig[filter] < skyBrightness) & \
+                    (skyBrightness < self.FilterMaxBrig[filter])
+            seeingFieldFilter[:, j] = filterSeeing[filter]
+            badseeing[:, j] = allowed[:, j] & (filterSeeing[filter] > self.FilterMaxSeeing[filter])
+        ffilter_allowed = int(numpy.count_nonzero(allowed))
+        ffilter_badseeing = int(numpy.count_nonzero(badseeing))
+        if self.log and self.verbose > 1:
+            for (i, j) in zip(*numpy.nonzero(badseeing)):
+                self.log.info('TOSS: propID=%d field=%d  filter=%s  WeakLensingProp: suggestObs(): '
+                              'bad seeing:%f' % (self.propID, fields[i], self.FilterNames[j],
+                                                 seeingFieldFilter[i, j]))
+
+        #-----------------------------------------------------------
+        #           Ranking
+        #-----------------------------------------------------------
+        # Assign the priority to the fields. The priority/rank is
+        # reflecting the fact that we want to end up observing in
+        # each filter with a given frequency (see above).
+
+        # The partial rank for this field/filter varies between
+        # 0 and 1. It is 0 if we already have self.filterVisits[filter]
+        # visits. It is 1 if we have no visit...
+        if GlobalNeedFactor > 0.0:
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                FilterNeedFactor = 1.0 - progress
+                rankNeed = self.scale * 0.5 * (FieldNeedFactor[:, numpy.newaxis] + FilterNeedFactor) / \
+                    GlobalNeedFactor
+                visitsMinusGoal = nVisits - goal + 1
+                numerator = self.maxNeedAfterOverflow / visitsMinusGoal
+                rankOverflow = self.scale * (numerator / goal) / GlobalNeedFactor
+            rank = numpy.where(FieldNeedFactor[:, numpy.newaxis] > 0.0,
+                               numpy.where(progress < 1.0, rankNeed, 0.0), rankOverflow)
+        else:
+            rank = numpy.zeros((len(fields), nFilters))
+
+        (proposedField, proposedFilter) = numpy.nonzero(allowed & ~badseeing & (rank > 0.0))
+        ffilter_proposed = len(proposedField)
+
+        # values to fill in the proposed Observations on demand
+        self.pendingContext = (date, mjd, sdnight, sdtime, lst_RAD, rawSeeing, transparency)
+        self.pendingRank = rank[proposedField, proposedFilter].tolist()
+        self.pendingSeeing = seeingFieldFilter[proposedField, proposedFilter].tolist()
+        self.pendingAirmass = airmass[proposedField].tolist()
+        self.pendingBrightness = skyBrightness[proposedField].tolist()
+        self.pendingDist2moon = distance2moon[proposedField].tolist()
+        self.pendingSuggestions = {}
+        for k in xrange(ffilter_proposed):
+            recordFieldFilter = self.obsPool[fields[proposedField[k]]][self.FilterNames[proposedFilter[k]]]
+            self.pendingSuggestions[recordFieldFilter] = k
+            # same key as addToSuggestList
+            self.queue.append((-self.pendingRank[k], recordFieldFilter))
 
         if self.log and self.verbose > 0:
             self.log.info('%s: rankAreaDistribution propID=%d : Fields received=%i invisible=%i moon=%i '
@@ -436,6 +446,48 @@ class WeakLensingProp(Proposal):
 
         return
 
+    def clearSuggestList(self):
+
+        super(WeakLensingProp, self).clearSuggestList()
+        self.pendingSuggestions = {}
+
+        return
+
+    def materializeSuggestion(self, observation):
+        """
+        Fill in an Observation queued by rankAreaDistribution.
+        """
+        try:
+            k = self.pendingSuggestions.pop(observation)
+        except KeyError:
+            return observation
+
+        (date, mjd, sdnight, sdtime, lst_RAD, rawSeeing, transparency) = self.pendingContext
+        (moonRA_RAD, moonDec_RAD, moonPhase_PERCENT) = self.schedulingData.moonProfile[sdnight]
+        fieldID = observation.fieldID
+
+        observation.date = date
+        observation.mjd = mjd
+        observation.night = sdnight
+        # as in addToSuggestList
+        observation.propRank = self.pendingRank[k] * self.relativeProposalPriority
+        observation.rawSeeing = rawSeeing
+        observation.seeing = self.pendingSeeing[k]
+        observation.transparency = transparency
+        observation.airmass = self.pendingAirmass[k]
+        observation.skyBrightness = self.pendingBrightness[k]
+        observation.filterSkyBright = 0.0
+        observation.lst = lst_RAD
+        observation.altitude = self.schedulingData.alt[sdtime][fieldID]
+        observation.azimuth = self.schedulingData.az[sdtime][fieldID]
+        observation.parallactic = self.schedulingData.pa[sdtime][fieldID]
+        observation.distance2moon = self.pendingDist2moon[k]
+        observation.moonRA = moonRA_RAD
+        observation.moonDec = moonDec_RAD
+        observation.moonPhase = moonPhase_PERCENT
+
+        return observation
+
     def rankAreaDistributionWithLookAhead(self, listOfFieldsToEvaluate, sdnight, sdtime, dateProfile,
                                           acoshrawSeeing, seeing, transparency):
 
@@ -673,12 +725,8 @@ class WeakLensingProp(Proposal):
 
         if self.log:
             self.log.info('Proposal:updateTargetList propID=%d' % (self.propID))
-        dbFov = 'fieldFov'
         dbRA = 'fieldRA'
         dbDec = 'fieldDec'
-        #dbL = 'fieldGL'
-        #dbB = 'fieldGB'
-        dbID = 'fieldID'
 
         (date, mjd, lst_RAD) = dateProfile
         (lon_RAD, lat_RAD, elev_M, epoch_MJD, d1, d2, d3) = obsProfile
@@ -717,54 +765,27 @@ class WeakLensingProp(Proposal):
 
         # self.targets is a convenience dictionary. Its keys are
         # fieldIDs, its values are the corresponding RA and Dec.
-        fields = {}
-        fovEpsilon1 = fov - .01
-        fovEpsilon2 = fov + .01
-
-        sql = 'SELECT %s, %s, %s from %s ' % (dbRA, dbDec, dbID, self.dbField)
-
-        sql += 'WHERE %s BETWEEN %f AND %f AND ' % (dbFov, fovEpsilon1, fovEpsilon2)
+        catalog = self.getFieldCatalog()
+        mask = catalog.fovMask(fov)
 
         # subtract galactic exclusion zone
-        taperB = self.taperB
-        taperL = self.taperL
-        peakL = self.peakL
-        band = peakL - taperL
-        if taperB != 0. and taperL != 0.:
-            sql += '( (fieldGL < 180. AND abs(fieldGB) > (%f - (%f * abs(fieldGL)) / %f) ) OR ' %\
-                (peakL, band, taperB)
-            sql += '(fieldGL > 180. AND abs(fieldGB) > (%f - (%f * abs(fieldGL-360.)) / %f))) AND ' %\
-                (peakL, band, taperB)
-        # subtract un-viewable sky
-        if raMax > raMin:
-            sql += '%s BETWEEN %f AND %f AND ' % (dbRA, raMin, raMax)
-        elif (raMax < raMin):
-            sql += '(%s BETWEEN %f AND 360.0 OR ' % (dbRA, raMin)
-            sql += '%s BETWEEN 0.0 AND %f) AND ' % (dbRA, raMax)
-        else:
-            sql += '%s BETWEEN 0.0 AND 360.0 AND ' % (dbRA)
+        mask &= catalog.galacticTaperMask(self.peakL, self.taperL, self.taperB)
 
+        # subtract un-viewable sky
+        mask &= catalog.raWindowMask(raMin, raMax)
         if raAbsMax >= raAbsMin:
-            sql += '%s BETWEEN %f AND %f AND ' % (dbRA, raAbsMin, raAbsMax)
+            mask &= catalog.betweenMask(dbRA, raAbsMin, raAbsMax)
         else:
-            sql += '(%s BETWEEN %f AND 360.0 OR ' % (dbRA, raAbsMin)
-            sql += '%s BETWEEN 0.0 AND %f) AND ' % (dbRA, raAbsMax)
+            mask &= catalog.raWindowMask(raAbsMin, raAbsMax)
 
         DecLimit = math.acos(1. / float(self.maxAirmass)) * RAD2DEG
         latRad = lat_RAD * RAD2DEG
-        sql += '%s BETWEEN %f AND %f  and %f < %s < %f order by FieldRA,FieldDec' % (dbDec,
-                                                                                     latRad - DecLimit,
-                                                                                     latRad + DecLimit,
-                                                                                     -abs(self.maxReach),
-                                                                                     dbDec,
-                                                                                     abs(self.maxReach))
+        mask &= catalog.betweenMask(dbDec, latRad - DecLimit, latRad + DecLimit)
+        # MySQL evaluated the former "-maxReach < fieldDec < maxReach" clause
+        # as "(-maxReach < fieldDec) < maxReach", comparing a 0/1 truth value.
+        mask &= (catalog.dec > sqlFloat(-abs(self.maxReach))) < sqlFloat(abs(self.maxReach))
 
-        # Send the query to the DB
-        (n, res) = self.lsstDB.executeSQL(sql)
-
-        # Build the output dictionary
-        for (ra, dec, fieldID) in res:
-            fields[fieldID] = (ra, dec)
+        fields = catalog.select(mask)
 
         self.targets = fields
 
@@ -783,7 +804,7 @@ class WeakLensingProp(Proposal):
                     #print field
         # print('Visits up to Tonight for propID=%d for current targets = %i' %
         #       (self.propID, self.VisitsTonight))
-        print('*** Found %d WL fields for propID=%d ***' % (len(res), self.propID))
+        print('*** Found %d WL fields for propID=%d ***' % (len(fields), self.propID))
 
         ## Benchmark memory use - exit
         #m1 = memory()
@@ -801,9 +822,4 @@ class WeakLensingProp(Proposal):
 
     def closeProposal(self, time):
 
-        # delete OlapField user-defined region table
-        if self.userRegion[0] is not None:
-            overlappingField = "OlapField_%d_%d" % (self.sessionID, self.propID)
-            self.lsstDB.dropTable(overlappingField)
-
         return
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 # System modules
+import json
 import os
 import math
 import re
@@ -65,6 +66,7 @@ cpath = __file__.split('python')[0]
 # Default Configuration Files
 DefaultLSSTConfigFile = cpath + 'conf/survey/LSST.conf'
 DefaultInstrumentConfigFile = cpath + 'conf/system/Instrument.conf'
+DefaultSiteConfigFile = cpath + 'conf/system/SiteCP.conf'
 
 DefaultGeneralPropConfigFile = './GeneralProp.conf'
 DefaultNEAConfigFile = './NearEarthProp.conf'
@@ -106,6 +108,10 @@ AVGPRIORITY = 1.0           # The mean Observation priority.
 SIGMAPERCENT = 10.           # Sigma (percent of the mean).
 AVGDELTAPRI = 0.1           # The mean delta in priority.
 
+# Benchmarks (*Bench classes and bin/opsim-bench*.py)
+BENCH_FORMAT_VERSION = 1    # Version of the JSON reports.
+DefaultBenchSeed = 42       # Seed of the synthetic inputs.
+
 # Routines and non user-specific globals
 DEG2RAD = math.pi / 180.    # radians = degrees * DEG2RAD
 RAD2DEG = 180. / math.pi    # degrees = radians * RAD2DEG
@@ -187,6 +193,56 @@ def fatalError(errorMessage, exitCode=1):
     sys.exit(exitCode)
     return
 
+def benchUsage(options):
+    """
+    Return the usage string of a benchmark script, given the list of
+    its option lines. The --output and --help options are appended.
+    """
+    use = ["[options...]", "Options:"] + list(options)
+    use.append("--output=<file>" + "\t" * 3 + "JSON report file. Default is stdout.")
+    use.append("-h, --help" + "\t" * 3 + "Print help and exit.")
+
+    return os.linesep.join(use)
+
+
+def writeBenchReport(report, args):
+    """
+    Write the report dictionary of a benchmark as JSON with sorted keys,
+    to the file of the --output option or else to STDOUT.
+    """
+    text = json.dumps(report, sort_keys=True, indent=2)
+
+    if 'output' in args:
+        f = open(os.path.expanduser(os.path.expandvars(args['output'])), 'w')
+        f.write(text + '\n')
+        f.close()
+    else:
+        print(text)
+
+    return
+
+
+def benchMain(bench, usageString):
+    """
+    Main of a benchmark script: parse the command line args and call
+    bench(args), then exit. The usage is printed on --help and on
+    syntax errors.
+    """
+    try:
+        args = parseArgs(sys.argv[1:])
+    except UserWarning:
+        usage(usageString)
+        sys.exit(0)
+    except:
+        usage(usageString)
+        sys.stderr.write('Syntax error\n')
+        sys.exit(1)
+
+    bench(args)
+
+    sys.exit(0)
+
+
 def sex2deg(sex, sep=':'):
     """
     Convert angles in sexagesimal format (sex) to decimal format.
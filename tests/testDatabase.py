@@ -0,0 +1,277 @@
+import shutil
+import tempfile
+import unittest
+
+import lsst.sims.operations.Database as DB
+from lsst.sims.operations.DatabaseWriter import DatabaseWriter
+from lsst.sims.operations.DatabaseConnection import DatabaseConnection
+from lsst.sims.operations.ColumnarSink import ColumnarSink, loadColumnar
+
+class RecordingCursor(object):
+    """
+    Cursor keeping the queries sent to it.
+    """
+    def __init__(self):
+        self.queries = []
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, query, row):
+        self.queries.append((query, [row]))
+        self.rowcount = 1
+        self.lastrowid = len(self.queries)
+
+    def executemany(self, query, rows):
+        if query == "fail":
+            raise ValueError("bad query")
+        self.queries.append((query, list(rows)))
+        self.rowcount = len(rows)
+        return len(rows)
+
+class RecordingConnection(object):
+    """
+    Connection handing out a single RecordingCursor.
+    """
+    def __init__(self):
+        self.cur = RecordingCursor()
+        self.closed = False
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class FlakyBackend(DB.DatabaseBackend):
+    """
+    Backend failing the first connection attempts.
+    """
+    def __init__(self, failures):
+        self.failures = failures
+        self.connections = []
+
+    def connect(self):
+        if self.failures > 0:
+            self.failures -= 1
+            raise IOError("server down")
+        self.connections.append(RecordingConnection())
+        return self.connections[-1]
+
+    def isConnectionError(self, error):
+        return isinstance(error, ValueError)
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.db = DB.Database(True, dbConnect=False, writeBufferRows=5)
+        self.db.cur = RecordingCursor()
+
+    def testWriteBehindBuffer(self):
+        self.db.addObsHistoryProposal(3, 17, 1000, 0.5)
+        self.db.addTimeHistory(1000, 3600.7, 49353.04, 1, 7)
+        self.db.addSeqHistoryObsHistory(12, 17, 1000)
+        self.assertEqual(self.db.cur.queries, [])
+
+        self.assertEqual(self.db.flushWrites(), 3)
+        self.assertEqual([query.split()[2] for (query, rows) in self.db.cur.queries],
+                         ['TimeHistory', 'ObsHistory_Proposal', 'SeqHistory_ObsHistory'])
+        self.assertEqual(self.db.cur.queries[0][1], [(3600, 49353.04, 1, 7, 1000)])
+        self.assertEqual(self.db.flushWrites(), 0)
+
+        for fieldID in range(5):
+            self.db.addProposalField(1000, 3, fieldID)
+        self.assertEqual(self.db.nPendingRows, 0)
+        self.assertEqual(len(self.db.cur.queries[-1][1]), 5)
+
+    def testAddObservation(self):
+        values = (17, "r", 3600, 49353.04, 0, 30.0, 34.0) + tuple([0.5 + i for i in range(28)]) + (1000, 2001)
+        obs = self.db.addObservation(*values)
+        self.assertEqual((obs.obsHistID, obs.Session_sessionID), (17, 1000))
+        self.db.flushWrites()
+        (query, rows) = self.db.cur.queries[0]
+        self.assertEqual(query.split()[2], "ObsHistory")
+        # visitTime and visitExpTime are switched
+        self.assertEqual(rows, [values[:5] + (34.0, 30.0) + values[7:]])
+
+    def testInsertRow(self):
+        proposal = self.db.addProposal("WL.conf", "WeakLensing", 1000, "host", 42)
+        self.assertEqual(proposal.propID, 1)
+        self.assertEqual(self.db.cur.queries[0],
+                         ("insert into Proposal (propConf, propName, Session_sessionID, objectID, "
+                          "objectHost) values (%s, %s, %s, %s, %s)",
+                          [("WL.conf", "WeakLensing", 1000, 42, "host")]))
+        missed = self.db.addMissedObservation("r", 3600.2, 49353.04, 1, 1.5, 1000, 7)
+        self.assertEqual(missed.missedHistID, 2)
+        self.assertEqual(self.db.cur.queries[1][1], [("r", 3600, 49353.04, 1, 1.5, 1000, 7)])
+        seqHist = self.db.addSeqHistory(3600.2, 7200.5, 1, 0.5, 4, 2, 1, 0, 7, 1000, 3)
+        self.assertEqual((seqHist.sequenceID, seqHist.Session_sessionID), (3, 1000))
+        self.assertEqual(self.db.cur.queries[2][1], [(3600, 7200, 1, 0, 4, 2, 1, 0, 7, 1000, 3)])
+        self.assertTrue(self.db.insertQuery("Proposal") is self.db.insertQuery("Proposal"))
+
+    def testStartupRows(self):
+        db = DB.Database(True, writeBufferRows=2, backend=DB.SQLiteBackend(":memory:"))
+        for i in range(5):
+            db.addConfig(1, 0, "LSST", i, "key%d" % (i), "value", "")
+        self.assertEqual(db.executeSQL("select count(*) from Config")[1], [(0,)])
+        self.assertEqual(db.flushWrites(), 5)
+        self.assertEqual(db.executeSQL("select paramIndex, paramName from Config where paramIndex=4")[1],
+                         [(4, "key4")])
+        self.assertEqual(db.connectionStats()["statements"], 3)
+        db.closeConnection()
+
+    def testStats(self):
+        db = DB.Database(True, writeBufferRows=2, backend=DB.SQLiteBackend(":memory:"), collectStats=True)
+        session = db.newSession("user", "host", "2014-01-01", "3.4", "test")
+        for night in range(3):
+            db.addTimeHistory(session.sessionID, 86400 * night, 49353.0 + night, night, 7)
+        db.executeSQL("select date from TimeHistory")
+        stats = db.getStats()
+        self.assertEqual(stats["Session"]["write"]["rows"], 1)
+        self.assertEqual(stats["TimeHistory"]["write"]["rows"], 2)
+        self.assertEqual(stats["TimeHistory"]["write"]["bytes"], 2 * 5 * 8)
+        self.assertEqual(stats["TimeHistory"]["read"]["rows"], 2)
+        self.assertEqual(sum(stats["TimeHistory"]["read"]["histogram"]), 1)
+        self.assertEqual(len(db.stats.summary()), 5)
+        db.closeConnection()
+        self.assertEqual(DB.Database(True, dbConnect=False).getStats(), {})
+
+    def testDatabaseConnection(self):
+        backend = FlakyBackend(2)
+        connection = DatabaseConnection(backend, retryDelay=0.001)
+        connection.open()
+        self.assertEqual((connection.nConnectFailures, connection.nConnects), (2, 1))
+
+        # a lost connection is reopened when no write is pending
+        connection.executemany("insert", [(1,)])
+        connection.commit()
+        self.assertRaises(ValueError, connection.executemany, "fail", [(2,)])
+        self.assertEqual(connection.stats()["reconnects"], 1)
+        self.assertEqual(len(backend.connections), 2)
+
+        connection.executemany("insert", [(3,)])
+        self.assertRaises(ValueError, connection.executemany, "fail", [(4,)])
+        self.assertEqual(connection.stats()["reconnects"], 1)
+        self.assertEqual(connection.stats()["statements"], 4)
+
+        try:
+            DatabaseConnection(FlakyBackend(100), timeout=0.01, retryDelay=0.001).open()
+            self.fail("open did not raise")
+        except IOError as e:
+            self.assertTrue("server down" in str(e))
+
+    def testDatabaseWriter(self):
+        conn = RecordingConnection()
+        writer = DatabaseWriter(lambda: conn, queueSize=1)
+        for i in range(5):
+            writer.Put("insert", [(i,)])
+        writer.Drain()
+        self.assertEqual(conn.cur.queries, [("insert", [(i,)]) for i in range(5)])
+
+        writer.Put("fail", [(0,)])
+        try:
+            writer.Drain()
+            self.fail("Drain did not raise")
+        except IOError as e:
+            self.assertTrue("bad query" in str(e))
+            self.assertTrue(isinstance(e.cause, ValueError))
+        self.assertRaises(IOError, writer.Put, "insert", [(6,)])
+        self.assertRaises(IOError, writer.Close)
+        self.assertTrue(conn.closed)
+        self.assertEqual(writer.nRows, 5)
+
+    def testSQLiteBackend(self):
+        backend = DB.SQLiteBackend(":memory:")
+        conn = backend.connect()
+        query = backend.insertQuery("ObsHistory", "obsHistID, alt, az, Session_sessionID", 4)
+        self.assertEqual(query, "insert into ObsHistory (obsHistID, altitude, azimuth, Session_sessionID) "
+                                "values (?, ?, ?, ?)")
+        conn.executemany(query, [(1, 0.5, 1.5, 1000), (2, 0.6, 1.6, 1000)])
+        self.assertEqual(conn.execute("select obsHistID, altitude from ObsHistory").fetchall(),
+                         [(1, 0.5), (2, 0.6)])
+        conn.close()
+
+        # tables named differently in the SQLite schema
+        db = DB.Database(True, backend=DB.SQLiteBackend(":memory:"))
+        db.addConfigFile("LSST.conf", "nRun = 1", 1000)
+        db.flushWrites()
+        self.assertEqual(db.executeSQL("SELECT filename, data, Session_sessionID FROM Config_File")[1],
+                         [("LSST.conf", "nRun = 1", 1000)])
+        db.closeConnection()
+
+        try:
+            DB.SQLiteBackend(":memory:", "/nonexistent/v3_4-sqlite.sql").connect()
+            self.fail("connect did not raise")
+        except IOError as e:
+            self.assertTrue("dbSchema" in str(e))
+
+    def testNightTransaction(self):
+        directory = tempfile.mkdtemp()
+        try:
+            fileName = directory + "/opsim.db"
+            db = DB.Database(True, writeBufferRows=2, backend=DB.SQLiteBackend(fileName))
+            reader = DB.SQLiteBackend(fileName).connect()
+            db.beginTransaction()
+            for night in range(3):
+                db.addTimeHistory(1000, 86400 * night, 49353.0 + night, night, 7)
+            self.assertEqual(db.nPendingRows, 1)
+            self.assertEqual(reader.execute("select count(*) from TimeHistory").fetchall(), [(0,)])
+
+            db.commitTransaction()
+            self.assertEqual(reader.execute("select count(*) from TimeHistory").fetchall(), [(3,)])
+            reader.close()
+            db.closeConnection()
+        finally:
+            shutil.rmtree(directory)
+
+    def testMemoryBackend(self):
+        directory = tempfile.mkdtemp()
+        try:
+            f = open(directory + "/Seeing.dat", "w")
+            f.write("seeingID\ts_date\tseeing\n1\t0\t0.6\n2\t300\t0.75\n")
+            f.close()
+            f = open(directory + "/SeeingPachon.dat", "w")
+            f.write("s_date\tseeing\n0\t0.5\n")
+            f.close()
+            db = DB.Database(True, backend=DB.MemoryBackend(directory))
+            self.assertEqual(db.executeSQL("SELECT max(s_date) FROM Seeing")[1], [(300,)])
+            self.assertEqual(db.executeSQL("SELECT seeing FROM SeeingPachon")[1], [(0.5,)])
+
+            session = db.newSession("user", "host", "2014-01-01", "3.4", "test")
+            self.assertEqual(session.sessionID, 1)
+            for obsHistID in range(3):
+                db.addObsHistoryProposal(1, obsHistID, session.sessionID, 0.5)
+            self.assertEqual(db.discardedRows, {"Session": 1, "ObsHistory_Proposal": 3})
+            self.assertEqual(db.executeSQL("SELECT count(*) FROM Session")[1], [(0,)])
+            db.closeConnection()
+        finally:
+            shutil.rmtree(directory)
+
+    def testColumnarSink(self):
+        directory = tempfile.mkdtemp()
+        try:
+            db = DB.Database(True, dbConnect=False, writeBufferRows=2, columnarDir=directory)
+            for night in range(3):
+                db.addTimeHistory(1000, 86400.0 * night, 49353.0 + night, night, 7)
+                db.addObsHistoryProposal(3, night, 1000, 0.25 * night)
+            db.closeConnection()
+
+            columns = loadColumnar(directory, "TimeHistory")
+            self.assertEqual(list(columns["night"]), [0, 1, 2])
+            self.assertEqual(list(columns["mjd"]), [49353.0, 49354.0, 49355.0])
+            self.assertEqual(columns["date"].dtype.str, "<i8")
+            columns = loadColumnar(directory, "ObsHistory_Proposal")
+            self.assertEqual(list(columns["propRank"]), [0.0, 0.25, 0.5])
+
+            sink = ColumnarSink(directory)
+            try:
+                sink.Append("TimeHistory", ("date", "mjd"), [(0, 49356.0)])
+                self.fail("Append did not raise")
+            except ValueError as e:
+                self.assertTrue("TimeHistory" in str(e))
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    unittest.main()
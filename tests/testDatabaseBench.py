@@ -0,0 +1,25 @@
+import unittest
+
+import lsst.sims.operations.DatabaseBench as DBB
+
+class TestDatabaseBench(unittest.TestCase):
+
+    def setUp(self):
+        self.bench = DBB.DatabaseBench(visits=2000, seed=3)
+
+    def testReproducibleVisits(self):
+        visits = self.bench.generateVisits()
+        self.assertEqual(len(visits), 2000)
+        self.assertEqual(visits, self.bench.generateVisits())
+        self.assertEqual(len(visits[0]), len(DBB.TABLE_COLUMNS["ObsHistory"]))
+
+    def testRun(self):
+        report = self.bench.Run()
+        self.assertEqual(report["visits"], 2000)
+        self.assertEqual(report["legacy_rows"], 2000)
+        self.assertEqual(report["buffered_rows"], 2000)
+        self.assertTrue(report["buffered_us"] > 0.0)
+        self.assertEqual(report["speedup"], report["legacy_us"] / report["buffered_us"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import math
+import unittest
+
+import numpy
+
+from lsst.sims.operations.FieldCatalog import FieldCatalog
+
+class TestFieldCatalog(unittest.TestCase):
+
+    def setUp(self):
+        # fieldID, fieldFov, fieldRA, fieldDec, fieldGL, fieldGB, fieldEL, fieldEB
+        self.catalog = FieldCatalog([(1, 3.5, 350.0, -30.0, 10.0, -5.0, 0.0, 0.0),
+                                     (2, 3.5, 10.0, -30.0, 350.0, -20.0, 0.0, 0.0),
+                                     (3, 3.5, 120.0, -60.0, 200.0, 30.0, 0.0, 0.0),
+                                     (4, 2.0, 200.0, 10.0, 90.0, 40.0, 0.0, 0.0)])
+
+    def testRaWindow(self):
+        mask = self.catalog.fovMask(3.5) & self.catalog.raWindowMask(340.0, 20.0)
+        self.assertEqual(sorted(self.catalog.select(mask).keys()), [1, 2])
+        self.assertEqual(sorted(self.catalog.select(self.catalog.raWindowMask(100.0, 100.0)).keys()),
+                         [1, 2, 3, 4])
+        self.assertEqual(self.catalog.select(self.catalog.raWindowMask(100.0, 150.0)), {3: (120.0, -60.0)})
+
+    def testGalacticTaper(self):
+        mask = self.catalog.galacticTaperMask(25.0, 5.0, 180.0)
+        self.assertEqual(sorted(self.catalog.select(mask).keys()), [3, 4])
+        self.assertEqual(len(self.catalog.rows(self.catalog.galacticTaperMask(25.0, 0.0, 180.0))), 4)
+
+    def testClosestOverlapping(self):
+        # a cone overlapping fields 1 and 2, closer to field 2
+        closest = self.catalog.closestOverlapping(math.radians(4.0), math.radians(-30.0), math.radians(11.0))
+        self.assertEqual(self.catalog.fieldID[closest], 2)
+        self.assertEqual(self.catalog.closestOverlapping(math.radians(60.0), 0.0, math.radians(0.5)), None)
+
+        mask = numpy.zeros(len(self.catalog), dtype=bool)
+        mask[closest] = True
+        self.assertEqual(self.catalog.subset(mask).rows(), [(2, 3.5, 10.0, -30.0, 350.0, -20.0, 0.0, 0.0)])
+
+if __name__ == "__main__":
+    unittest.main()
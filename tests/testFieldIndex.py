@@ -0,0 +1,61 @@
+import math
+import random
+import unittest
+
+import lsst.sims.operations.FieldIndex as FI
+
+class TestFieldIndex(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(11)
+        self.fields = [(fieldID, random.uniform(0.0, 360.0),
+                        math.degrees(math.asin(random.uniform(-1.0, 1.0)))) for fieldID in range(1, 501)]
+        # the pole, the antipode of the first cone and a field on the RA wrap
+        self.fields += [(501, 0.0, 90.0), (502, 190.0, 30.0), (503, 359.9, -30.0)]
+        self.cones = [(10.0, -30.0, 5.0), (0.0, 89.0, 3.0), (10.0, -30.0, 60.0), (359.0, -30.0, 2.0),
+                      (10.0, -30.0, 179.0), (10.0, -30.0, 180.0), (10.0, -30.0, 250.0), (10.0, -30.0, 0.0)]
+
+    def bruteForce(self, ra, dec, radius):
+        """
+        Fields within radius of (ra, dec), all in degrees.
+        """
+        within = set()
+        for (fieldID, fra, fdec) in self.fields:
+            cosd = (math.sin(math.radians(dec)) * math.sin(math.radians(fdec)) +
+                    math.cos(math.radians(dec)) * math.cos(math.radians(fdec)) *
+                    math.cos(math.radians(ra - fra)))
+            if math.degrees(math.acos(max(-1.0, min(1.0, cosd)))) <= radius:
+                within.add(fieldID)
+        return within
+
+    def cone(self, index, ra, dec, radius):
+        return index.fieldsWithin(math.radians(ra), math.radians(dec), math.radians(radius))
+
+    def testNumpyScan(self):
+        index = FI.FieldIndex(self.fields)
+        index.tree = None
+        self.assertEqual(len(index), 503)
+        for (ra, dec, radius) in self.cones:
+            self.assertEqual(self.cone(index, ra, dec, radius), self.bruteForce(ra, dec, radius))
+        # the whole sky, antipode included
+        self.assertEqual(len(self.cone(index, 10.0, -30.0, 180.0)), 503)
+        self.assertTrue(503 in self.cone(index, 0.5, -30.0, 1.0))
+
+    @unittest.skipIf(FI.cKDTree is None, "scipy is not installed")
+    def testTreeMatchesNumpyScan(self):
+        index = FI.FieldIndex(self.fields)
+        self.assertTrue(index.tree is not None)
+        scan = FI.FieldIndex(self.fields)
+        scan.tree = None
+        for (ra, dec, radius) in self.cones:
+            self.assertEqual(self.cone(index, ra, dec, radius), self.cone(scan, ra, dec, radius))
+
+    def testEmptyIndex(self):
+        index = FI.FieldIndex([])
+        self.assertEqual(len(index), 0)
+        self.assertTrue(index.tree is None)
+        for (ra, dec, radius) in self.cones:
+            self.assertEqual(self.cone(index, ra, dec, radius), set())
+
+if __name__ == "__main__":
+    unittest.main()
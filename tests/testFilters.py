@@ -1,4 +1,5 @@
 import math
+import numpy
 import unittest
 
 import lsst.sims.operations.Database as DB
@@ -48,5 +49,15 @@ class TestFilters(unittest.TestCase):
         self.assertEquals(filterList['g'],
                           airmassCorrection * 0.39862262855989494 * self.scale_to_neff)
 
+    def testSeeingArrayMatchesScalar(self):
+        airmass = numpy.array([1.0, 1.1, 1.35, 1.8, 2.5])
+        for seeing in (0.0, 0.7, 1.3):
+            filterArrays = self.filters.computeFilterSeeingArray(seeing, airmass)
+            self.assertEqual(sorted(filterArrays.keys()), sorted(self.filters.filterNamesSorted))
+            for i in range(len(airmass)):
+                filterList = self.filters.computeFilterSeeing(seeing, airmass[i])
+                for filter in filterList:
+                    self.assertAlmostEqual(filterArrays[filter][i], filterList[filter], places=12)
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import palpy as pal
+
 import lsst.sims.operations.Database as DB
 import lsst.sims.operations.Instrument as Inst
 import lsst.sims.operations.utilities as utilities
@@ -57,5 +59,26 @@ class TestInstrument(unittest.TestCase):
         # This filter change should pass both burst and average change
         self.assertTrue(self.inst.AllowFilterChange("i", 120.0 * 60.0))
 
+    def testPointingCache(self):
+        cache = self.inst.pointingCache
+        (ra_RAD, dec_RAD) = (1.2, -0.5)
+        dateProfile = (1000, 49353.01, 2.0)
+        # one pointing per decision time, whatever the filter
+        delays = [self.inst.GetDelayForTarget(ra_RAD, dec_RAD, dateProfile, 30.0, filter)
+                  for filter in self.inst.current_state.Filter_MountedList]
+        self.assertEqual((cache.misses, cache.hits), (1, len(delays) - 1))
+        (az_RAD, d1, d2, alt_RAD, d4, d5, pa_RAD, d7, d8) = pal.altaz(2.0 - ra_RAD, dec_RAD,
+                                                                      cache.latitude_RAD)
+        self.assertEqual(cache.GetAltAzPa(ra_RAD, dec_RAD, dateProfile), (alt_RAD, az_RAD, pa_RAD))
+        self.assertEqual(self.inst.targetposition.ALT_RAD, alt_RAD)
+
+        # a new LST drops the cached pointings
+        (alt2_RAD, az2_RAD, pa2_RAD) = cache.GetAltAzPa(ra_RAD, dec_RAD, (1030, 49353.0104, 2.002))
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(len(cache.pointings), 1)
+        self.assertNotEqual(alt2_RAD, alt_RAD)
+        cache.GetAltAzPa(ra_RAD, dec_RAD, dateProfile)
+        self.assertEqual(cache.misses, 3)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+import lsst.sims.operations.InstrumentBench as IB
+
+class TestInstrumentBench(unittest.TestCase):
+
+    def setUp(self):
+        self.bench = IB.InstrumentBench(instrumentConf="example_conf/system/Instrument.conf",
+                                        siteConf="example_conf/system/SiteCP.conf")
+        self.pointings = self.bench.GeneratePointings(50, seed=1)
+
+    def testReproducibleReplay(self):
+        self.assertEqual(self.pointings, self.bench.GeneratePointings(50, seed=1))
+
+        (fd, fileName) = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        try:
+            self.bench.WritePointings(self.pointings, fileName)
+            self.assertEqual(self.bench.ReadPointings(fileName), self.pointings)
+            f = open(fileName, "a")
+            f.write("1.0 2.0\n")
+            f.close()
+            self.assertRaises(IOError, self.bench.ReadPointings, fileName)
+        finally:
+            os.remove(fileName)
+
+        report1 = self.bench.Run(self.pointings)
+        report2 = self.bench.Run(self.pointings)
+        self.assertEqual(report1["delay_sum_s"], report2["delay_sum_s"])
+        self.assertEqual(report1["observed"] + report1["rejected"], len(self.pointings))
+
+    def testReport(self):
+        report = self.bench.Run(self.pointings)
+        self.assertEqual(sorted(report["calls"].keys()), sorted(IB.BENCH_CALLS))
+        for call in IB.BENCH_CALLS:
+            stats = report["calls"][call]
+            self.assertTrue(stats["p50_us"] <= stats["p90_us"] <= stats["p99_us"] <= stats["max_us"])
+        self.assertEqual(report["calls"]["RaDec2AltAz"]["count"], len(self.pointings))
+        self.assertEqual(report["calls"]["Observe"]["count"], report["observed"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import heapq
+import random
+import unittest
+
+from lsst.sims.operations.LooserList import LooserList
+
+class TestLooserList(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(7)
+        self.entries = [(-rnd.choice([0.1, 0.5, 0.9]), "obs%d" % i) for i in range(50)]
+        self.heap = list(self.entries)
+        heapq.heapify(self.heap)
+
+    def testIterationOrder(self):
+        loosers = LooserList(list(self.heap))
+        self.assertEqual(len(loosers), len(self.entries))
+        self.assertEqual(list(loosers), [o for (rank, o) in sorted(self.entries)])
+        # iterating does not consume the list
+        self.assertEqual(len(list(loosers)), len(self.entries))
+
+    def testRemove(self):
+        loosers = LooserList(list(self.heap))
+        expected = [o for (rank, o) in sorted(self.entries)]
+        for o in ["obs3", "obs0", "obs49"]:
+            loosers.remove(o)
+            expected.remove(o)
+            self.assertEqual(list(loosers), expected)
+        self.assertRaises(ValueError, loosers.remove, "obs3")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+import unittest
+
+import lsst.sims.operations.SchedulerBench as SB
+
+class TestSchedulerBench(unittest.TestCase):
+
+    def setUp(self):
+        self.bench = SB.SchedulerBench(fields=300, proposals=3, suggestions=100, seed=3)
+
+    def rankBoth(self, suggestions):
+        """
+        Rank the suggestions of the bench proposals with the rank matrices
+        and with the legacy dictionaries.
+        """
+        proposals = self.bench.proposals_list
+        self.bench.storeSuggestions(proposals, suggestions)
+        self.bench.aggregateRanks(proposals)
+        matrix = self.bench.rankCandidates(SB.numpy.nonzero(self.bench.targetRank > 0.0))
+        legacy = self.bench.legacyRankCandidates(proposals, suggestions)
+        return (matrix, legacy)
+
+    def testTies(self):
+        self.bench.Populate()
+        self.bench.dateProfile = (0, 49353.0, 0.0)
+        # fields 3, 5 and 7 at the same position, filter change from i
+        for fieldID in (3, 5, 7):
+            self.bench.targets[fieldID] = (10.0, -30.0)
+        self.bench.buildTargetArrays()
+        self.bench.telescope.Point(10.0 * SB.DEG2RAD, -30.0 * SB.DEG2RAD, "i")
+        Obs = SB.BenchObservation
+
+        # equal sums: the first candidate in (fieldID, filter) order wins
+        suggestions = [[Obs(7, "g", 0.25), Obs(3, "z", 0.5), Obs(5, "r", 0.25)],
+                       [Obs(7, "g", 0.25), Obs(3, "r", 0.5), Obs(5, "r", 0.25)],
+                       []]
+        (matrix, legacy) = self.rankBoth(suggestions)
+        self.assertEqual(matrix[1][2:4], (3, "r"))
+        self.assertEqual(matrix, legacy)
+
+        # the sums are made in proposal order: 0.1 + 0.2 > 0.3
+        suggestions = [[Obs(3, "r", 0.3), Obs(7, "g", 0.1)], [Obs(7, "g", 0.2)], []]
+        (matrix, legacy) = self.rankBoth(suggestions)
+        self.assertEqual(matrix[1][2:4], (7, "g"))
+        self.assertEqual(matrix, legacy)
+
+        # no winner without a positive rank
+        (matrix, legacy) = self.rankBoth([[Obs(3, "r", 0.0)], [], []])
+        self.assertEqual(matrix, (0, None))
+        self.assertEqual(legacy, (0, None))
+
+    def testLegacyWinners(self):
+        report = self.bench.Run(decisions=200)
+        winners = self.bench.winners
+        legacyReport = self.bench.Run(decisions=200, legacy=True)
+        self.assertEqual(report["observations"], 200)
+        self.assertEqual(self.bench.winners, winners)
+        self.assertEqual(legacyReport["winners_crc"], report["winners_crc"])
+
+    def testParallelProposals(self):
+        report = self.bench.Run(decisions=200)
+        winners = self.bench.winners
+        bench = SB.SchedulerBench(fields=300, proposals=3, suggestions=100, seed=3, parallel=True, threads=2)
+        parallelReport = bench.Run(decisions=200)
+        self.assertEqual(bench.winners, winners)
+        self.assertEqual(parallelReport["winners_crc"], report["winners_crc"])
+        self.assertTrue(bench.proposalPool is None)
+
+        # serial and pooled proposals together, merged in proposal order
+        bench.Populate()
+        bench.dateProfile = (0, 49353.0, 0.0)
+        bench.updateSeeing(0)
+        bench.transparency = 0.0
+        bench.proposals_list[1].parallelSuggest = False
+        suggestions = bench.evaluateProposals(bench.proposals_list, 0, 0)
+        self.bench.Populate()
+        self.bench.dateProfile = bench.dateProfile
+        self.bench.updateSeeing(0)
+        self.bench.transparency = 0.0
+        expected = self.bench.evaluateProposals(self.bench.proposals_list, 0, 0)
+        self.assertEqual([[(obs.fieldID, obs.filter, obs.propRank) for obs in targetObs]
+                          for targetObs in suggestions],
+                         [[(obs.fieldID, obs.filter, obs.propRank) for obs in targetObs]
+                          for targetObs in expected])
+        self.assertEqual(sorted(bench.proposalTiming.keys()), [1, 2, 3])
+        self.assertEqual([calls for (calls, seconds) in bench.proposalTiming.values()], [1, 1, 1])
+        bench.proposalPool.close()
+
+    def testIncrementalRanking(self):
+        report = self.bench.Run(decisions=200)
+        winners = self.bench.winners
+        bench = SB.SchedulerBench(fields=300, proposals=3, suggestions=100, seed=3, incremental=True)
+        incrementalReport = bench.Run(decisions=200)
+        self.assertEqual(bench.winners, winners)
+        self.assertEqual(incrementalReport["winners_crc"], report["winners_crc"])
+        stats = bench.rankingStats
+        self.assertEqual(stats["decisions"], 200)
+        self.assertTrue(0 < stats["full"] < 200)
+        self.assertTrue(stats["reused"] > 0)
+        self.assertEqual(stats["evaluated"] + stats["reused"], 3 * 200)
+
+    def testIncrementalRankingEvents(self):
+        bench = SB.SchedulerBench(fields=300, proposals=2, suggestions=100, seed=3, incremental=True)
+        bench.Populate()
+        moonProfile = (0.0, 0.0, 0.0)
+        seeing = [0.7]
+        bench.weather.getSeeing = lambda date: seeing[0]
+
+        winner = bench.suggestObservation((0, 49353.0, 0.0), moonProfile, None, 0.0)
+        self.assertEqual((bench.rankingStats["full"], bench.rankingStats["evaluated"]), (1, 2))
+        bench.recordWinner(winner, 1)
+        (row, col) = (bench.targetRow[winner.fieldID], bench.filterColumn[winner.filter])
+        self.assertEqual(bench.targetRank[row, col], 0.0)
+        # the proposals that took the visit are evaluated again
+        dirty = set([p.propID for p in bench.proposals_list if p.last_observed_wasForThisProposal])
+        self.assertTrue(len(dirty) > 0)
+        self.assertEqual(bench.dirtyProposals, dirty)
+        # the winner is zeroed in the suggestions kept for the others
+        for (rows, cols, ranks, xblk) in bench.proposalSuggestions.values():
+            self.assertFalse(ranks[(rows == row) & (cols == col)].any())
+
+        # same slot, seeing and transparency: only the dirty proposals run
+        bench.dirtyProposals = set()
+        bench.suggestObservation((40, 49353.0005, 0.0), moonProfile, None, 0.0)
+        self.assertEqual(bench.rankingStats["full"], 1)
+        self.assertEqual(bench.rankingStats["reused"], 2)
+        # the reused suggestions do not propose the winner again
+        self.assertEqual(bench.targetRank[row, col], 0.0)
+
+        # a seeing or transparency change evaluates all of them again
+        seeing[0] = 0.9
+        bench.suggestObservation((80, 49353.001, 0.0), moonProfile, None, 0.0)
+        self.assertEqual(bench.rankingStats["full"], 2)
+        self.assertEqual(bench.seeing, 0.9)
+        bench.suggestObservation((120, 49353.0014, 0.0), moonProfile, None, 0.1)
+        self.assertEqual(bench.rankingStats["full"], 3)
+        bench.suggestObservation((160, 49353.0019, 0.0), moonProfile, None, 0.1)
+        self.assertEqual(bench.rankingStats["full"], 3)
+        self.assertEqual(bench.rankingStats["evaluated"] + bench.rankingStats["reused"], 2 * 5)
+
+        # the reused ranks are those of a full re-rank
+        targetRank = bench.targetRank.copy()
+        bench.storeSuggestions(bench.proposals_list, bench.evaluateProposals(bench.proposals_list, 0, 0))
+        bench.aggregateRanks(bench.proposals_list)
+        self.assertTrue((bench.targetRank == targetRank).all())
+
+    def testCandidatePruning(self):
+        report = self.bench.Run(decisions=200)
+        winners = self.bench.winners
+        # wide enough for the synthetic ranks and slews
+        bench = SB.SchedulerBench(fields=300, proposals=3, suggestions=100, seed=3, pruning=True, audit=True)
+        bench.candidatePruningTopK = 100
+        bench.candidatePruningRadius = 60.0 * SB.DEG2RAD
+        prunedReport = bench.Run(decisions=200)
+        # the top-K and the nearby candidates keep the unpruned winner
+        self.assertEqual(bench.winners, winners)
+        self.assertEqual(prunedReport["winners_crc"], report["winners_crc"])
+        stats = prunedReport["pruning_stats"]
+        self.assertEqual(stats["winnerChanged"], 0)
+        self.assertTrue(stats["evaluated"] < stats["candidates"])
+
+    def testCandidatePruningAudit(self):
+        bench = SB.SchedulerBench(fields=300, proposals=3, suggestions=100, seed=3, pruning=True, audit=True)
+        # (candidates, evaluated, winner changed) of every decision
+        decisions = []
+        pruneCandidates = bench.pruneCandidates
+
+        def recordPruning(candidates):
+            evaluated = pruneCandidates(candidates)
+            (fullrank, fullwin) = bench.rankCandidates(candidates)
+            (maxrank, win) = bench.rankCandidates(evaluated)
+            changed = fullwin is not None and (win is None or fullwin[2:4] != win[2:4])
+            decisions.append((len(candidates[0]), len(evaluated[0]), changed))
+            return evaluated
+        bench.pruneCandidates = recordPruning
+
+        report = bench.Run(decisions=200)
+        stats = report["pruning_stats"]
+        self.assertEqual(stats, bench.pruningStats)
+        self.assertEqual(stats["decisions"], 200)
+        self.assertEqual(stats["candidates"], sum([c for (c, e, changed) in decisions]))
+        self.assertEqual(stats["evaluated"], sum([e for (c, e, changed) in decisions]))
+        self.assertEqual(stats["audited"], len([1 for (c, e, changed) in decisions if e < c]))
+        self.assertEqual(stats["winnerChanged"], len([1 for (c, e, changed) in decisions if changed]))
+        # the default top-K and radius are too narrow for the synthetic ranks
+        self.assertTrue(0 < stats["winnerChanged"] <= stats["audited"] <= 200)
+
+    def testPruneCandidates(self):
+        bench = SB.SchedulerBench(fields=300, proposals=3, suggestions=100, seed=3, pruning=True)
+        bench.Populate()
+        bench.suggestObservation((0, 49353.0, 0.0), (0.0, 0.0, 0.0), None, 0.0)
+        bench.telescope.Point(1.0, -0.6, "r")
+        candidates = SB.numpy.nonzero(bench.targetRank > 0.0)
+        (rows, cols) = bench.pruneCandidates(candidates)
+        self.assertTrue(bench.candidatePruningTopK < len(rows) < len(candidates[0]))
+
+        ranks = bench.targetRank[candidates]
+        threshold = sorted(ranks, reverse=True)[bench.candidatePruningTopK - 1]
+        near = bench.fieldIndex.fieldsWithin(1.0, -0.6, bench.candidatePruningRadius)
+        kept = zip(rows.tolist(), cols.tolist())
+        # evaluation order of the candidates is kept
+        self.assertEqual(kept, sorted(kept))
+        for (row, col) in zip(*candidates):
+            if bench.targetFieldID[row] in near or bench.targetRank[row, col] > threshold:
+                self.assertTrue((row, col) in kept)
+            elif bench.targetRank[row, col] < threshold:
+                self.assertFalse((row, col) in kept)
+
+    def testReproducibleRun(self):
+        report1 = self.bench.Run(decisions=50)
+        report2 = self.bench.Run(decisions=50)
+        self.assertEqual(report1["winners_crc"], report2["winners_crc"])
+        self.assertEqual(report1["decisions"], 50)
+
+if __name__ == "__main__":
+    unittest.main()
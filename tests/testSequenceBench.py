@@ -0,0 +1,72 @@
+import unittest
+
+import lsst.sims.operations.SequenceBench as SQB
+from lsst.sims.operations.SequenceStore import *
+
+class TestSequenceBench(unittest.TestCase):
+
+    def setUp(self):
+        self.bench = SQB.SequenceBench(count=300, seed=3)
+
+    def testStartNightSequences(self):
+        self.bench.targetsNewSeq = self.bench.newSeqRegion(0)
+        idleOutside = [fieldID for (fieldID, seq) in self.bench.sequences.items()
+                       if seq.IsIdle() and fieldID not in self.bench.targetsNewSeq]
+
+        counters = self.bench.startNightSequences(0.0, False)
+        self.assertEqual(counters["deletedidle"], len(idleOutside))
+        for fieldID in idleOutside:
+            self.assertFalse(fieldID in self.bench.sequences)
+
+        self.assertEqual(counters["kept"], len(self.bench.tonightTargets))
+        self.assertEqual(sorted(self.bench.tonightTargets.keys()),
+                         sorted(self.bench.tonightSubseqsForTarget.keys()))
+        for fieldID in self.bench.tonightTargets:
+            seq = self.bench.sequences[fieldID]
+            self.assertFalse(seq.IsLost() or seq.IsComplete())
+        self.assertTrue(counters["new"] + counters["restartedlost"] + counters["restartedcomplete"] > 0)
+
+    def testRandomSelection(self):
+        self.bench.targetsNewSeq = self.bench.newSeqRegion(0)
+        before = dict([(fieldID, (seq.IsLost(), seq.IsComplete()))
+                       for (fieldID, seq) in self.bench.sequences.items()])
+        seqCount = self.bench.SeqCount
+        SQB.random.seed(11)
+        counters = self.bench.startNightSequences(0.0, True)
+
+        # the fields picked with random.choice and list.remove, as before
+        # the linear bookkeeping, that start or restart a sequence
+        SQB.random.seed(11)
+        listOfNewFields = sorted(self.bench.targetsNewSeq.keys())
+        expected = []
+        while listOfNewFields:
+            fieldID = SQB.random.choice(listOfNewFields)
+            listOfNewFields.remove(fieldID)
+            if fieldID not in before or before[fieldID] != (False, False):
+                expected.append(fieldID)
+
+        started = sorted([(seq.seqNum, fieldID) for (fieldID, seq) in self.bench.sequences.items()
+                          if seq.seqNum > seqCount])
+        self.assertEqual(len(started), counters["new"] + counters["restartedlost"] +
+                         counters["restartedcomplete"])
+        self.assertTrue(len(started) > 10)
+        self.assertEqual([fieldID for (seqNum, fieldID) in started], expected[:len(started)])
+
+    def testPickRemaining(self):
+        for n in (1, 2, 7, 64, 100):
+            tree = SQB.remainingTree(n)
+            remaining = range(n)
+            rnd = SQB.random.Random(n)
+            while remaining:
+                k = rnd.randrange(len(remaining))
+                self.assertEqual(SQB.pickRemaining(tree, k), remaining.pop(k))
+
+    def testReproducibleRun(self):
+        report1 = self.bench.Run(nights=4)
+        report2 = self.bench.Run(nights=4)
+        self.assertEqual(report1["counters"], report2["counters"])
+        self.assertEqual(report1["final_sequences"], report2["final_sequences"])
+        self.assertEqual(len(report1["night_s"]), 4)
+
+if __name__ == "__main__":
+    unittest.main()
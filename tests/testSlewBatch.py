@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+import lsst.sims.operations.SlewBatch as SB
+
+class TestSlewBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.batch = SB.SlewBatch(instrumentConf="example_conf/system/Instrument.conf")
+        self.pairs = numpy.array([[80.0, 0.0, 0.0, 80.0, 0.0, 0.0],
+                                  [80.0, 0.0, 0.0, 60.0, 30.0, 10.0],
+                                  [45.0, 200.0, -30.0, 70.0, -100.0, 20.0]])
+
+    def testNoMovement(self):
+        (delay, delays, criticalPath) = self.batch.ComputeSlew(80.0, 0.0, 0.0, 80.0, 0.0, 0.0)
+        # only the readout of the previous exposure remains
+        self.assertAlmostEqual(delay, self.batch.instrument.slew_params.Readout_Time)
+        self.assertEqual(self.batch.CriticalPathTags(criticalPath), ["Readout"])
+
+    def testFilterChange(self):
+        (delay, delays, criticalPath) = self.batch.ComputeSlew(80.0, 0.0, 0.0, 80.0, 0.0, 0.0, True)
+        self.assertAlmostEqual(delay, self.batch.instrument.slew_params.Filter_MoveTime)
+        self.assertTrue("Filter" in self.batch.CriticalPathTags(criticalPath))
+
+    def testComputeMatchesSingleSlews(self):
+        (delay, activityDelays, criticalPath) = self.batch.Compute(self.pairs)
+        self.assertEqual(activityDelays.shape, (len(self.pairs), self.batch.numActivities))
+        for i in range(len(self.pairs)):
+            (d, delays, cp) = self.batch.ComputeSlew(*self.pairs[i])
+            self.assertAlmostEqual(delay[i], d)
+            self.assertEqual(criticalPath[i], cp)
+        self.assertTrue(delay[2] > delay[1] > delay[0])
+
+    def testBadPairs(self):
+        self.assertRaises(SB.InputParamError, self.batch.Compute, self.pairs[:, :4])
+
+    def testReadPairs(self):
+        (fd, path) = tempfile.mkstemp(suffix='.txt')
+        os.write(fd, "# pairs\nfromAlt,fromAz,fromRot,toAlt,toAz,toRot\n80,0,0,80,0,0\n\n"
+                 "80 0 0 60 30 10\n45,200,-30,70,-100,20\n")
+        os.close(fd)
+        chunks = list(self.batch.ReadPairs(path, chunkSize=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        self.assertTrue((numpy.concatenate(chunks) == self.pairs).all())
+
+        # a truncated line and a line with a filter change column
+        for bad in ("80,0,0,60,30\n", "80,0,0,60,30,10,1\n"):
+            f = open(path, 'w')
+            f.write("80,0,0,80,0,0\n80,0,0,60,30,10\n" + bad + "45,200,-30,70,-100,20\n")
+            f.close()
+            try:
+                list(self.batch.ReadPairs(path))
+                self.fail('InputParamError not raised')
+            except SB.InputParamError as e:
+                self.assertTrue('line 3' in str(e))
+        os.remove(path)
+
+if __name__ == "__main__":
+    unittest.main()
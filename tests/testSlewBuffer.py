@@ -0,0 +1,97 @@
+import unittest
+
+import lsst.sims.operations.Database as DB
+import lsst.sims.operations.Instrument as Inst
+import lsst.sims.operations.utilities as utilities
+
+class TestSlewBuffer(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup an Instrument and make it observe a few pointings, the
+        way ObsScheduler.closeObservation does.
+        """
+        self.db = DB.Database(False, dbConnect=False)
+        configDict, pairs = utilities.readConfFile("example_conf/system/SiteCP.conf")
+        obsProfile = (configDict["longitude"] * utilities.DEG2RAD,
+                      configDict["latitude"] * utilities.DEG2RAD,
+                      configDict["height"],
+                      configDict["seeingEpoch"],
+                      configDict["pressure"],
+                      configDict["temperature"],
+                      configDict["relativeHumidity"])
+        self.inst = Inst.Instrument(self.db, 1, {}, obsProfile, "example_conf/system/Instrument.conf",
+                                    verbose=-1)
+
+        # the scheduler writes the visit of a slew with obsHistID = slewCount
+        self.obsHistIDs = []
+        for (k, (ra_RAD, dec_RAD, filter)) in enumerate([(1.2, -0.5, "r"), (1.3, -0.6, "r"),
+                                                          (1.1, -0.4, "i")]):
+            dateProfile = (1000 + 60 * k, 49353.01 + 60 * k / 86400.0, 2.0 + 0.004 * k)
+            delay = self.inst.GetDelayForTarget(ra_RAD, dec_RAD, dateProfile, 30.0, filter)
+            self.inst.Observe(ra_RAD, dec_RAD, dateProfile, 30.0, filter, delay)
+            self.obsHistIDs.append(self.inst.slewCount)
+
+        self.buffer = self.inst.slewBuffer
+
+    def tearDown(self):
+        self.db.closeConnection()
+
+    def testRows(self):
+        self.assertEqual(self.obsHistIDs, [1, 2, 3])
+        self.assertEqual(len(self.buffer), 3)
+
+        history = self.buffer.HistoryRows(1000)
+        self.assertEqual([row[0] for row in history], self.obsHistIDs)
+        # ObsHistory_obsHistID is the slewCount
+        self.assertEqual([row[5] for row in history], self.obsHistIDs)
+        self.assertEqual([row[6] for row in history], [1000] * 3)
+        for (slewCount, startDate, endDate, slewTime, slewDist, obsHistID, sessionID) in history:
+            self.assertAlmostEqual(endDate - startDate, slewTime)
+
+        slewID = {1: 11, 2: 12, 3: 13}
+        states = self.buffer.StateRows(slewID)
+        # initial and final state of every slew
+        self.assertEqual([(row[-2], row[-1]) for row in states],
+                         [(Inst.SLEWINITSTATE, 11), (Inst.SLEWFINALSTATE, 11),
+                          (Inst.SLEWINITSTATE, 12), (Inst.SLEWFINALSTATE, 12),
+                          (Inst.SLEWINITSTATE, 13), (Inst.SLEWFINALSTATE, 13)])
+        self.assertEqual(states[-1][12], "i")
+        self.assertTrue(states[-1][3] in ("True", "False"))
+
+        speeds = self.buffer.MaxSpeedsRows(slewID)
+        self.assertEqual([row[-1] for row in speeds], [11, 12, 13])
+
+        activities = self.buffer.ActivitiesRows(slewID)
+        self.assertTrue(len(activities) > 0)
+        self.assertEqual([row[-1] for row in activities], [slewID[n] for n in self.buffer.actSlewCount])
+        for (activity, delay, inCriticalPath, ID) in activities:
+            self.assertTrue(activity in self.inst.slew_params.activities)
+            self.assertTrue(inCriticalPath in ("True", "False"))
+
+    def testAddSlewBuffer(self):
+        db = DB.Database(True, backend=DB.SQLiteBackend(":memory:"))
+        # slews of another session and of earlier visits of this one
+        db.executeManySQL(db.insertQuery("SlewHistory"), [(2, 0.0, 1.0, 1.0, 0.1, 2, 999),
+                                                          (7, 0.0, 1.0, 1.0, 0.1, 7, 1000)])
+        nActivities = len(self.buffer.actSlewCount)
+        db.addSlewBuffer(self.buffer, 1000)
+        self.assertEqual(len(self.buffer), 0)
+
+        # the dependent rows refer to the slewID of the slew with the same
+        # slewCount, i.e. of the visit with obsHistID = slewCount
+        (n, res) = db.executeSQL("SELECT h.slewCount, h.ObsHistory_obsHistID, s.state FROM SlewState s, "
+                                 "SlewHistory h WHERE s.SlewHistory_slewID = h.slewID "
+                                 "ORDER BY s.slewIniStatID")
+        self.assertEqual(res, [(1, 1, 0), (1, 1, 1), (2, 2, 0), (2, 2, 1), (3, 3, 0), (3, 3, 1)])
+        (n, res) = db.executeSQL("SELECT h.ObsHistory_obsHistID, h.ObsHistory_Session_sessionID FROM "
+                                 "SlewMaxSpeeds m, SlewHistory h WHERE m.SlewHistory_slewID = h.slewID "
+                                 "ORDER BY m.slewMaxSpeedID")
+        self.assertEqual(res, [(1, 1000), (2, 1000), (3, 1000)])
+        (n, res) = db.executeSQL("SELECT count(*) FROM SlewActivities a, SlewHistory h WHERE "
+                                 "a.SlewHistory_slewID = h.slewID AND h.ObsHistory_Session_sessionID = 1000")
+        self.assertEqual(res, [(nActivities,)])
+        db.closeConnection()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from lsst.sims.operations.SequenceStore import *
+from lsst.sims.operations.SuperSequence import SubSequence, SuperSequence, rankTimeWindowArray
+
+class TestSuperSequence(unittest.TestCase):
+
+    def setUp(self):
+        self.subseq = SubSequence(0, 1, False, 2, "pair", None, "r,r", "1,1", 10, 3, 1800.0, -0.5, 0.5, 1.0)
+
+    def testRankTimeWindowArray(self):
+        (nextDate, interval, windowStart, windowMax, windowEnd) = self.subseq.GetTimeWindowParams()
+        self.assertEqual((windowStart, windowMax, windowEnd), (-0.5, 0.5, 1.0))
+
+        dates = [nextDate + dt for dt in (-90000.0, -1000.0, -900.0, 0.0, 450.0, 900.0, 1800.0, 1801.0)]
+        ranks = [rankTimeWindowArray(date, [nextDate], [interval], [windowStart], [windowMax],
+                                     [windowEnd])[0] for date in dates]
+        self.assertEqual(ranks, [self.subseq.RankTimeWindow(date) for date in dates])
+        self.assertEqual(ranks, [-0.1, 0.0, 0.0, 0.5, 0.75, 1.0, 1.0, -1.0])
+
+        n = len(dates)
+        self.assertEqual(list(rankTimeWindowArray(dates[4], [nextDate] * n, [interval] * n,
+                                                  [windowStart] * n, [windowMax] * n, [windowEnd] * n)),
+                         [0.75] * n)
+
+    def newSequence(self, store, field):
+        return SuperSequence(0, field, field, False, 2, None, ["a", "b"], [".", "."], ["r", "g,i"],
+                             ["1", "1,1"], [3, 2], [1, 1], [1800.0, 3600.0], [-0.5, -0.5], [0.5, 0.5],
+                             [1.0, 1.0], store=store)
+
+    def testSequenceStore(self):
+        store = SequenceStore(capacity=2)
+        sequences = dict([(field, self.newSequence(store, field)) for field in (10, 11, 12)])
+        fields = sorted(sequences.keys())
+
+        sequences[11].ObserveEvent(1000.0, "a", 1)
+        # two misses are one more than allowed
+        sequences[12].MissEvent(1000.0, "a", 1)
+        sequences[12].MissEvent(2000.0, "a", 2)
+        self.assertEqual(list(store.GetState(fields)), [SEQ_IDLE, SEQ_ACTIVE, SEQ_LOST])
+        self.assertEqual(list(store.GetProgress(fields)), [sequences[f].GetProgress() for f in fields])
+        self.assertEqual(store.Select(fields, [SEQ_IDLE, SEQ_ACTIVE]), [10, 11])
+        self.assertEqual(sequences[11].nAllEvents, 1)
+        self.assertEqual(sequences[11].subSequence["a"].nAllEvents, 1)
+        self.assertEqual(sequences[11].date, 1000.0)
+
+        row = sequences[12].storeRow
+        sequences[12].Release()
+        del sequences[12]
+        self.assertRaises(KeyError, store.Rows, [12])
+        self.assertEqual(self.newSequence(store, 13).storeRow, row)
+        self.assertEqual(list(store.IsIdle([10, 13])), [True, True])
+
+if __name__ == "__main__":
+    unittest.main()
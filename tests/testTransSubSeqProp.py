@@ -0,0 +1,122 @@
+import random
+import unittest
+
+import lsst.sims.operations.TransSubSeqProp as TSSP
+from lsst.sims.operations.utilities import DAY
+
+class RankingProp(TSSP.TransSubSeqProp):
+    """
+    TransSubSeqProp with the attributes used to rank the subsequences of
+    tonight, without the DB and configuration set up.
+    """
+    def __init__(self, WLtype, seed):
+        self.WLtype = WLtype
+        self.rankTimeMax = 1.0
+        self.rankIdleSeq = 0.1
+        self.rankLossRiskMax = 2.0
+        self.rankDaysLeftMax = 0.0
+        self.DaysLeftToStartBoost = 0.0
+        self.ha_maxairmass = 3.0
+        self.globalProgress = 0.4
+        self.overflowLevel = 0.2
+
+        rnd = random.Random(seed)
+        self.store = TSSP.SequenceStore(capacity=16)
+        self.sequences = {}
+        self.tonightSubseqsForTarget = {}
+        self.ha_twilight = {}
+        for fieldID in range(1, 121):
+            if WLtype:
+                # time window every second visit of a pair, or none at all
+                interval = rnd.choice([0, 1800.0])
+                seq = TSSP.SuperSequence(1, fieldID, fieldID, True, 2, None, ['a', 'b'], ['.', '.'],
+                                         ['r', 'g,i'], ['1', '1,1'], [6, 4], [2, 2], [interval, interval],
+                                         [-0.5, -0.5], [0.5, 0.5], [1.0, 1.0], overflowLevel=0.5,
+                                         progressToStartBoost=0.6, maxBoostToComplete=0.3, store=self.store)
+            else:
+                # master subsequence and a nested one
+                seq = TSSP.SuperSequence(1, fieldID, fieldID, False, 1, rnd.choice(['a', None]),
+                                         ['a', 'b', 'c', 'n'], ['.', '.', 'n', '.'],
+                                         ['r', 'g', '', 'i,z'], ['1', '1', '', '1,1'], [5, 4, 3, 2],
+                                         [1, 2, 1, 1], [DAY, 0.5 * DAY, DAY, 1800.0],
+                                         [-0.5, -0.2, -0.5, -0.5], [0.5, 0.2, 0.5, 0.5], [1.0, 0.8, 1.0, 1.0],
+                                         store=self.store)
+            # events observed or missed a few days ago, in random order
+            date = 0.0
+            for k in range(rnd.randint(0, 5)):
+                name = rnd.choice(seq.subSeqName)
+                if seq.IsLost() or seq.IsComplete(name):
+                    break
+                date += rnd.choice([1800.0, 0.5 * DAY, DAY])
+                if rnd.random() < 0.8:
+                    seq.ObserveEvent(date, name, k)
+                else:
+                    seq.MissEvent(date, name, k)
+            self.sequences[fieldID] = seq
+            self.tonightSubseqsForTarget[fieldID] = list(seq.subSeqName)
+            self.ha_twilight[fieldID] = rnd.uniform(-5.0, 1.0)
+
+    def __del__(self):
+        pass
+
+class TestTransSubSeqProp(unittest.TestCase):
+
+    def compareRanks(self, prop, dates):
+        """
+        Compare rankSubsequences with rankSubsequence on every subsequence
+        of tonight, and return the (rankTime, timeWindow) pairs seen.
+        """
+        fields = sorted(prop.sequences.keys())
+        seen = set()
+        for date in dates:
+            ranking = prop.rankSubsequences(fields, date)
+            expected = {}
+            for fieldID in fields:
+                if prop.sequences[fieldID].IsLost():
+                    continue
+                for subseq in prop.tonightSubseqsForTarget[fieldID]:
+                    expected[(fieldID, subseq)] = prop.rankSubsequence(fieldID, subseq, date)
+            self.assertEqual(sorted(ranking.keys()), sorted(expected.keys()))
+            for key in expected:
+                (rankTime, timeWindow, rank) = ranking[key]
+                (expRankTime, expTimeWindow, expRank) = expected[key]
+                self.assertEqual(timeWindow, expTimeWindow)
+                self.assertAlmostEqual(rankTime, expRankTime, places=12)
+                self.assertAlmostEqual(rank, expRank, places=12)
+                seen.add((max(cmp(expRankTime, 0.0), -1) if expRankTime != -0.1 else -0.1, expTimeWindow))
+        return seen
+
+    def testRankSubsequences(self):
+        prop = RankingProp(False, 5)
+        dates = [DAY * k + dt for k in (1, 2, 3, 4) for dt in (0.0, 1200.0, 0.3 * DAY, 0.6 * DAY)]
+        seen = self.compareRanks(prop, dates)
+        # missed, not tonight, waiting and proposed events
+        self.assertEqual(seen, set([(-1, True), (-0.1, True), (0, True), (1, True), (0, False)]))
+        states = [(seq.IsIdle(name), seq.IsActive(name)) for seq in prop.sequences.values()
+                  for name in seq.subSeqName]
+        self.assertTrue((True, False) in states and (False, True) in states and (False, False) in states)
+        self.assertTrue(any([seq.IsLost() for seq in prop.sequences.values()]))
+
+    def testRankSubsequencesDaysLeftBoost(self):
+        prop = RankingProp(False, 5)
+        prop.DaysLeftToStartBoost = 30.0
+        prop.rankDaysLeftMax = 0.5
+        self.compareRanks(prop, [DAY * k + 1200.0 for k in (1, 2, 3)])
+
+    def testRankSubsequencesWLtype(self):
+        prop = RankingProp(True, 8)
+        dates = [DAY * k + dt for k in (0, 1, 2) for dt in (0.0, 1200.0, 1800.0, 2700.0)]
+        # progress ranked subsequences without a time window
+        self.assertTrue((1, False) in self.compareRanks(prop, dates))
+        prop.DaysLeftToStartBoost = 30.0
+        prop.rankDaysLeftMax = 0.5
+        self.compareRanks(prop, dates)
+        # overflow of the proposal, with and without overflow level
+        prop.globalProgress = 1.2
+        self.compareRanks(prop, dates)
+        prop.overflowLevel = 0.0
+        self.assertEqual(prop.idleRankFactor(), 0.0)
+        self.compareRanks(prop, dates)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+import math
+import random
+import unittest
+
+import lsst.sims.operations.Database as DB
+import lsst.sims.operations.Filters as F
+import lsst.sims.operations.Observation as O
+import lsst.sims.operations.WeakLensingProp as WL
+
+FILTERS = ['u', 'g', 'r', 'i', 'z', 'y']
+
+class SchedulingData(object):
+    """
+    The look-ahead arrays of SchedulingData used by rankAreaDistribution.
+    """
+    def __init__(self, fields, sdtime, sdnight):
+        self.airmass = {sdtime: {}}
+        self.dist2moon = {sdtime: {}}
+        self.brightness = {sdtime: {}}
+        self.alt = {sdtime: {}}
+        self.az = {sdtime: {}}
+        self.pa = {sdtime: {}}
+        self.moonProfile = {sdnight: (1.0, -0.2, 40.0)}
+        for fieldID in fields:
+            self.airmass[sdtime][fieldID] = random.uniform(1.0, 2.0)
+            self.dist2moon[sdtime][fieldID] = random.uniform(0.0, math.pi)
+            self.brightness[sdtime][fieldID] = random.uniform(17.0, 23.0)
+            self.alt[sdtime][fieldID] = random.uniform(0.5, 1.5)
+            self.az[sdtime][fieldID] = random.uniform(0.0, 2 * math.pi)
+            self.pa[sdtime][fieldID] = random.uniform(-math.pi, math.pi)
+
+class TestWeakLensingProp(unittest.TestCase):
+
+    def setUp(self):
+        self.db = DB.Database(False, dbConnect=False)
+        self.filters = F.Filters(self.db, "example_conf/system/Filters.conf", 1, {}, 0.25, 0.08, 0.3, 1.16,
+                                 1.04, verbose=-1)
+
+        random.seed(7)
+        self.sdtime = 3
+        self.sdnight = 1
+        self.fields = range(1, 201)
+        self.schedulingData = SchedulingData(self.fields, self.sdtime, self.sdnight)
+        # readConfFile returns the goals as floats
+        goal = dict(zip(FILTERS, [5.0, 8.0, 20.0, 20.0, 20.0, 20.0]))
+        # none, some, complete and overflowing visits in every filter
+        self.visits = dict([(filter, {}) for filter in FILTERS])
+        for fieldID in self.fields:
+            complete = random.random() < 0.2
+            for filter in FILTERS:
+                if complete:
+                    self.visits[filter][fieldID] = goal[filter] + random.randint(0, 3)
+                elif random.random() < 0.8:
+                    self.visits[filter][fieldID] = random.randint(0, int(goal[filter]) + 2)
+        self.goal = goal
+
+    def tearDown(self):
+        self.db.closeConnection()
+
+    def makeProposal(self, visitsTonight):
+        """
+        Return a WeakLensingProp with the attributes used by
+        rankAreaDistribution, without the DB and configuration set up.
+        """
+        prop = WL.WeakLensingProp.__new__(WL.WeakLensingProp)
+        prop.propID = 1
+        prop.propConf = 'WeakLensingProp.conf'
+        prop.log = False
+        prop.verbose = 0
+        prop.schedulingData = self.schedulingData
+        prop.filters = self.filters
+        prop.FilterNames = list(FILTERS)
+        prop.mountedFiltersList = ['g', 'r', 'i', 'z', 'y']
+        prop.FilterMinBrig = dict(zip(FILTERS, [21.4, 21.0, 20.25, 19.5, 17.5, 17.0]))
+        prop.FilterMaxBrig = dict([(filter, 30.0) for filter in FILTERS])
+        prop.FilterMaxSeeing = dict(zip(FILTERS, [1.5, 1.5, 0.9, 0.9, 1.5, 1.5]))
+        prop.GoalVisitsFieldFilter = dict(self.goal)
+        prop.visits = dict([(filter, dict(v)) for (filter, v) in self.visits.items()])
+        prop.GoalVisitsTonight = 50
+        prop.VisitsTonight = visitsTonight
+        prop.maxNeedAfterOverflow = 0.5
+        prop.ProgressToStartBoost = 0.5
+        prop.MaxBoostToComplete = 0.2
+        prop.scale = 0.1
+        prop.maxAirmass = 1.5
+        prop.minDistance2Moon = 0.5
+        prop.relativeProposalPriority = 1.5
+        prop.last_observed_fieldID = 17
+        prop.last_observed_wasForThisProposal = True
+        prop.AcceptConsecutiveObs = False
+        prop.targets = dict([(fieldID, (0.0, 0.0)) for fieldID in self.fields])
+        prop.obsPool = {}
+        for fieldID in self.fields:
+            prop.obsPool[fieldID] = {}
+            for filter in FILTERS:
+                prop.obsPool[fieldID][filter] = O.Observation(dateProfile=(0, 0.0, 0.0),
+                                                              moonProfile=(0.0, 0.0, 0.0), proposal=prop,
+                                                              filter=filter, fieldID=fieldID)
+        prop.queue = []
+        prop.pendingSuggestions = {}
+
+        return prop
+
+    def legacyRank(self, prop, sdnight, sdtime, seeing):
+        """
+        The per-field loop of rankAreaDistribution before the arrays.
+        Return the sorted list of (fieldID, filter, rank, seeing, airmass,
+        skyBrightness, distance2moon) of the proposed targets.
+        """
+        proposed = []
+        needTonight = prop.GoalVisitsTonight - prop.VisitsTonight
+        if needTonight > 0:
+            GlobalNeedFactor = float(needTonight) / prop.GoalVisitsTonight
+        else:
+            GlobalNeedFactor = (prop.maxNeedAfterOverflow / (-needTonight + 1)) / prop.GoalVisitsTonight
+
+        for fieldID in self.fields:
+            if fieldID == prop.last_observed_fieldID and prop.last_observed_wasForThisProposal and \
+                    not prop.AcceptConsecutiveObs:
+                continue
+
+            airmass = prop.schedulingData.airmass[sdtime][fieldID]
+            if airmass > prop.maxAirmass:
+                continue
+
+            distance2moon = prop.schedulingData.dist2moon[sdtime][fieldID]
+            if distance2moon < prop.minDistance2Moon:
+                del prop.targets[fieldID]
+                continue
+
+            nVisits = {}
+            progress = {}
+            progress_avg = 0.0
+            for filter in prop.FilterNames:
+                try:
+                    nVisits[filter] = prop.visits[filter][fieldID]
+                except:
+                    nVisits[filter] = 0.
+                progress[filter] = nVisits[filter] / prop.GoalVisitsFieldFilter[filter]
+                progress_avg += min(progress[filter], 1.0) / len(prop.FilterNames)
+
+            FieldNeedFactor = 1.0 - progress_avg
+            if prop.ProgressToStartBoost < progress_avg < 1.0:
+                progAvMinusBoost = progress_avg - prop.ProgressToStartBoost
+                oneMinusBoost = 1.0 - prop.ProgressToStartBoost
+                FieldNeedFactor += prop.MaxBoostToComplete * progAvMinusBoost / oneMinusBoost
+
+            skyBrightness = prop.schedulingData.brightness[sdtime][fieldID]
+            allowedFilterList = prop.allowedFiltersForBrightness(skyBrightness)
+            filterSeeingList = prop.filters.computeFilterSeeing(seeing, airmass)
+
+            for filter in allowedFilterList:
+                if filterSeeingList[filter] > prop.FilterMaxSeeing[filter]:
+                    continue
+
+                if GlobalNeedFactor > 0.0:
+                    if FieldNeedFactor > 0.0:
+                        if progress[filter] < 1.0:
+                            FilterNeedFactor = 1.0 - progress[filter]
+                            rank = prop.scale * 0.5 * (FieldNeedFactor + FilterNeedFactor) / GlobalNeedFactor
+                        else:
+                            rank = 0.0
+                    else:
+                        visitsMinusGoal = nVisits[filter] - prop.GoalVisitsFieldFilter[filter] + 1
+                        numerator = prop.maxNeedAfterOverflow / visitsMinusGoal
+                        FilterNeedFactor = numerator / prop.GoalVisitsFieldFilter[filter]
+                        rank = prop.scale * FilterNeedFactor / GlobalNeedFactor
+                else:
+                    rank = 0.0
+
+                if rank > 0.0:
+                    proposed.append((fieldID, filter, rank, filterSeeingList[filter], airmass, skyBrightness,
+                                     distance2moon))
+
+        return sorted(proposed)
+
+    def compareRanks(self, visitsTonight, seeing):
+        dateProfile = (1000, 49353.01, 2.0)
+        legacyProp = self.makeProposal(visitsTonight)
+        legacy = self.legacyRank(legacyProp, self.sdnight, self.sdtime, seeing)
+
+        prop = self.makeProposal(visitsTonight)
+        prop.rankAreaDistribution(self.fields, self.sdnight, self.sdtime, dateProfile, 0.6, seeing, 0.1)
+        self.assertEqual(len(prop.queue), len(prop.pendingSuggestions))
+        proposed = []
+        for (key, obs) in prop.queue:
+            prop.materializeSuggestion(obs)
+            # the heap key is the rank without the proposal priority
+            self.assertEqual(obs.propRank, -key * prop.relativeProposalPriority)
+            self.assertEqual(obs.altitude, self.schedulingData.alt[self.sdtime][obs.fieldID])
+            self.assertEqual(obs.moonPhase, 40.0)
+            proposed.append((obs.fieldID, obs.filter, -key, obs.seeing, obs.airmass, obs.skyBrightness,
+                             obs.distance2moon))
+        proposed.sort()
+        self.assertEqual(prop.pendingSuggestions, {})
+
+        self.assertTrue(len(legacy) > 0)
+        self.assertEqual([p[:2] for p in proposed], [p[:2] for p in legacy])
+        for (new, old) in zip(proposed, legacy):
+            for (a, b) in zip(new[2:], old[2:]):
+                self.assertAlmostEqual(a, b, places=12)
+        # the fields too close to the moon are dropped for the night
+        self.assertEqual(sorted(prop.targets.keys()), sorted(legacyProp.targets.keys()))
+        self.assertTrue(len(prop.targets) < len(self.fields))
+
+        return proposed
+
+    def testRankMatchesFieldLoop(self):
+        proposed = self.compareRanks(10, 0.7)
+        # not the last observed field, only the mounted filters
+        self.assertTrue(17 not in [p[0] for p in proposed])
+        self.assertTrue('u' not in [p[1] for p in proposed])
+
+    def testRankMatchesFieldLoopBadSeeing(self):
+        # all the r and i targets are cut by the seeing
+        self.compareRanks(10, 0.75)
+
+    def testRankMatchesFieldLoopOverflow(self):
+        # more visits tonight than the goal
+        self.compareRanks(60, 0.7)
+
+if __name__ == "__main__":
+    unittest.main()